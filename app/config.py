@@ -8,6 +8,22 @@ load_dotenv()
 class Config():
     BOT_TOKEN: str
     DB_URL: str = 'sqlite:///./data/bot.db'
+    ASYNC_DB_URL: str = None
+    DB_MODE: str = 'async'              # Режим работы с БД: async (aiosqlite) или executor (пул потоков)
+    DB_EXECUTOR_WORKERS: int = 4        # Количество потоков в режиме executor
+    DB_PROFILE: str = 'performance'     # Профиль SQLite: default или performance (WAL и PRAGMA)
+    DB_WRITE_MODE: str = 'direct'       # Запись сессий и рейтинга: direct (в сессии update) или group (group commit)
+    DB_WRITER_MAX_BATCH: int = 64       # Максимум записей в одной транзакции group commit
+    DB_WRITER_MAX_DELAY_MS: float = 2   # Сколько ждать пополнения пачки (мс)
+    GAME_SESSION_MODE: str = 'eager'    # Строка игры в БД: eager (при старте) или lazy (только при завершении)
+    GAME_STARTS_FLUSH_SECONDS: float = 30  # Как часто сбрасывать счетчик запусков игр в БД
+    PERIOD_PRUNE_SECONDS: float = 3600  # Как часто удалять очки за прошедшие дни, недели и месяцы
+    DB_PROFILER: str = 'off'            # Профилировщик SQL: on или off
+    DB_SLOW_QUERY_MS: float = 100       # Порог медленного запроса для лога с EXPLAIN (мс)
+    RANK_INDEX: str = 'memory'          # Ранги и места в топах: memory (индексы в памяти) или sql (запрос к БД)
+    LEADERBOARD_CACHE_TTL: float = 60   # Время жизни кэша топов игроков (сек), 0 - без кэша
+    CITIES_BOT_LEVEL: str = 'normal'    # Уровень бота в «Городах» по умолчанию: easy, normal или hard
+    CITIES_START_WEIGHT: str = 'population'  # Выбор стартового города: population (чаще крупные) или uniform
     ADMIN_IDS: list = None
 
     def __post_init__(self):
@@ -33,10 +49,58 @@ class Config():
             if directory and not os.path.exists(directory):
                 os.makedirs(directory, exist_ok=True)
 
+        # Режим работы с БД
+        if self.DB_MODE not in ('async', 'executor'):
+            raise ValueError(f"❌ Неизвестный DB_MODE: {self.DB_MODE} (допустимо: async, executor)")
+        self.DB_EXECUTOR_WORKERS = int(self.DB_EXECUTOR_WORKERS)
+        if self.DB_PROFILE not in ('default', 'performance'):
+            raise ValueError(f"❌ Неизвестный DB_PROFILE: {self.DB_PROFILE} (допустимо: default, performance)")
+        if self.DB_WRITE_MODE not in ('direct', 'group'):
+            raise ValueError(f"❌ Неизвестный DB_WRITE_MODE: {self.DB_WRITE_MODE} (допустимо: direct, group)")
+        self.DB_WRITER_MAX_BATCH = int(self.DB_WRITER_MAX_BATCH)
+        self.DB_WRITER_MAX_DELAY_MS = float(self.DB_WRITER_MAX_DELAY_MS)
+        if self.GAME_SESSION_MODE not in ('eager', 'lazy'):
+            raise ValueError(f"❌ Неизвестный GAME_SESSION_MODE: {self.GAME_SESSION_MODE} (допустимо: eager, lazy)")
+        self.GAME_STARTS_FLUSH_SECONDS = float(self.GAME_STARTS_FLUSH_SECONDS)
+        self.PERIOD_PRUNE_SECONDS = float(self.PERIOD_PRUNE_SECONDS)
+        if self.DB_PROFILER not in ('on', 'off'):
+            raise ValueError(f"❌ Неизвестный DB_PROFILER: {self.DB_PROFILER} (допустимо: on, off)")
+        self.DB_SLOW_QUERY_MS = float(self.DB_SLOW_QUERY_MS)
+        if self.RANK_INDEX not in ('memory', 'sql'):
+            raise ValueError(f"❌ Неизвестный RANK_INDEX: {self.RANK_INDEX} (допустимо: memory, sql)")
+        self.LEADERBOARD_CACHE_TTL = float(self.LEADERBOARD_CACHE_TTL)
+        if self.CITIES_BOT_LEVEL not in ('easy', 'normal', 'hard'):
+            raise ValueError(f"❌ Неизвестный CITIES_BOT_LEVEL: {self.CITIES_BOT_LEVEL} (допустимо: easy, normal, hard)")
+        if self.CITIES_START_WEIGHT not in ('population', 'uniform'):
+            raise ValueError(f"❌ Неизвестный CITIES_START_WEIGHT: {self.CITIES_START_WEIGHT} (допустимо: population, uniform)")
+
+        # URL для асинхронного движка (aiosqlite)
+        if not self.ASYNC_DB_URL:
+            if self.DB_URL.startswith('sqlite:'):
+                self.ASYNC_DB_URL = self.DB_URL.replace('sqlite:', 'sqlite+aiosqlite:', 1)
+            else:
+                self.ASYNC_DB_URL = self.DB_URL
+
         print("✅ Конфиг загружен успешно!")
 
 config = Config(
     BOT_TOKEN=os.getenv('TG_TOKEN'),
     ADMIN_IDS=os.getenv('ADMIN_IDS'),
-    DB_URL=os.getenv('DB_URL')
+    DB_URL=os.getenv('DB_URL'),
+    ASYNC_DB_URL=os.getenv('ASYNC_DB_URL'),
+    DB_MODE=os.getenv('DB_MODE', 'async'),
+    DB_EXECUTOR_WORKERS=os.getenv('DB_EXECUTOR_WORKERS', 4),
+    DB_PROFILE=os.getenv('DB_PROFILE', 'performance'),
+    DB_WRITE_MODE=os.getenv('DB_WRITE_MODE', 'direct'),
+    DB_WRITER_MAX_BATCH=os.getenv('DB_WRITER_MAX_BATCH', 64),
+    DB_WRITER_MAX_DELAY_MS=os.getenv('DB_WRITER_MAX_DELAY_MS', 2),
+    GAME_SESSION_MODE=os.getenv('GAME_SESSION_MODE', 'eager'),
+    GAME_STARTS_FLUSH_SECONDS=os.getenv('GAME_STARTS_FLUSH_SECONDS', 30),
+    PERIOD_PRUNE_SECONDS=os.getenv('PERIOD_PRUNE_SECONDS', 3600),
+    DB_PROFILER=os.getenv('DB_PROFILER', 'off'),
+    DB_SLOW_QUERY_MS=os.getenv('DB_SLOW_QUERY_MS', 100),
+    RANK_INDEX=os.getenv('RANK_INDEX', 'memory'),
+    LEADERBOARD_CACHE_TTL=os.getenv('LEADERBOARD_CACHE_TTL', 60),
+    CITIES_BOT_LEVEL=os.getenv('CITIES_BOT_LEVEL', 'normal'),
+    CITIES_START_WEIGHT=os.getenv('CITIES_START_WEIGHT', 'population')
 )
\ No newline at end of file
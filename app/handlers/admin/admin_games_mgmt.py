@@ -1,17 +1,16 @@
 from aiogram import Router, types
 from aiogram.filters import Command, CommandObject
-from database.engine import SessionLocal
-from repositories import GameRepository
+from database.session import DBSession
+from repositories.aio import AsyncGameRepository
 
 router = Router()
 
 @router.message(Command("games_list"))
-async def games_list(message: types.Message):
+async def games_list(message: types.Message, db: DBSession):
     """Список всех игр включая выключенные"""
-    db = SessionLocal()
     try:
-        game_repo = GameRepository(db)
-        games = game_repo.get_all_games()
+        game_repo = AsyncGameRepository(db)
+        games = await game_repo.get_all_games()
         
         if not games:
             await message.answer("🎮 Список игр пуст")
@@ -42,13 +41,12 @@ async def games_list(message: types.Message):
         await message.answer(games_text)
         
     except Exception as e:
+        await db.rollback()
         print(f"❌ Ошибка при получении списка игр: {e}")
         await message.answer("❌ Ошибка при получении списка игр")
-    finally:
-        db.close()
 
 @router.message(Command("game_toggle"))
-async def game_toggle(message: types.Message, command: CommandObject):
+async def game_toggle(message: types.Message, command: CommandObject, db: DBSession):
     """Включить/выключить игру"""
     if not command.args:
         await message.answer(
@@ -63,10 +61,9 @@ async def game_toggle(message: types.Message, command: CommandObject):
     
     game_code = command.args.strip().lower()
     
-    db = SessionLocal()
     try:
-        game_repo = GameRepository(db)
-        game = game_repo.get_game_by_code(game_code)
+        game_repo = AsyncGameRepository(db)
+        game = await game_repo.get_game_by_code(game_code)
         
         if not game:
             await message.answer(
@@ -76,7 +73,7 @@ async def game_toggle(message: types.Message, command: CommandObject):
             return
         
         # Переключаем статус игры
-        success = game_repo.toggle_game(game_code)
+        success = await game_repo.toggle_game(game_code)
         
         if success:
             new_status = "включена" if game.is_active else "выключена"
@@ -93,7 +90,6 @@ async def game_toggle(message: types.Message, command: CommandObject):
             await message.answer("❌ Ошибка при переключении игры")
             
     except Exception as e:
+        await db.rollback()
         print(f"❌ Ошибка при переключении игры: {e}")
-        await message.answer("❌ Ошибка при переключении игры")
-    finally:
-        db.close()
\ No newline at end of file
+        await message.answer("❌ Ошибка при переключении игры")
\ No newline at end of file
@@ -1,25 +1,24 @@
 from aiogram import Router, types
 from aiogram.filters import Command, CommandObject
-from database.engine import SessionLocal
-from repositories import AdminRepository, UserRepository
+from database.session import DBSession
+from repositories.aio import AsyncAdminRepository, AsyncUserRepository
 from app.config import config
 
 router = Router()
 
 @router.message(Command("admins_list"))
-async def admins_list(message: types.Message):
+async def admins_list(message: types.Message, db: DBSession):
     """Список всех админов"""
-    db = SessionLocal()
     try:
-        admin_repo = AdminRepository(db)
-        user_repo = UserRepository(db)
+        admin_repo = AsyncAdminRepository(db)
+        user_repo = AsyncUserRepository(db)
         
         admin_text = "👑 <b>Список администраторов</b>\n\n"
         
         # Супер-админы из config
         admin_text += "<b>🔐 Супер-админы (из config):</b>\n"
         for user_id in config.ADMIN_IDS:
-            user = user_repo.get_user_by_id(user_id)
+            user = await user_repo.get_user_by_id(user_id)
             if user:
                 username = f"@{user.username}" if user.username else user.first_name
                 admin_text += f"• {username} (ID: <code>{user.id}</code>) 👑\n"
@@ -27,7 +26,7 @@ async def admins_list(message: types.Message):
                 admin_text += f"• ID: <code>{user_id}</code> (пользователь не найден) 👑\n"
         
         # Админы из БД
-        db_admins = admin_repo.get_all_admins()
+        db_admins = await admin_repo.get_all_admins()
         if db_admins:
             admin_text += "\n<b>👥 Админы из БД:</b>\n"
             for admin, user in db_admins:
@@ -46,13 +45,12 @@ async def admins_list(message: types.Message):
         await message.answer(admin_text)
         
     except Exception as e:
+        await db.rollback()
         print(f"❌ Ошибка при получении списка админов: {e}")
         await message.answer("❌ Ошибка при получении списка админов")
-    finally:
-        db.close()
 
 @router.message(Command("admin_add"))
-async def admin_add(message: types.Message, command: CommandObject):
+async def admin_add(message: types.Message, command: CommandObject, db: DBSession):
     """Добавить админа"""
     if not command.args:
         await message.answer(
@@ -66,15 +64,14 @@ async def admin_add(message: types.Message, command: CommandObject):
         )
         return
     
-    db = SessionLocal()
     try:
         user_id = int(command.args.strip())
         
-        admin_repo = AdminRepository(db)
-        user_repo = UserRepository(db)
+        admin_repo = AsyncAdminRepository(db)
+        user_repo = AsyncUserRepository(db)
         
         # Проверяем существование пользователя
-        user = user_repo.get_user_by_id(user_id)
+        user = await user_repo.get_user_by_id(user_id)
         if not user:
             await message.answer("❌ Пользователь не найден")
             return
@@ -85,18 +82,18 @@ async def admin_add(message: types.Message, command: CommandObject):
             return
         
         # Проверяем, не админ ли уже в БД
-        if admin_repo.is_admin(user_id):
+        if await admin_repo.is_admin(user_id):
             await message.answer("❌ Этот пользователь уже администратор!")
             return
         
         # Находим ID добавляющего (того, кто вызывает команду)
-        added_by_user = user_repo.get_user_by_telegram_id(message.from_user.id)
+        added_by_user = await user_repo.get_user_by_telegram_id(message.from_user.id)
         if not added_by_user:
             await message.answer("❌ Ошибка: ваш профиль не найден в системе")
             return
         
         # Добавляем в админы
-        admin_repo.add_admin(user_id, added_by_user.id)
+        await admin_repo.add_admin(user_id, added_by_user.id)
         
         await message.answer(
             f"✅ <b>Пользователь добавлен в админы</b>\n\n"
@@ -109,6 +106,7 @@ async def admin_add(message: types.Message, command: CommandObject):
     except ValueError:
         await message.answer("❌ user_id должен быть числом")
     except Exception as e:
+        await db.rollback()
         error_msg = str(e)
         if "уже является администратором" in error_msg:
             await message.answer("❌ Этот пользователь уже администратор!")
@@ -117,11 +115,9 @@ async def admin_add(message: types.Message, command: CommandObject):
         else:
             print(f"❌ Ошибка при добавлении админа: {e}")
             await message.answer("❌ Ошибка при добавлении админа")
-    finally:
-        db.close()
 
 @router.message(Command("admin_remove"))
-async def admin_remove(message: types.Message, command: CommandObject):
+async def admin_remove(message: types.Message, command: CommandObject, db: DBSession):
     """Удалить админа"""
     if not command.args:
         await message.answer(
@@ -135,10 +131,9 @@ async def admin_remove(message: types.Message, command: CommandObject):
         )
         return
     
-    db = SessionLocal()
     try:
-        admin_repo = AdminRepository(db)
-        user_repo = UserRepository(db)
+        admin_repo = AsyncAdminRepository(db)
+        user_repo = AsyncUserRepository(db)
         
         # Пытаемся найти пользователя по ID
         try:
@@ -152,13 +147,13 @@ async def admin_remove(message: types.Message, command: CommandObject):
             await message.answer("❌ Нельзя удалить супер-админа из конфига!")
             return
         
-        user = user_repo.get_user_by_id(user_id)
+        user = await user_repo.get_user_by_id(user_id)
         if not user:
             await message.answer("❌ Пользователь не найден")
             return
         
         # Удаляем админа
-        success = admin_repo.remove_admin(user_id)
+        success = await admin_repo.remove_admin(user_id)
         
         if success:
             await message.answer(
@@ -172,7 +167,6 @@ async def admin_remove(message: types.Message, command: CommandObject):
             await message.answer("❌ Админ не найден в БД")
             
     except Exception as e:
+        await db.rollback()
         print(f"❌ Ошибка при удалении админа: {e}")
-        await message.answer("❌ Ошибка при удалении админа")
-    finally:
-        db.close()
\ No newline at end of file
+        await message.answer("❌ Ошибка при удалении админа")
\ No newline at end of file
@@ -13,7 +13,8 @@ async def admin_panel(message: types.Message):
         "/admin_stats - Общая статистика бота\n"
         "/stats_users - Статистика по пользователям\n" 
         "/stats_games - Статистика по играм\n"
-        "/stats_daily - Статистика за сегодня/неделю\n\n"
+        "/stats_daily - Статистика за сегодня/неделю\n"
+        "/sql_top [N|reset] - Самые долгие SQL запросы (DB_PROFILER=on)\n\n"
         
         "👥 <b>Пользователи:</b>\n"
         "/user_info &lt;user_id&gt; - Информация о пользователе\n"
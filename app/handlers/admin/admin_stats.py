@@ -1,26 +1,28 @@
 from aiogram import Router, types
 from aiogram.filters import Command
-from database.engine import SessionLocal
-from repositories import UserRepository, GameSessionRepository, GameRepository, RatingRepository
+from database.session import DBSession, get_db_executor_stats, get_group_writer_stats
+from repositories.aio import AsyncUserRepository, AsyncGameSessionRepository, AsyncGameRepository, AsyncRatingRepository
 from datetime import datetime, timedelta
+from html import escape
+from database.engine import sql_profiler
+from database.leaderboard_cache import leaderboard_cache
 
 router = Router()
 
 # 2. Статистика
 @router.message(Command("admin_stats"))
-async def admin_stats(message: types.Message):
+async def admin_stats(message: types.Message, db: DBSession):
     """Общая статистика бота"""
-    db = SessionLocal()
     try:
-        user_repo = UserRepository(db)
-        session_repo = GameSessionRepository(db)
+        user_repo = AsyncUserRepository(db)
+        session_repo = AsyncGameSessionRepository(db)
         
         # Собираем статистику
-        total_users = user_repo.get_total_users_count()
-        active_today = user_repo.get_active_today_count()
-        blocked_users = user_repo.get_blocked_users_count()
-        total_games = session_repo.get_total_sessions_count()
-        completed_games = session_repo.get_completed_sessions_count()
+        total_users = await user_repo.get_total_users_count()
+        active_today = await user_repo.get_active_today_count()
+        blocked_users = await user_repo.get_blocked_users_count()
+        total_games = await session_repo.get_total_sessions_count()
+        completed_games = await session_repo.get_completed_sessions_count()
         
         # Формируем ответ
         stats_text = (
@@ -41,6 +43,39 @@ async def admin_stats(message: types.Message):
             stats_text += f"• Процент завершения: <b>{completion_rate:.1f}%</b>\n\n"
         else:
             stats_text += "\n"
+        
+        # Нагрузка на пул потоков БД (только в режиме executor)
+        executor_stats = get_db_executor_stats()
+        if executor_stats:
+            stats_text += (
+                "🗄 <b>Пул БД (executor):</b>\n"
+                f"• Воркеры: <b>{executor_stats['busy_workers']}/{executor_stats['workers']}</b> заняты\n"
+                f"• Очередь: <b>{executor_stats['queue_depth']}</b> (макс. {executor_stats['max_queue_depth']})\n"
+                f"• Ожидание: <b>{executor_stats['avg_wait_ms']:.1f} мс</b> в среднем, "
+                f"{executor_stats['max_wait_ms']:.1f} мс макс.\n\n"
+            )
+
+        # Group commit записей (только при DB_WRITE_MODE=group)
+        writer_stats = get_group_writer_stats()
+        if writer_stats:
+            stats_text += (
+                "📝 <b>Group commit:</b>\n"
+                f"• Пачек: <b>{writer_stats['batches']}</b>, записей: <b>{writer_stats['items']}</b>\n"
+                f"• Размер пачки: <b>{writer_stats['avg_batch_size']:.1f}</b> в среднем, "
+                f"{writer_stats['max_batch_size']} макс.\n"
+                f"• Commit: <b>{writer_stats['avg_commit_ms']:.1f} мс</b>, очередь: {writer_stats['queue_depth']}\n\n"
+            )
+
+        # Кэш топов игроков (LEADERBOARD_CACHE_TTL > 0)
+        if leaderboard_cache.enabled:
+            cache_stats = leaderboard_cache.stats()
+            stats_text += (
+                "🏆 <b>Кэш топов:</b>\n"
+                f"• Попаданий: <b>{cache_stats['hits']}</b>, промахов: <b>{cache_stats['misses']}</b> "
+                f"({cache_stats['hit_rate']:.1f}%)\n"
+                f"• Текст: {cache_stats['text_hits']} попаданий, {cache_stats['text_misses']} промахов\n"
+                f"• Записей: {cache_stats['entries']}, сбросов: {cache_stats['invalidations']}\n\n"
+            )
             
         stats_text += (
             "📈 <b>Детальная статистика:</b>\n"
@@ -52,30 +87,28 @@ async def admin_stats(message: types.Message):
         await message.answer(stats_text)
         
     except Exception as e:
+        await db.rollback()
         print(f"❌ Ошибка при получении статистики: {e}")
         await message.answer("❌ Ошибка при получении статистики")
-    finally:
-        db.close()
 
 @router.message(Command("stats_users"))
-async def stats_users(message: types.Message):
+async def stats_users(message: types.Message, db: DBSession):
     """Статистика по пользователям"""
-    db = SessionLocal()
     try:
-        user_repo = UserRepository(db)
-        session_repo = GameSessionRepository(db)
+        user_repo = AsyncUserRepository(db)
+        session_repo = AsyncGameSessionRepository(db)
         
         # Статистика по пользователям
-        total_users = user_repo.get_total_users_count()
-        active_today = user_repo.get_active_today_count()
-        blocked_users = user_repo.get_blocked_users_count()
+        total_users = await user_repo.get_total_users_count()
+        active_today = await user_repo.get_active_today_count()
+        blocked_users = await user_repo.get_blocked_users_count()
         
         # Новые пользователи за неделю
         week_ago = datetime.now() - timedelta(days=7)
-        new_users_week = user_repo.get_users_since_count(week_ago)
+        new_users_week = await user_repo.get_users_since_count(week_ago)
         
         # Самые активные пользователи (топ-5 по количеству игр)
-        top_active_users = session_repo.get_most_active_users(limit=5)
+        top_active_users = await session_repo.get_most_active_users(limit=5)
         
         users_stats = (
             "👥 <b>Статистика по пользователям</b>\n\n"
@@ -95,28 +128,26 @@ async def stats_users(message: types.Message):
         await message.answer(users_stats)
         
     except Exception as e:
+        await db.rollback()
         print(f"❌ Ошибка при получении статистики пользователей: {e}")
         await message.answer("❌ Ошибка при получении статистики")
-    finally:
-        db.close()
 
 @router.message(Command("stats_games"))
-async def stats_games(message: types.Message):
+async def stats_games(message: types.Message, db: DBSession):
     """Статистика по играм"""
-    db = SessionLocal()
     try:
-        game_repo = GameRepository(db)
-        session_repo = GameSessionRepository(db)
-        rating_repo = RatingRepository(db)
+        game_repo = AsyncGameRepository(db)
+        session_repo = AsyncGameSessionRepository(db)
+        rating_repo = AsyncRatingRepository(db)
         
-        games = game_repo.get_all_games()
+        games = await game_repo.get_all_games()
         
         games_stats = "🎮 <b>Статистика по играм</b>\n\n"
         
         for game in games:
             # Статистика для каждой игры
-            game_stat = session_repo.get_game_stats(game.id)
-            top_players = rating_repo.get_top_players_by_game(game.id, limit=3)
+            game_stat = await session_repo.get_game_stats(game.id)
+            top_players = await rating_repo.get_top_players_by_game(game.id, limit=3)
             
             status = "🟢" if game.is_active else "🔴"
             games_stats += (
@@ -139,30 +170,28 @@ async def stats_games(message: types.Message):
         await message.answer(games_stats)
         
     except Exception as e:
+        await db.rollback()
         print(f"❌ Ошибка при получении статистики игр: {e}")
         await message.answer("❌ Ошибка при получении статистики")
-    finally:
-        db.close()
 
 @router.message(Command("stats_daily"))
-async def stats_daily(message: types.Message):
+async def stats_daily(message: types.Message, db: DBSession):
     """Статистика за сегодня/неделю"""
-    db = SessionLocal()
     try:
-        user_repo = UserRepository(db)
-        session_repo = GameSessionRepository(db)
+        user_repo = AsyncUserRepository(db)
+        session_repo = AsyncGameSessionRepository(db)
         
         today = datetime.now().date()
         week_ago = datetime.now() - timedelta(days=7)
         
         # Статистика за сегодня
-        new_users_today = user_repo.get_users_since_count(today)
-        games_today = session_repo.get_sessions_since_count(today)
-        active_users_today = user_repo.get_active_today_count()
+        new_users_today = await user_repo.get_users_since_count(today)
+        games_today = await session_repo.get_sessions_since_count(today)
+        active_users_today = await user_repo.get_active_today_count()
         
         # Статистика за неделю
-        new_users_week = user_repo.get_users_since_count(week_ago)
-        games_week = session_repo.get_sessions_since_count(week_ago)
+        new_users_week = await user_repo.get_users_since_count(week_ago)
+        games_week = await session_repo.get_sessions_since_count(week_ago)
         
         daily_stats = (
             "📅 <b>Статистика за период</b>\n\n"
@@ -190,7 +219,41 @@ async def stats_daily(message: types.Message):
         await message.answer(daily_stats)
         
     except Exception as e:
+        await db.rollback()
         print(f"❌ Ошибка при получении ежедневной статистики: {e}")
         await message.answer("❌ Ошибка при получении статистики")
-    finally:
-        db.close()
\ No newline at end of file
+
+
+@router.message(Command("sql_top"))
+async def sql_top(message: types.Message):
+    """Самые долгие SQL запросы по суммарному времени (профилировщик DB_PROFILER=on)"""
+    if sql_profiler is None:
+        await message.answer("ℹ️ Профилировщик SQL выключен. Включите DB_PROFILER=on и перезапустите бота")
+        return
+
+    args = message.text.split()[1:]
+    if args and args[0] == 'reset':
+        sql_profiler.reset()
+        await message.answer("🧹 Статистика SQL запросов сброшена")
+        return
+
+    limit = min(int(args[0]), 20) if args and args[0].isdigit() else 10  # Лимит длины сообщения Telegram
+    top_statements = sql_profiler.top(limit)
+    if not top_statements:
+        await message.answer("📭 Запросов пока не было")
+        return
+
+    text = f"🔬 <b>Топ-{len(top_statements)} SQL запросов по времени</b>\n\n"
+    for i, stats in enumerate(top_statements, 1):
+        statement = ' '.join(stats.statement.split())
+        if len(statement) > 150:
+            statement = statement[:150] + '...'
+        text += (
+            f"{i}. <b>{stats.total_time * 1000:.0f} мс</b> всего, {stats.count} раз, {stats.rows} строк, "
+            f"{stats.avg_time * 1000:.2f} мс в среднем, {stats.max_time * 1000:.1f} мс макс.\n"
+            f"• {escape(stats.repository_method)} / {escape(stats.handler)}\n"
+            f"<code>{escape(statement)}</code>\n\n"
+        )
+
+    text += f"🐢 Медленных запросов (≥ {sql_profiler.slow_query_ms:.0f} мс): <b>{len(sql_profiler.slow_queries)}</b>"
+    await message.answer(text)
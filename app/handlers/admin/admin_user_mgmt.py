@@ -1,13 +1,13 @@
 from aiogram import Router, types
 from aiogram.filters import Command, CommandObject
-from database.engine import SessionLocal
-from repositories import UserRepository, GameSessionRepository, RatingRepository
+from database.session import DBSession
+from repositories.aio import AsyncUserRepository, AsyncRatingRepository
 from app.config import config
 
 router = Router()
 
 @router.message(Command("user_info"))
-async def user_info(message: types.Message, command: CommandObject):
+async def user_info(message: types.Message, command: CommandObject, db: DBSession):
     """Информация о пользователе по ID"""
     if not command.args:
         await message.answer(
@@ -21,9 +21,8 @@ async def user_info(message: types.Message, command: CommandObject):
         )
         return
     
-    db = SessionLocal()
     try:
-        user_repo = UserRepository(db)
+        user_repo = AsyncUserRepository(db)
         
         # Пытаемся найти пользователя по ID
         try:
@@ -32,7 +31,7 @@ async def user_info(message: types.Message, command: CommandObject):
             await message.answer("❌ user_id должен быть числом")
             return
         
-        user = user_repo.get_user_by_id(user_id)
+        user = await user_repo.get_user_by_id(user_id)
         
         if not user:
             await message.answer("❌ Пользователь не найден")
@@ -69,13 +68,12 @@ async def user_info(message: types.Message, command: CommandObject):
         await message.answer(user_info_text)
         
     except Exception as e:
+        await db.rollback()
         print(f"❌ Ошибка при получении информации о пользователе: {e}")
         await message.answer("❌ Ошибка при получении информации о пользователе")
-    finally:
-        db.close()
 
 @router.message(Command("user_stats"))
-async def user_stats(message: types.Message, command: CommandObject):
+async def user_stats(message: types.Message, command: CommandObject, db: DBSession):
     """Статистика пользователя по играм"""
     if not command.args:
         await message.answer(
@@ -87,11 +85,7 @@ async def user_stats(message: types.Message, command: CommandObject):
         )
         return
     
-    db = SessionLocal()
     try:
-        user_repo = UserRepository(db)
-        rating_repo = RatingRepository(db)
-        
         # Пытаемся найти пользователя по ID
         try:
             user_id = int(command.args.strip())
@@ -99,38 +93,34 @@ async def user_stats(message: types.Message, command: CommandObject):
             await message.answer("❌ user_id должен быть числом")
             return
         
-        user = user_repo.get_user_by_id(user_id)
+        # Пользователь, счетчики сессий и рейтинги по играм - одним запросом
+        dashboard = await AsyncRatingRepository(db).get_user_dashboard(user_id=user_id)
         
-        if not user:
+        if not dashboard:
             await message.answer("❌ Пользователь не найден")
             return
         
-        # Получаем статистику пользователя
-        user_stats_data = user_repo.get_user_stats(user_id)
-        ratings = rating_repo.get_user_ratings(user_id)
-        
         # Формируем статистику
         stats_text = (
             f"📊 <b>Статистика пользователя</b>\n"
-            f"👤 <b>{user.first_name}</b> (ID: {user.id})\n\n"
+            f"👤 <b>{dashboard.first_name}</b> (ID: {dashboard.user_id})\n\n"
             
             f"🎮 <b>Общая игровая статистика:</b>\n"
-            f"• Всего игр: <b>{user_stats_data['total_games']}</b>\n"
-            f"• Завершено: <b>{user_stats_data['completed_games']}</b>\n"
+            f"• Всего игр: <b>{dashboard.sessions}</b>\n"
+            f"• Завершено: <b>{dashboard.completed}</b>\n"
         )
         
-        if user_stats_data['total_games'] > 0:
-            completion_rate = user_stats_data['completion_rate']
-            stats_text += f"• Процент завершения: <b>{completion_rate:.1f}%</b>\n\n"
+        if dashboard.sessions > 0:
+            stats_text += f"• Процент завершения: <b>{dashboard.completion_rate:.1f}%</b>\n\n"
         else:
             stats_text += "\n"
         
         # Рейтинги по играм
-        if ratings:
+        if dashboard.ratings:
             stats_text += "🏆 <b>Рейтинги по играм:</b>\n"
-            for rating, game in ratings:  # ← РАСПАКОВЫВАЕМ КОРТЕЖ
+            for rating in dashboard.ratings:
                 stats_text += (
-                    f"• {game.name}: "  # ← используем game из кортежа
+                    f"• {rating.game_name}: "
                     f"<b>{rating.best_score}</b> (лучший), "
                     f"<b>{rating.average_score:.1f}</b> (средний)\n"
                 )
@@ -140,13 +130,12 @@ async def user_stats(message: types.Message, command: CommandObject):
         await message.answer(stats_text)
         
     except Exception as e:
+        await db.rollback()
         print(f"❌ Ошибка при получении статистики пользователя: {e}")
         await message.answer("❌ Ошибка при получении статистики пользователя")
-    finally:
-        db.close()
 
 @router.message(Command("user_ban"))
-async def user_ban(message: types.Message, command: CommandObject):
+async def user_ban(message: types.Message, command: CommandObject, db: DBSession):
     """Блокировка пользователя"""
     if not command.args:
         await message.answer(
@@ -172,12 +161,11 @@ async def user_ban(message: types.Message, command: CommandObject):
         await message.answer("❌ user_id должен быть числом")
         return
     
-    db = SessionLocal()
     try:
-        user_repo = UserRepository(db)
+        user_repo = AsyncUserRepository(db)
         
         # Проверяем существование пользователя
-        user = user_repo.get_user_by_id(user_id)
+        user = await user_repo.get_user_by_id(user_id)
         if not user:
             await message.answer("❌ Пользователь не найден")
             return
@@ -188,7 +176,7 @@ async def user_ban(message: types.Message, command: CommandObject):
             return
         
         # Блокируем пользователя
-        success = user_repo.block_user(user_id, reason)
+        success = await user_repo.block_user(user_id, reason)
         
         if success:
             await message.answer(
@@ -202,13 +190,12 @@ async def user_ban(message: types.Message, command: CommandObject):
             await message.answer("❌ Ошибка при блокировке пользователя")
             
     except Exception as e:
+        await db.rollback()
         print(f"❌ Ошибка при блокировке пользователя: {e}")
         await message.answer("❌ Ошибка при блокировке пользователя")
-    finally:
-        db.close()
 
 @router.message(Command("user_unban"))
-async def user_unban(message: types.Message, command: CommandObject):
+async def user_unban(message: types.Message, command: CommandObject, db: DBSession):
     """Разблокировать пользователя"""
     if not command.args:
         await message.answer(
@@ -220,9 +207,8 @@ async def user_unban(message: types.Message, command: CommandObject):
         )
         return
     
-    db = SessionLocal()
     try:
-        user_repo = UserRepository(db)
+        user_repo = AsyncUserRepository(db)
         
         # Пытаемся найти пользователя по ID
         try:
@@ -231,7 +217,7 @@ async def user_unban(message: types.Message, command: CommandObject):
             await message.answer("❌ user_id должен быть числом")
             return
         
-        user = user_repo.get_user_by_id(user_id)
+        user = await user_repo.get_user_by_id(user_id)
         
         if not user:
             await message.answer("❌ Пользователь не найден")
@@ -243,7 +229,7 @@ async def user_unban(message: types.Message, command: CommandObject):
             return
         
         # Разблокируем пользователя
-        success = user_repo.unblock_user(user_id)
+        success = await user_repo.unblock_user(user_id)
         
         if success:
             await message.answer(
@@ -256,7 +242,6 @@ async def user_unban(message: types.Message, command: CommandObject):
             await message.answer("❌ Ошибка при разблокировке пользователя")
             
     except Exception as e:
+        await db.rollback()
         print(f"❌ Ошибка при разблокировке пользователя: {e}")
-        await message.answer("❌ Ошибка при разблокировке пользователя")
-    finally:
-        db.close()
\ No newline at end of file
+        await message.answer("❌ Ошибка при разблокировке пользователя")
\ No newline at end of file
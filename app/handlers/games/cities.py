@@ -1,64 +1,84 @@
 import asyncio
-from datetime import datetime
+import time
 from aiogram import Router, F, Bot
 from aiogram.types import Message
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 
-from database.engine import SessionLocal
-from repositories import CityRepository, GameRepository, GameSessionRepository, UserRepository, RatingRepository
+from app.config import config
+from database.city_index import CityIndex, is_used, mark_used
+from database.city_strategy import choose_bot_city
+from database.session import DBSession
+from repositories.aio import AsyncCityRepository, AsyncGameRepository, AsyncGameSessionRepository, AsyncUserRepository
 from utils.states import CitiesStates
 
 # Создаем роутер
 router = Router()
 
-def normalize_city_name(city_name: str) -> str:
-    """Нормализует название города для поиска"""
-    return city_name.strip().title()
+# Уровни бота в /cities <уровень>
+LEVEL_ALIASES = {
+    'easy': 'easy', 'легко': 'easy', 'легкий': 'easy',
+    'normal': 'normal', 'норма': 'normal', 'средний': 'normal',
+    'hard': 'hard', 'сложно': 'hard', 'сложный': 'hard'
+}
+LEVEL_NAMES = {'easy': 'легкий', 'normal': 'средний', 'hard': 'сложный'}
 
-def get_game_letter(city_name: str) -> str:
-    """Определяет игровую букву для следующего города (последняя буква с учетом правил)"""
-    # Убираем пробелы и дефисы, переводим в верхний регистр
-    clean_city = city_name.replace(' ', '').replace('-', '').upper()
-    
-    # Идем с конца и ищем первую подходящую букву (игнорируя Ь,Ъ,Ы,Й)
-    index = len(clean_city) - 1
-    bad_letters = ['Ь', 'Ъ', 'Ы', 'Й']
-    
-    while index >= 0:
-        current_char = clean_city[index]
-        if current_char not in bad_letters:
-            return current_char
-        index -= 1
-    
-    # Если все буквы "плохие", берем последнюю
-    return clean_city[-1]
+# Сколько похожих городов предлагать, если название неоднозначно
+MAX_SUGGESTIONS = 3
 
-def get_first_letter(city_name: str) -> str:
-    """Получает первую букву города"""
-    return city_name.strip()[0].upper() if city_name.strip() else ''
+def normalize_city_name(city_name: str) -> str:
+    """Нормализует название города для вывода (поиск - по normalize_city_key)"""
+    return " ".join(city_name.split()).title()
 
 class CitiesGame:
-    """Класс для управления игровой сессией в города"""
+    """
+    Игровая сессия в города. Состоит из чисел и уровня бота: использованные
+    города - отсортированный список id, поэтому в FSM хранится небольшой
+    словарь (to_state), а не набор названий, и его размер зависит только от числа ходов
+    """
+    
+    __slots__ = (
+        'user_id', 'used_ids', 'current_city_id', 'user_score', 'bot_score', 'moves_count', 'started_at',
+        'level', 'remaining'
+    )
     
-    def __init__(self, user_id: int):
+    def __init__(self, user_id: int, used_ids: list[int] = None, current_city_id: int = None,
+                 user_score: int = 0, bot_score: int = 0, moves_count: int = 0, started_at: int = None,
+                 level: str = 'normal', remaining: list[int] = None):
         self.user_id = user_id
-        self.used_cities = set()      # Использованные города
-        self.current_city = None      # Текущий город
-        self.user_score = 0           # Счет пользователя
-        self.bot_score = 0            # Счет бота
-        self.moves_count = 0          # Количество ходов
-        self.start_time = datetime.now()
+        self.used_ids = used_ids or []          # Использованные города (id по возрастанию)
+        self.current_city_id = current_city_id  # id текущего города
+        self.level = level                      # Уровень бота: easy, normal, hard
+        self.remaining = remaining              # Неиспользованные города по буквам индекса
+        self.user_score = user_score            # Счет пользователя
+        self.bot_score = bot_score              # Счет бота
+        self.moves_count = moves_count          # Количество ходов
+        self.started_at = started_at if started_at is not None else int(time.time())
+    
+    @classmethod
+    def from_state(cls, state: dict) -> 'CitiesGame':
+        """Восстанавливает игру из словаря в FSM"""
+        return cls(**state)
+    
+    def to_state(self) -> dict:
+        """Словарь для FSM: целые числа, списки чисел и уровень"""
+        return {field: getattr(self, field) for field in self.__slots__}
     
-    def add_used_city(self, city_name: str):
-        """Добавляет город в использованные"""
-        normalized_name = normalize_city_name(city_name)
-        self.used_cities.add(normalized_name)
+    def set_current_city(self, city_index: CityIndex, city_id: int):
+        """Делает город текущим, отмечает его использованным и уменьшает счетчик его буквы"""
+        if self.remaining is None:
+            self.remaining = city_index.letter_counts(self.used_ids)
+        if mark_used(self.used_ids, city_id):
+            self.remaining[city_index.letter_position(city_index.first_letter(city_id))] -= 1
+        self.current_city_id = city_id
     
-    def is_city_used(self, city_name: str) -> bool:
+    def is_city_used(self, city_id: int) -> bool:
         """Проверяет, использовался ли город"""
-        normalized_name = normalize_city_name(city_name)
-        return normalized_name in self.used_cities
+        return is_used(self.used_ids, city_id)
+    
+    def choose_bot_city(self, city_index: CityIndex, letter: str) -> int | None:
+        """Город бота на букву по уровню игры (None - города кончились)"""
+        return choose_bot_city(city_index, letter, self.used_ids, self.remaining, self.level)
     
     def increment_user_score(self):
         """Увеличивает счет пользователя"""
@@ -71,74 +91,72 @@ class CitiesGame:
         self.moves_count += 1
 
 
-async def save_game_results(session_id: int, user_id: int, game_id: int, user_score: int, moves_count: int):
-    """Сохранение результатов игры в БД"""
-    db = SessionLocal()
+async def save_game_results(db: DBSession, game_session: dict, user_score: int, moves_count: int):
+    """Сохранение результатов игры в БД (в сессии текущего update)"""
     try:
-        session_repo = GameSessionRepository(db)
-        rating_repo = RatingRepository(db)
-        
-        # Сохраняем сессию
-        session_repo.complete_session(session_id, user_score, moves_count)
+        session_repo = AsyncGameSessionRepository(db)
         
-        # Обновляем рейтинг
-        rating_repo.update_rating(user_id, game_id, user_score)
+        # Завершаем сессию - рейтинг обновляется в том же вызове
+        await session_repo.finish_session(game_session, user_score, moves_count)
         
     except Exception as e:
+        await db.rollback()
         print(f"Ошибка при сохранении результатов: {e}")
-    finally:
-        db.close()
 
 
 @router.message(Command("cities"))
-async def start_cities(message: Message, state: FSMContext):
-    """Начало игры в города"""
-    db = SessionLocal()
-    
+async def start_cities(message: Message, command: CommandObject, state: FSMContext, db: DBSession):
+    """Начало игры в города: /cities [easy|normal|hard]"""
     try:
-        city_repo = CityRepository(db)
-        game_repo = GameRepository(db)
-        user_repo = UserRepository(db)
+        level = LEVEL_ALIASES.get((command.args or config.CITIES_BOT_LEVEL).strip().lower())
+        if level is None:
+            await message.answer(
+                "❌ Неизвестный уровень. Используйте: /cities easy, /cities normal или /cities hard"
+            )
+            return
+        
+        city_repo = AsyncCityRepository(db)
+        game_repo = AsyncGameRepository(db)
+        user_repo = AsyncUserRepository(db)
 
-        user = user_repo.get_user_by_telegram_id(message.from_user.id)
+        user = await user_repo.get_user_by_telegram_id(message.from_user.id)
 
         if not user:
             await message.answer("❌ Сначала используй /start для регистрации")
             return
         
         # Получаем игру "Города" из БД
-        cities_game_db = game_repo.get_game_by_code("cities")
+        cities_game_db = await game_repo.get_game_by_code("cities")
         if not cities_game_db:
             await message.answer("❌ Игра 'Города' временно недоступна")
             return
         
         # Создаем игровую сессию
-        cities_game = CitiesGame(user.id)
+        cities_game = CitiesGame(user.id, level=level)
         
-        # Получаем случайный город для начала игры
-        start_city = city_repo.get_random_start_city()
-        if not start_city:
+        # Получаем случайный город для начала игры из индекса в памяти
+        city_index = await city_repo.get_city_index()
+        start_city_id = city_index.random_city()
+        if start_city_id is None:
             await message.answer("❌ В базе данных нет городов для игры!")
             return
         
-        cities_game.current_city = start_city.name
-        cities_game.add_used_city(start_city.name)
+        start_city = city_index.name(start_city_id)
+        cities_game.set_current_city(city_index, start_city_id)
         
-        # Создаем сессию в БД
-        session_repo = GameSessionRepository(db)
-        session = session_repo.create_session(user.id, cities_game_db.id)
+        # Начинаем сессию (в режиме lazy строка в БД появится при завершении)
+        session_repo = AsyncGameSessionRepository(db)
+        game_session = await session_repo.start_session(user.id, cities_game_db.id)
         
         # Сохраняем в state
         await state.update_data(
-            cities_game=cities_game,
-            session_id=session.id,
-            user_id=user.id,
-            game_id=cities_game_db.id
+            cities_game=cities_game.to_state(),
+            game_session=game_session
         )
         await state.set_state(CitiesStates.playing)
         
         # Определяем букву для первого хода пользователя
-        first_letter = get_game_letter(start_city.name)
+        first_letter = city_index.game_letter(start_city_id)
         
         # Показываем начало игры
         start_text = (
@@ -148,31 +166,26 @@ async def start_cities(message: Message, state: FSMContext):
             f"• Город должен существовать и не использоваться ранее\n"
             f"• Буквы Ь, Ъ, Ы, Й пропускаются\n"
             f"• Игра до первой ошибки\n\n"
+            f"🤖 Уровень бота: <b>{LEVEL_NAMES[level]}</b> (/cities easy | normal | hard)\n\n"
             f"🎮 <b>Начинаю я:</b>\n"
-            f"<code>{start_city.name}</code>\n\n"
+            f"<code>{start_city}</code>\n\n"
             f"➡️ Теперь ваш ход! Назовите город на букву <b>«{first_letter}»</b>"
         )
         
         await message.answer(start_text)
         
     except Exception as e:
+        await db.rollback()
         await message.answer(f"❌ Ошибка при запуске игры: {e}")
-    finally:
-        db.close()
 
 
 @router.message(CitiesStates.playing, F.text)
-async def handle_city(message: Message, state: FSMContext):
+async def handle_city(message: Message, state: FSMContext, db: DBSession):
     """Обработка хода пользователя"""
-    db = SessionLocal()
-    
     try:
         data = await state.get_data()
-        cities_game = data.get("cities_game")
-        session_id = data.get("session_id")
-        user_id = data.get("user_id")
-        game_id = data.get("game_id")
-        city_repo = CityRepository(db)
+        cities_game = CitiesGame.from_state(data["cities_game"]) if data.get("cities_game") else None
+        game_session = data.get("game_session")
         
         if not cities_game:
             await message.answer("❌ Ошибка: данные игры не найдены")
@@ -191,9 +204,30 @@ async def handle_city(message: Message, state: FSMContext):
             await message.answer("❌ Название города должно содержать хотя бы 3 буквы!")
             return
         
-        # 1. Проверяем существование города
-        if not city_repo.city_exists(user_city):
-            await save_game_results(session_id, user_id, game_id, cities_game.user_score, cities_game.moves_count)
+        # Ход проверяется по индексу городов в памяти, без запросов к БД
+        city_index = await AsyncCityRepository(db).get_city_index()
+        
+        # 1. Проверяем существование города (с учетом ё/е, дефисов и одной опечатки)
+        city_ids = city_index.lookup(user_city)
+        if len(city_ids) > 1:
+            # Из нескольких похожих городов подходит только один - принимаем его, иначе переспрашиваем
+            expected_letter = city_index.game_letter(cities_game.current_city_id)
+            fitting = [
+                city_id for city_id in city_ids
+                if city_index.first_letter(city_id) == expected_letter and not cities_game.is_city_used(city_id)
+            ]
+            if len(fitting) != 1:
+                suggestions = ", ".join(f"«{city_index.name(city_id)}»" for city_id in (fitting or city_ids)[:MAX_SUGGESTIONS])
+                await message.answer(
+                    f"🤔 Не понял, какой город вы имели в виду: {suggestions}?\n"
+                    f"Напишите название точнее."
+                )
+                return
+            city_ids = fitting
+        
+        city_id = city_ids[0] if city_ids else None
+        if city_id is None:
+            await save_game_results(db, game_session, cities_game.user_score, cities_game.moves_count)
             await message.answer(
                 f"💔 <b>Город не найден!</b>\n\n"
                 f"Город «{user_city}» не существует в нашей базе.\n\n"
@@ -205,9 +239,13 @@ async def handle_city(message: Message, state: FSMContext):
             await state.clear()
             return
         
+        # Название с опечаткой показываем так, как оно записано в базе
+        corrected = city_index.find(user_city) is None
+        user_city = city_index.name(city_id)
+        
         # 2. Проверяем, не использовался ли город
-        if cities_game.is_city_used(user_city):
-            await save_game_results(session_id, user_id, game_id, cities_game.user_score, cities_game.moves_count)
+        if cities_game.is_city_used(city_id):
+            await save_game_results(db, game_session, cities_game.user_score, cities_game.moves_count)
             await message.answer(
                 f"💔 <b>Город уже использовался!</b>\n\n"
                 f"Город «{user_city}» уже называли в этой игре.\n\n"
@@ -220,11 +258,11 @@ async def handle_city(message: Message, state: FSMContext):
             return
         
         # 3. Проверяем правильность буквы
-        expected_letter = get_game_letter(cities_game.current_city)
-        actual_letter = get_first_letter(user_city)
+        expected_letter = city_index.game_letter(cities_game.current_city_id)
+        actual_letter = city_index.first_letter(city_id)
         
         if actual_letter != expected_letter:
-            await save_game_results(session_id, user_id, game_id, cities_game.user_score, cities_game.moves_count)
+            await save_game_results(db, game_session, cities_game.user_score, cities_game.moves_count)
             await message.answer(
                 f"💔 <b>Неверная буква!</b>\n\n"
                 f"Город должен начинаться на букву «{expected_letter}», а не «{actual_letter}».\n\n"
@@ -237,46 +275,17 @@ async def handle_city(message: Message, state: FSMContext):
             return
         
         # Город прошел все проверки
-        cities_game.add_used_city(user_city)
+        cities_game.set_current_city(city_index, city_id)
         cities_game.increment_user_score()
         
-        # Ход бота
-        game_letter = get_game_letter(user_city)
-        bot_city = city_repo.get_city_for_bot(game_letter, cities_game.used_cities)
-        
-        if not bot_city:
-            # Пользователь выиграл - города закончились
-            await save_game_results(session_id, user_id, game_id, cities_game.user_score, cities_game.moves_count)
-            await message.answer(
-                f"🎉 <b>Поздравляю! Вы выиграли!</b>\n\n"
-                f"Я не нашел города на букву «{game_letter}».\n\n"
-                f"📊 <b>Результаты:</b>\n"
-                f"• Правильных ходов: {cities_game.user_score}\n"
-                f"• Всего ходов: {cities_game.moves_count}\n"
-                f"• Очков заработано: {cities_game.user_score}\n\n"
-                f"🎮 Сыграть еще раз: /cities\n"
-                f"📈 Статистика: /profile"
-            )
-            await state.clear()
-            return
+        # Ход бота по уровню игры: easy - город, оставляющий игроку больше всего ответов,
+        # normal - случайный, hard - оставляющий меньше всего
+        game_letter = city_index.game_letter(city_id)
+        bot_city_id = cities_game.choose_bot_city(city_index, game_letter)
         
-        # ВАЖНО: Проверяем, что город бота не использовался (дополнительная защита)
-        if cities_game.is_city_used(bot_city):
-            # Если бот попытался использовать уже названный город - ищем другой
-            available_cities = city_repo.get_cities_by_first_letter(game_letter, cities_game.used_cities)
-            
-            # Ищем первый неиспользованный город
-            for city_obj in available_cities:
-                if not cities_game.is_city_used(city_obj.name):
-                    bot_city = city_obj.name
-                    break
-            else:
-                # Если все города использованы - пользователь выиграл
-                bot_city = None
-        
-        if not bot_city:
+        if bot_city_id is None:
             # Пользователь выиграл - города закончились
-            await save_game_results(session_id, user_id, game_id, cities_game.user_score, cities_game.moves_count)
+            await save_game_results(db, game_session, cities_game.user_score, cities_game.moves_count)
             await message.answer(
                 f"🎉 <b>Поздравляю! Вы выиграли!</b>\n\n"
                 f"Я не нашел города на букву «{game_letter}».\n\n"
@@ -291,39 +300,37 @@ async def handle_city(message: Message, state: FSMContext):
             return
         
         # Бот делает успешный ход
-        cities_game.add_used_city(bot_city)
+        bot_city = city_index.name(bot_city_id)
+        cities_game.set_current_city(city_index, bot_city_id)
         cities_game.increment_bot_score()
-        cities_game.current_city = bot_city
         
-        await state.update_data(cities_game=cities_game)
+        await state.update_data(cities_game=cities_game.to_state())
         
-        next_letter = get_game_letter(bot_city)
+        next_letter = city_index.game_letter(bot_city_id)
         await message.answer(
-            f"✅ <b>Принимаю!</b> Город «{user_city}»\n\n"
+            f"✅ <b>Принимаю!</b> Город «{user_city}»"
+            f"{' (исправил опечатку)' if corrected else ''}\n\n"
             f"🤖 <b>Мой ход:</b>\n"
             f"<code>{bot_city}</code>\n\n"
             f"➡️ Теперь ваш ход! Назовите город на букву <b>«{next_letter}»</b>"
         )
         
     except Exception as e:
+        await db.rollback()
         await message.answer(f"❌ Ошибка при обработке хода: {e}")
-    finally:
-        db.close()
 
 
 @router.message(Command("stop"))
-async def stop_cities(message: Message, state: FSMContext):
+async def stop_cities(message: Message, state: FSMContext, db: DBSession):
     """Принудительное завершение игры"""
     
     data = await state.get_data()
-    cities_game = data.get("cities_game")
-    session_id = data.get("session_id")
-    user_id = data.get("user_id")
-    game_id = data.get("game_id")
+    cities_game = CitiesGame.from_state(data["cities_game"]) if data.get("cities_game") else None
+    game_session = data.get("game_session")
     
     if cities_game:
         # СОХРАНЯЕМ ТЕКУЩИЙ РЕЗУЛЬТАТ В БД
-        await save_game_results(session_id, user_id, game_id, cities_game.user_score, cities_game.moves_count)
+        await save_game_results(db, game_session, cities_game.user_score, cities_game.moves_count)
         
         await message.answer(
             f"⏹️ <b>Игра завершена</b>\n\n"
@@ -4,36 +4,35 @@ from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 
 from utils.states import GuessNumberState
-from database.engine import SessionLocal
-from repositories import UserRepository, GameRepository, GameSessionRepository
+from database.session import DBSession
+from repositories.aio import AsyncUserRepository, AsyncGameRepository, AsyncGameSessionRepository
 
 router = Router()
 
 @router.message(Command("guess_number"))
-async def start_guess_number(message: types.Message, state: FSMContext):
+async def start_guess_number(message: types.Message, state: FSMContext, db: DBSession):
     """Начало игры - команда /guess_number"""
     
-    db = SessionLocal()
     try:
         # 1. НАХОДИМ ПОЛЬЗОВАТЕЛЯ В БД
-        user_repo = UserRepository(db)
-        user = user_repo.get_user_by_telegram_id(message.from_user.id)
+        user_repo = AsyncUserRepository(db)
+        user = await user_repo.get_user_by_telegram_id(message.from_user.id)
         
         if not user:
             await message.answer("❌ Сначала используй /start для регистрации")
             return
         
         # 2. НАХОДИМ ИГРУ В БД
-        game_repo = GameRepository(db)
-        game = game_repo.get_game_by_code("guess_number")
+        game_repo = AsyncGameRepository(db)
+        game = await game_repo.get_game_by_code("guess_number")
         
         if not game:
             await message.answer("❌ Игра временно недоступна")
             return
         
-        # 3. СОЗДАЕМ ИГРОВУЮ СЕССИЮ
-        session_repo = GameSessionRepository(db)
-        session = session_repo.create_session(user.id, game.id)
+        # 3. НАЧИНАЕМ ИГРОВУЮ СЕССИЮ
+        session_repo = AsyncGameSessionRepository(db)
+        game_session = await session_repo.start_session(user.id, game.id)
         
         # 4. ГЕНЕРИРУЕМ СЛУЧАЙНОЕ ЧИСЛО
         secret_number = random.randint(1, 100)
@@ -43,9 +42,7 @@ async def start_guess_number(message: types.Message, state: FSMContext):
             secret_number=secret_number,
             attempts=0,
             max_attempts=10,
-            session_id=session.id,  # Сохраняем ID сессии
-            user_id=user.id,
-            game_id=game.id
+            game_session=game_session  # Данные сессии для ее завершения
         )
         
         await state.set_state(GuessNumberState.playing)
@@ -59,23 +56,21 @@ async def start_guess_number(message: types.Message, state: FSMContext):
         )
         
     except Exception as e:
+        await db.rollback()
         print(f"❌ Ошибка при старте игры: {e}")
         await message.answer("❌ Произошла ошибка. Попробуйте позже.")
-    finally:
-        db.close()
 
 @router.message(GuessNumberState.playing, F.text)
-async def process_guess(message: types.Message, state: FSMContext):
+async def process_guess(message: types.Message, state: FSMContext, db: DBSession):
     """Обработка попытки угадать число"""
     
-    db = SessionLocal()
     try:
         # Получаем данные из состояния
         data = await state.get_data()
         secret_number = data['secret_number']
         attempts = data['attempts'] + 1
         max_attempts = data['max_attempts']
-        session_id = data['session_id']
+        game_session = data['game_session']
         
         # Проверяем что введено число
         try:
@@ -102,8 +97,8 @@ async def process_guess(message: types.Message, state: FSMContext):
             score = max(10, 100 - attempts * 5)  # Расчет очков
             
             # СОХРАНЯЕМ РЕЗУЛЬТАТЫ В БД
-            session_repo = GameSessionRepository(db)
-            session_repo.complete_session(session_id, score, attempts)
+            session_repo = AsyncGameSessionRepository(db)
+            await session_repo.finish_session(game_session, score, attempts)
             
             await message.answer(
                 f"🎉 <b>Поздравляю! Ты угадал число {secret_number}!</b>\n\n"
@@ -122,8 +117,8 @@ async def process_guess(message: types.Message, state: FSMContext):
         # Проверяем не закончились ли попытки
         if attempts >= max_attempts:
             # СОХРАНЯЕМ РЕЗУЛЬТАТ ПРОИГРЫША В БД
-            session_repo = GameSessionRepository(db)
-            session_repo.complete_session(session_id, 0, attempts)  # 0 очков за проигрыш
+            session_repo = AsyncGameSessionRepository(db)
+            await session_repo.finish_session(game_session, 0, attempts)  # 0 очков за проигрыш
             
             await message.answer(
                 f"💔 К сожалению, попытки закончились!\n"
@@ -142,7 +137,6 @@ async def process_guess(message: types.Message, state: FSMContext):
         )
         
     except Exception as e:
+        await db.rollback()
         print(f"❌ Ошибка при обработке попытки: {e}")
-        await message.answer("❌ Произошла ошибка. Попробуйте позже.")
-    finally:
-        db.close()
\ No newline at end of file
+        await message.answer("❌ Произошла ошибка. Попробуйте позже.")
\ No newline at end of file
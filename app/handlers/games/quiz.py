@@ -6,8 +6,8 @@ from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from database.engine import SessionLocal
-from repositories import QuizRepository, GameRepository, GameSessionRepository, RatingRepository, UserRepository
+from database.session import DBSession, session_scope
+from repositories.aio import AsyncQuizRepository, AsyncGameRepository, AsyncGameSessionRepository, AsyncRatingRepository, AsyncUserRepository
 from utils.states import QuizStates
 
 # Создаем роутер
@@ -140,18 +140,18 @@ async def question_timer(bot: Bot, chat_id: int, message_id: int, state: FSMCont
         print(f"❌ Ошибка в таймере: {e}")
 
 
-async def show_question(bot: Bot, chat_id: int, state: FSMContext):
+async def show_question(bot: Bot, chat_id: int, state: FSMContext, db: DBSession = None):
     """Показывает текущий вопрос"""
     data = await state.get_data()
     quiz_game = data.get("quiz_game")
     
     if not quiz_game or quiz_game.is_finished():
-        await finish_quiz(bot, chat_id, state)
+        await finish_quiz(bot, chat_id, state, db)
         return
     
     question = quiz_game.get_current_question()
     if not question:
-        await finish_quiz(bot, chat_id, state)
+        await finish_quiz(bot, chat_id, state, db)
         return
     
     # Создаем клавиатуру с вариантами ответов
@@ -183,11 +183,16 @@ async def show_question(bot: Bot, chat_id: int, state: FSMContext):
     )
 
 
-async def finish_quiz(bot: Bot, chat_id: int, state: FSMContext):
+async def finish_quiz(bot: Bot, chat_id: int, state: FSMContext, db: DBSession = None):
     """Завершение викторины и сохранение результатов"""
+    if db is None:
+        # Вызов из таймера вопроса - вне обработки update, открываем свою транзакцию
+        async with session_scope() as db:
+            return await finish_quiz(bot, chat_id, state, db)
+    
     data = await state.get_data()
     quiz_game = data.get("quiz_game")
-    game_session_id = data.get("game_session_id")
+    game_session = data.get("game_session")
     
     # Отменяем таймер если есть
     if quiz_game:
@@ -199,13 +204,12 @@ async def finish_quiz(bot: Bot, chat_id: int, state: FSMContext):
         return
     
     # Сохраняем результаты в БД
-    db = SessionLocal()
     try:
-        session_repo = GameSessionRepository(db)
-        game_repo = GameRepository(db)
+        session_repo = AsyncGameSessionRepository(db)
+        game_repo = AsyncGameRepository(db)
         
         # Получаем игру "Викторина"
-        quiz_game_db = game_repo.get_game_by_code("quiz")
+        quiz_game_db = await game_repo.get_game_by_code("quiz")
         
         # Считаем количество правильных ответов для attempts
         correct_answers = sum(1 for i, answer in enumerate(quiz_game.user_answers) 
@@ -213,8 +217,8 @@ async def finish_quiz(bot: Bot, chat_id: int, state: FSMContext):
         
         # Обновляем игровую сессию
         # attempts = количество правильных ответов (успешные "попытки")
-        session_repo.complete_session(
-            game_session_id, 
+        await session_repo.finish_session(
+            game_session,
             score=quiz_game.total_score,
             attempts=correct_answers
         )
@@ -232,31 +236,29 @@ async def finish_quiz(bot: Bot, chat_id: int, state: FSMContext):
         await bot.send_message(chat_id, result_text)
         
     except Exception as e:
+        await db.rollback()
         await bot.send_message(chat_id, f"❌ Ошибка при сохранении результатов: {e}")
     finally:
-        db.close()
         await state.clear()
 
 
 @router.message(Command("quiz"))
-async def start_quiz(message: Message, state: FSMContext, bot: Bot):
+async def start_quiz(message: Message, state: FSMContext, bot: Bot, db: DBSession):
     """Начало викторины"""
-    db = SessionLocal()
-    
     # Получаем вопросы из БД
     try:
-        quiz_repo = QuizRepository(db)
-        game_repo = GameRepository(db)
-        user_repo = UserRepository(db)
+        quiz_repo = AsyncQuizRepository(db)
+        game_repo = AsyncGameRepository(db)
+        user_repo = AsyncUserRepository(db)
 
-        user = user_repo.get_user_by_telegram_id(message.from_user.id)
+        user = await user_repo.get_user_by_telegram_id(message.from_user.id)
 
         if not user:
                 await message.answer("❌ Сначала используй /start для регистрации")
                 return
         
         # Получаем 8 случайных вопросов
-        questions = quiz_repo.get_balanced_questions()
+        questions = await quiz_repo.get_balanced_questions()
         
         if not questions:
             await message.answer("❌ В базе данных нет вопросов для викторины!")
@@ -272,24 +274,23 @@ async def start_quiz(message: Message, state: FSMContext, bot: Bot):
         await state.set_state(QuizStates.playing)
         
         # Получаем игру "Викторина" из БД
-        quiz_game_db = game_repo.get_game_by_code("quiz")
+        quiz_game_db = await game_repo.get_game_by_code("quiz")
         
-        # Создаем сессию в БД
-        session_repo = GameSessionRepository(db)
-        game_session = session_repo.create_session(user.id, quiz_game_db.id)
-        await state.update_data(game_session_id=game_session.id)
+        # Начинаем сессию (в режиме lazy строка в БД появится при завершении)
+        session_repo = AsyncGameSessionRepository(db)
+        game_session = await session_repo.start_session(user.id, quiz_game_db.id)
+        await state.update_data(game_session=game_session)
         
         # Показываем первый вопрос
-        await show_question(bot, message.chat.id, state)
+        await show_question(bot, message.chat.id, state, db)
         
     except Exception as e:
+        await db.rollback()
         await message.answer(f"❌ Ошибка при запуске викторины: {e}")
-    finally:
-        db.close()
 
 
 @router.callback_query(QuizStates.waiting_answer, F.data.startswith("quiz_answer_"))
-async def handle_quiz_answer(callback: CallbackQuery, state: FSMContext, bot: Bot):
+async def handle_quiz_answer(callback: CallbackQuery, state: FSMContext, bot: Bot, db: DBSession):
     """Обработка ответа пользователя"""
     answer_index = int(callback.data.split("_")[2])
     
@@ -331,4 +332,4 @@ async def handle_quiz_answer(callback: CallbackQuery, state: FSMContext, bot: Bo
     
     # Ждем 3 секунды и показываем следующий вопрос
     await asyncio.sleep(3)
-    await show_question(bot, callback.message.chat.id, state)
\ No newline at end of file
+    await show_question(bot, callback.message.chat.id, state, db)
\ No newline at end of file
@@ -1,18 +1,17 @@
 from aiogram import Router, types
 from aiogram.filters import Command
-from database.engine import SessionLocal
-from repositories import GameRepository
+from database.session import DBSession
+from repositories.aio import AsyncGameRepository
 
 router = Router()
 
 # Обработчик команды /games
 @router.message(Command("games"))
-async def cmd_games(message: types.Message):
+async def cmd_games(message: types.Message, db: DBSession):
     """Показывает список доступных игр"""
-    db = SessionLocal()
     try:
-        game_repo = GameRepository(db)
-        games = game_repo.get_active_games()
+        game_repo = AsyncGameRepository(db)
+        games = await game_repo.get_active_games()
         
         if not games:
             await message.answer("🎮 Игры пока в разработке... Скоро появятся!")
@@ -38,7 +37,6 @@ async def cmd_games(message: types.Message):
         )
         
     except Exception as e:
+        await db.rollback()
         print(f"❌ Ошибка при обработке /games: {e}")
-        await message.answer("❌ Произошла ошибка. Попробуйте позже.")
-    finally:
-        db.close()
\ No newline at end of file
+        await message.answer("❌ Произошла ошибка. Попробуйте позже.")
\ No newline at end of file
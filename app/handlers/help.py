@@ -16,5 +16,5 @@ async def cmd_help(message: types.Message):
         "<b>Игры:</b>\n"
         "/guess_number - Угадай число! \n"
         "/quiz - Викторина \n"
-        "/cities - Города \n"
+        "/cities - Города (уровень бота: /cities easy, normal или hard) \n"
     )
\ No newline at end of file
@@ -1,57 +1,45 @@
 from aiogram import Router, types
 from aiogram.filters import Command
-from database.engine import SessionLocal
-from repositories import UserRepository, GameRepository, GameSessionRepository
+from database.session import DBSession
+from repositories.aio import AsyncUserRepository, AsyncGameSessionRepository
 
 router = Router()
 
 #Обработчик команды /profile
 @router.message(Command("profile"))
-async def cmd_profile(message: types.Message):
+async def cmd_profile(message: types.Message, db: DBSession):
     """Показывает профиль пользователя с игровой статистикой"""
-    db = SessionLocal()
     try:
-        user_repo = UserRepository(db)
-        game_repo = GameRepository(db)
-        session_repo = GameSessionRepository(db)
+        user_repo = AsyncUserRepository(db)
+        session_repo = AsyncGameSessionRepository(db)
         
-        user = user_repo.get_user_by_telegram_id(message.from_user.id)
+        user = await user_repo.get_user_by_telegram_id(message.from_user.id)
         
         if not user:
             await message.answer("❌ Пользователь не найден. Используй /start")
             return
         
-        # ПОЛУЧАЕМ ВСЕ ДАННЫЕ ДЛЯ СТАТИСТИКИ
-        all_games = game_repo.get_all_games()
-        user_sessions = session_repo.get_user_sessions(user.id)
-        completed_sessions = [s for s in user_sessions if s.completed]
+        # СЧЕТЧИКИ ИГРОКА: одна строка общих и по строке на каждую сыгранную игру
+        activity = await session_repo.get_user_activity(user.id)
+        game_activity = await session_repo.get_user_game_activity(user.id) if activity else []
         
         # ОБЩАЯ СТАТИСТИКА
-        total_games_played = len(completed_sessions)
-        total_score = sum(session.score for session in completed_sessions)
-        best_score_overall = max((session.score for session in completed_sessions), default=0)
+        total_games_played = activity.completed if activity else 0
+        total_score = activity.score_sum if activity else 0
+        best_score_overall = activity.best_score if activity else 0
+        total_sessions = activity.sessions if activity else 0
         
         # СТАТИСТИКА ПО КАЖДОЙ ИГРЕ
-        game_stats = []
-        
-        for game in all_games:
-            # Находим сессии для этой игры
-            game_sessions = [s for s in completed_sessions if s.game_id == game.id]
-            
-            if game_sessions:
-                total_game_score = sum(session.score for session in game_sessions)
-                best_game_score = max(session.score for session in game_sessions)
-                total_attempts = sum(session.attempts for session in game_sessions)
-                games_played = len(game_sessions)
-                avg_attempts = total_attempts // games_played if games_played > 0 else 0
-                
-                game_stats.append({
-                    'name': game.name,
-                    'games_played': games_played,
-                    'total_score': total_game_score,
-                    'best_score': best_game_score,
-                    'avg_attempts': avg_attempts
-                })
+        game_stats = [
+            {
+                'name': game.name,
+                'games_played': counters.completed,
+                'total_score': counters.score_sum,
+                'best_score': counters.best_score,
+                'avg_attempts': counters.attempts_sum // counters.completed
+            }
+            for counters, game in game_activity
+        ]
         
         # ФОРМИРУЕМ ТЕКСТ СТАТИСТИКИ
         general_stats = (
@@ -65,7 +53,7 @@ async def cmd_profile(message: types.Message):
             f"• Всего сыграно игр: {total_games_played}\n"
             f"• Всего очков: {total_score}\n"
             f"• Лучший результат: {best_score_overall}\n"
-            f"• Всего сессий: {len(user_sessions)}\n"
+            f"• Всего сессий: {total_sessions}\n"
         )
         
         # ДОБАВЛЯЕМ СТАТИСТИКУ ПО ИГРАМ
@@ -104,7 +92,6 @@ async def cmd_profile(message: types.Message):
         await message.answer(final_message)
         
     except Exception as e:
+        await db.rollback()
         print(f"❌ Ошибка при обработке /profile: {e}")
-        await message.answer("❌ Произошла ошибка. Попробуйте позже.")
-    finally:
-        db.close()
\ No newline at end of file
+        await message.answer("❌ Произошла ошибка. Попробуйте позже.")
\ No newline at end of file
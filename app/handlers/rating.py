@@ -1,28 +1,41 @@
-from aiogram import Router, types
-from aiogram.filters import Command
-from database.engine import SessionLocal
-from repositories import RatingRepository, UserRepository, GameRepository
+from aiogram import F, Router, types
+from aiogram.filters import Command, CommandObject
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from database.leaderboard_cache import leaderboard_cache
+from database.models import ScoreHistogram
+from database.session import DBSession
+from repositories.aio import AsyncRatingRepository, AsyncUserRepository, AsyncGameRepository
 
 router = Router()
 
+# Игроков на странице топа игры
+PAGE_SIZE = 10
+
+# Топы за период: аргумент /leaderboard -> период period_scores
+PERIOD_ALIASES = {
+    'today': 'day', 'day': 'day', 'сегодня': 'day',
+    'week': 'week', 'неделя': 'week',
+    'month': 'month', 'месяц': 'month'
+}
+PERIOD_TITLES = {'day': "Топ дня", 'week': "Топ недели", 'month': "Топ месяца"}
+
+# Окно топа вокруг игрока: /leaderboard me [код игры]
+AROUND_ALIASES = ('me', 'я')
+AROUND_RADIUS = 5
+
 @router.message(Command("rating"))
-async def cmd_rating(message: types.Message):
+async def cmd_rating(message: types.Message, db: DBSession):
     """Показывает личный рейтинг пользователя"""
-    db = SessionLocal()
     try:
-        user_repo = UserRepository(db)
-        rating_repo = RatingRepository(db)
+        rating_repo = AsyncRatingRepository(db)
         
-        # Находим пользователя
-        user = user_repo.get_user_by_telegram_id(message.from_user.id)
-        if not user:
+        # Пользователь, итоги, ранг и рейтинги по играм - одним запросом
+        dashboard = await rating_repo.get_user_dashboard(telegram_id=message.from_user.id)
+        if not dashboard:
             await message.answer("❌ Сначала используй /start")
             return
         
-        # Получаем рейтинги пользователя
-        user_ratings = rating_repo.get_user_ratings(user.id)
-        
-        if not user_ratings:
+        if not dashboard.ratings:
             await message.answer(
                 "📊 <b>Твой рейтинг</b>\n\n"
                 "У тебя еще нет сыгранных игр.\n"
@@ -30,91 +43,232 @@ async def cmd_rating(message: types.Message):
             )
             return
         
-        # Получаем общую статистику и глобальный ранг
-        user_stats = rating_repo.get_user_stats(user.id)
-        global_rank = rating_repo.get_user_global_rank(user.id)
-        
-        total_score = user_stats.total_score or 0
-        total_games = user_stats.total_games or 0
-        best_score = user_stats.best_score or 0
-        
         # Формируем статистику
         rating_text = (
-            f"👤 <b>Рейтинг {user.first_name}</b>\n\n"
-            f"🏆 <b>Глобальный ранг:</b> #{global_rank}\n"
+            f"👤 <b>Рейтинг {dashboard.first_name}</b>\n\n"
+            f"🏆 <b>Глобальный ранг:</b> #{dashboard.rank}\n"
             f"📈 <b>Общая статистика:</b>\n"
-            f"• Всего очков: {total_score}\n"
-            f"• Всего игр: {total_games}\n"
-            f"• Лучший результат: {best_score}\n\n"
+            f"• Всего очков: {dashboard.total_score}\n"
+            f"• Всего игр: {dashboard.total_games}\n"
+            f"• Лучший результат: {dashboard.best_score}\n\n"
         )
         
+        # Процент игроков ниже - по гистограммам очков игр
+        histograms = await rating_repo.get_score_histograms([rating.game_id for rating in dashboard.ratings])
+        
         # Добавляем статистику по играм
         rating_text += "<b>📊 По играм:</b>\n"
-        for rating, game in user_ratings:
+        for rating in dashboard.ratings:
             medal = "🥇" if rating.best_score >= 90 else "🥈" if rating.best_score >= 70 else "🥉"
             rating_text += (
-                f"{medal} <b>{game.name}</b>\n"
+                f"{medal} <b>{rating.game_name}</b>\n"
                 f"   • Очков: {rating.total_score}\n"
                 f"   • Игр: {rating.games_played}\n"
                 f"   • Лучший: {rating.best_score}\n"
-                f"   • Средний: {rating.average_score:.1f}\n\n"
+                f"   • Средний: {rating.average_score:.1f}\n"
             )
+            better_than = ScoreHistogram.percentile(histograms[rating.game_id], rating.total_score)
+            if better_than is not None:
+                rating_text += f"   • Лучше, чем {better_than:.0f}% игроков\n"
+            rating_text += "\n"
         
         rating_text += "🏅 <b>Топ игроков:</b> /leaderboard"
         
         await message.answer(rating_text)
         
     except Exception as e:
+        await db.rollback()
         print(f"❌ Ошибка при обработке /rating: {e}")
         await message.answer("❌ Произошла ошибка. Попробуйте позже.")
-    finally:
-        db.close()
 
 @router.message(Command("leaderboard"))
-async def cmd_leaderboard(message: types.Message):
-    """Показывает топ игроков"""
-    db = SessionLocal()
+async def cmd_leaderboard(message: types.Message, command: CommandObject, db: DBSession):
+    """
+    Показывает топ игроков: общий, за период (/leaderboard week), по игре (/leaderboard <код игры>)
+    или соседей игрока по топу (/leaderboard me [код игры])
+    """
     try:
-        rating_repo = RatingRepository(db)
-        game_repo = GameRepository(db)
+        argument = (command.args or "").strip().lower()
+        words = argument.split()
+        if words and words[0] in AROUND_ALIASES:
+            await show_leaderboard_around(message, db, words[1] if len(words) > 1 else None)
+            return
+        if argument in PERIOD_ALIASES:
+            await message.answer(await render_leaderboard(AsyncRatingRepository(db), PERIOD_ALIASES[argument]))
+            return
+        if argument:
+            await show_game_leaderboard(message, db, argument)
+            return
+        
+        # Готовый текст топа - из кэша, пока топ не изменился
+        leaderboard_text = leaderboard_cache.get_text(None, 10)
+        if leaderboard_text is None:
+            version = leaderboard_cache.version(None)
+            leaderboard_text = await render_leaderboard(AsyncRatingRepository(db))
+            leaderboard_cache.put_text(None, 10, leaderboard_text, version)
         
-        # Получаем топ-10 игроков
-        leaderboard = rating_repo.get_leaderboard(limit=10)
+        await message.answer(leaderboard_text)
         
-        if not leaderboard:
-            await message.answer("🏆 <b>Топ игроков</b>\n\nПока никто не играл 😢\n🎮 Стань первым: /games")
+    except Exception as e:
+        await db.rollback()
+        print(f"❌ Ошибка при обработке /leaderboard: {e}")
+        await message.answer("❌ Произошла ошибка. Попробуйте позже.")
+
+async def render_leaderboard(rating_repo: AsyncRatingRepository, period: str = None) -> str:
+    """Формирует текст топа-10: общего или за период (day, week, month)"""
+    # Получаем топ-10 игроков
+    if period:
+        leaderboard = await rating_repo.get_period_leaderboard(period, limit=10)
+        title = PERIOD_TITLES[period]
+    else:
+        leaderboard = await rating_repo.get_leaderboard(limit=10)
+        title = "Топ игроков"
+    
+    if not leaderboard:
+        return f"🏆 <b>{title}</b>\n\nПока никто не играл 😢\n🎮 Стань первым: /games"
+    
+    leaderboard_text = f"🏆 <b>{title}</b>\n\n"
+    
+    medals = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣", "9️⃣", "🔟"]
+    
+    for i, row in enumerate(leaderboard):
+        medal = medals[i] if i < len(medals) else f"{i+1}."
+        
+        if len(row) == 4:  # Общий топ (User, total_score, total_games, best_score)
+            user, total_score, total_games, best_score = row
+            username = f"@{user.username}" if user.username else user.first_name
+            
+            leaderboard_text += (
+                f"{medal} {username}\n"
+                f"   💎 {total_score} очков | 🎮 {total_games} игр\n"
+            )
+        else:  # Топ по конкретной игре (Rating, User, Game)
+            rating, user, game = row
+            username = f"@{user.username}" if user.username else user.first_name
+            
+            leaderboard_text += (
+                f"{medal} {username}\n"
+                f"   💎 {rating.total_score} очков | 🎮 {rating.games_played} игр\n"
+            )
+    
+    leaderboard_text += (
+        "\n📅 <b>За период:</b> /leaderboard today | week | month"
+        "\n🎮 <b>Топ по игре:</b> /leaderboard код_игры (коды - в /games)"
+        "\n📍 <b>Мое место:</b> /leaderboard me [код_игры]"
+        "\n📊 <b>Мой рейтинг:</b> /rating\n🎯 <b>Сыграть:</b> /games"
+    )
+    
+    return leaderboard_text
+
+async def show_game_leaderboard(message: types.Message, db: DBSession, game_code: str):
+    """Первая страница топа игры"""
+    game = await AsyncGameRepository(db).get_game_by_code(game_code)
+    if not game:
+        await message.answer("❌ Игра не найдена. Коды игр - в /games")
+        return
+    
+    rows, has_next = await AsyncRatingRepository(db).get_leaderboard_page(game.id, PAGE_SIZE)
+    text, keyboard = render_game_leaderboard(game, rows, first_place=1, has_prev=False, has_next=has_next)
+    await message.answer(text, reply_markup=keyboard)
+
+async def show_leaderboard_around(message: types.Message, db: DBSession, game_code: str = None):
+    """Игроки рядом с пользователем в общем топе или в топе игры"""
+    user = await AsyncUserRepository(db).get_user_by_telegram_id(message.from_user.id)
+    if not user:
+        await message.answer("❌ Сначала используй /start")
+        return
+    
+    game = None
+    if game_code:
+        game = await AsyncGameRepository(db).get_game_by_code(game_code)
+        if not game:
+            await message.answer("❌ Игра не найдена. Коды игр - в /games")
             return
+    
+    first_place, rows = await AsyncRatingRepository(db).get_leaderboard_around(
+        user.id, game.id if game else None, AROUND_RADIUS
+    )
+    title = f"Ты в топе: {game.name}" if game else "Ты в общем топе"
+    if not rows:
+        await message.answer(f"📍 <b>{title}</b>\n\nТы еще не играл 😢\n🎮 Начни: /games")
+        return
+    
+    text = f"📍 <b>{title}</b>\n\n"
+    for place, (row_user, total_score, games_played) in enumerate(rows, start=first_place):
+        username = f"@{row_user.username}" if row_user.username else row_user.first_name
+        line = f"{place}. {username} - 💎 {total_score} очков | 🎮 {games_played} игр"
+        text += f"👉 <b>{line}</b>\n" if row_user.id == user.id else f"{line}\n"
+    text += "\n🏆 <b>Весь топ:</b> /leaderboard"
+    await message.answer(text)
+
+def render_game_leaderboard(game, rows: list, first_place: int, has_prev: bool, has_next: bool):
+    """
+    Текст страницы топа игры и кнопки листания.
+    В кнопке - ключ (total_score, user_id) крайней строки страницы и место,
+    с которого начнется соседняя страница: lb:<игра>:<n|p>:<очки>:<user_id>:<место>
+    """
+    medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+    text = f"🏆 <b>Топ: {game.name}</b>\n\n"
+    
+    if not rows:
+        text += "Пока никто не играл 😢\n🎮 Стань первым: /games"
+    
+    for place, (rating, user) in enumerate(rows, start=first_place):
+        username = f"@{user.username}" if user.username else user.first_name
+        text += (
+            f"{medals.get(place, f'{place}.')} {username}\n"
+            f"   💎 {rating.total_score} очков | 🎮 {rating.games_played} игр\n"
+        )
+    
+    builder = InlineKeyboardBuilder()
+    if has_prev:
+        first = rows[0][0]
+        previous_place = max(first_place - PAGE_SIZE, 1)
+        builder.button(
+            text="◀️ Назад",
+            callback_data=f"lb:{game.id}:p:{first.total_score}:{first.user_id}:{previous_place}"
+        )
+    if has_next:
+        last = rows[-1][0]
+        builder.button(
+            text="Вперед ▶️",
+            callback_data=f"lb:{game.id}:n:{last.total_score}:{last.user_id}:{first_place + len(rows)}"
+        )
+    return text, builder.as_markup() if has_prev or has_next else None
+
+@router.callback_query(F.data.startswith("lb:"))
+async def handle_leaderboard_page(callback: types.CallbackQuery, db: DBSession):
+    """Листание топа игры"""
+    try:
+        _, game_id, direction, score, user_id, first_place = callback.data.split(":")
+        game_id, first_place = int(game_id), int(first_place)
+        cursor = (int(score), int(user_id))
         
-        leaderboard_text = "🏆 <b>Топ игроков</b>\n\n"
+        game = await AsyncGameRepository(db).get_game_by_id(game_id)
+        if not game:
+            await callback.answer("Игра не найдена")
+            return
         
-        medals = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣", "9️⃣", "🔟"]
+        rating_repo = AsyncRatingRepository(db)
+        if direction == "n":
+            rows, has_next = await rating_repo.get_leaderboard_page(game_id, PAGE_SIZE, after=cursor)
+            has_prev = True
+        else:
+            rows, has_prev = await rating_repo.get_leaderboard_page(game_id, PAGE_SIZE, before=cursor)
+            has_next = True
+            if not has_prev:
+                first_place = 1  # Дошли до начала топа
         
-        for i, row in enumerate(leaderboard):
-            medal = medals[i] if i < len(medals) else f"{i+1}."
-            
-            if len(row) == 4:  # Общий топ (User, total_score, total_games, best_score)
-                user, total_score, total_games, best_score = row
-                username = f"@{user.username}" if user.username else user.first_name
-                
-                leaderboard_text += (
-                    f"{medal} {username}\n"
-                    f"   💎 {total_score} очков | 🎮 {total_games} игр\n"
-                )
-            else:  # Топ по конкретной игре (Rating, User, Game)
-                rating, user, game = row
-                username = f"@{user.username}" if user.username else user.first_name
-                
-                leaderboard_text += (
-                    f"{medal} {username}\n"
-                    f"   💎 {rating.total_score} очков | 🎮 {rating.games_played} игр\n"
-                )
-        
-        leaderboard_text += "\n📊 <b>Мой рейтинг:</b> /rating\n🎯 <b>Сыграть:</b> /games"
+        if not rows:
+            # Топ изменился, пока страница была открыта
+            await callback.answer("Здесь больше никого нет")
+            return
         
-        await message.answer(leaderboard_text)
+        text, keyboard = render_game_leaderboard(game, rows, first_place, has_prev, has_next)
+        await callback.message.edit_text(text, reply_markup=keyboard)
+        await callback.answer()
         
     except Exception as e:
-        print(f"❌ Ошибка при обработке /leaderboard: {e}")
-        await message.answer("❌ Произошла ошибка. Попробуйте позже.")
-    finally:
-        db.close()
\ No newline at end of file
+        await db.rollback()
+        print(f"❌ Ошибка при листании топа: {e}")
+        await callback.answer("❌ Произошла ошибка. Попробуйте позже.")
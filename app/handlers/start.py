@@ -1,21 +1,19 @@
 from aiogram import Router, types
 from aiogram.filters import Command
-from database.engine import SessionLocal
-from repositories import UserRepository
+from database.session import DBSession
+from repositories.aio import AsyncUserRepository
 
 router = Router()
 
 # Обработчик команды /start
 @router.message(Command("start"))
-async def cmd_start(message: types.Message):
+async def cmd_start(message: types.Message, db: DBSession):
     """Обработчик команды /start с сохранением пользователя в БД"""
-    # Создаем сессию БД
-    db = SessionLocal()
     try:
-        user_repo = UserRepository(db)
+        user_repo = AsyncUserRepository(db)
         
         # Сохраняем/находим пользователя
-        user = user_repo.get_or_create_user(
+        user = await user_repo.get_or_create_user(
             telegram_id=message.from_user.id,
             username=message.from_user.username,
             first_name=message.from_user.first_name,
@@ -32,13 +30,12 @@ async def cmd_start(message: types.Message):
             f"/start - начать работу\n"
             f"/profile - твой профиль\n" 
             f"/rating - твой рейтинг\n"
-            f"/leaderboard - топ игроков\n"
+            f"/leaderboard - топ игроков (/leaderboard код_игры - по игре, /leaderboard me - твое место)\n"
             f"/games - список игр\n"
             f"/help - помощь"
         )
         
     except Exception as e:
+        await db.rollback()
         print(f"❌ Ошибка при обработке /start: {e}")
-        await message.answer("❌ Произошла ошибка. Попробуйте позже.")
-    finally:
-        db.close()
\ No newline at end of file
+        await message.answer("❌ Произошла ошибка. Попробуйте позже.")
\ No newline at end of file
@@ -7,9 +7,17 @@ from aiogram.types import BotCommand
 
 from app.config import config
 from database import setup_database
+from database.engine import SessionLocal, async_engine, sql_profiler
+from database.session import shutdown_db_executor, start_group_writer, stop_group_writer
+from database.counters import run_counter_flush
+from database.rollups import run_period_prune
+from database.rank_index import game_rank_indexes, rank_index
+from database.city_index import CityIndex, set_city_index
 
 # Middleware
+from app.middlewares.database import DatabaseMiddleware
 from app.middlewares.admin import AdminMiddleware
+from app.middlewares.profiler import HandlerTagMiddleware
 
 from app.handlers import all_routers
 
@@ -27,6 +35,11 @@ bot = Bot(
 dp = Dispatcher()
 
 # Регистрируем middleware
+dp.update.outer_middleware(DatabaseMiddleware())   # Одна сессия БД на update
+if sql_profiler is not None:
+    # Метка хендлера для профилировщика SQL (раньше AdminMiddleware - его запросы тоже помечаются)
+    dp.message.middleware(HandlerTagMiddleware())
+    dp.callback_query.middleware(HandlerTagMiddleware())
 dp.message.middleware(AdminMiddleware())
 
 # Регистрируем роутеры
@@ -51,11 +64,27 @@ async def setup_bot_commands(bot: Bot):
 
 
 async def main():
+    counter_flush_task = None
+    period_prune_task = None
     try:
         print("🤖 Запускаем бота...")
         
         # Инициализируем БД
         setup_database()
+        if config.RANK_INDEX == 'memory':
+            # Ранги /rating и места /leaderboard me считаются по индексам в памяти,
+            # а не запросом по всем игрокам
+            with SessionLocal() as db:
+                rank_index.load(db)
+                game_rank_indexes.load(db)
+        # Города загружаются в БД при старте и дальше не меняются - ходы игры идут по индексу в памяти
+        with SessionLocal() as db:
+            set_city_index(CityIndex.from_db(db))
+        await start_group_writer()  # Только при DB_WRITE_MODE=group
+        # Счетчик запусков игр пишется в БД пачкой, а не при каждом старте
+        counter_flush_task = asyncio.create_task(run_counter_flush(config.GAME_STARTS_FLUSH_SECONDS))
+        # Топы за день/неделю/месяц хранят только текущий и предыдущий период
+        period_prune_task = asyncio.create_task(run_period_prune(config.PERIOD_PRUNE_SECONDS))
         
         # Проверяем подключение
         bot_info = await bot.get_me()
@@ -71,6 +100,16 @@ async def main():
         
     except Exception as e:
         print(f"❌ Ошибка: {e}")
+    finally:
+        if counter_flush_task is not None:
+            counter_flush_task.cancel()
+            await asyncio.gather(counter_flush_task, return_exceptions=True)
+        if period_prune_task is not None:
+            period_prune_task.cancel()
+            await asyncio.gather(period_prune_task, return_exceptions=True)
+        await stop_group_writer()
+        shutdown_db_executor()
+        await async_engine.dispose()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
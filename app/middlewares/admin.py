@@ -1,6 +1,5 @@
 from aiogram import BaseMiddleware
-from database.engine import SessionLocal
-from repositories import AdminRepository, UserRepository
+from repositories.aio import AsyncAdminRepository, AsyncUserRepository
 from app.config import config
 
 class AdminMiddleware(BaseMiddleware):
@@ -11,7 +10,8 @@ class AdminMiddleware(BaseMiddleware):
     ADMIN_COMMANDS = [
         '/admin', '/admin_stats', '/stats_users', '/stats_games', '/stats_daily',
         '/user_info', '/user_stats', '/user_ban', '/user_unban', 
-        '/games_list', '/game_toggle', '/admins_list', '/admin_add', '/admin_remove'
+        '/games_list', '/game_toggle', '/admins_list', '/admin_add', '/admin_remove',
+        '/sql_top'
     ]
 
     async def __call__(self, handler, event, data):
@@ -24,13 +24,13 @@ class AdminMiddleware(BaseMiddleware):
                     telegram_id = event.from_user.id
                     print(f"🔐 Проверка прав админа для telegram_id: {telegram_id}, команда: {command}")
                     
-                    db = SessionLocal()
+                    db = data['db']  # Сессия update из DatabaseMiddleware
                     try:
-                        user_repo = UserRepository(db)
-                        admin_repo = AdminRepository(db)
+                        user_repo = AsyncUserRepository(db)
+                        admin_repo = AsyncAdminRepository(db)
                         
                         # Конвертируем telegram_id → user_id
-                        user = user_repo.get_user_by_telegram_id(telegram_id)
+                        user = await user_repo.get_user_by_telegram_id(telegram_id)
                         if not user:
                             print(f"❌ User с telegram_id {telegram_id} не найден в БД")
                             await event.answer("❌ Нет прав доступа к админ-панели")
@@ -45,7 +45,7 @@ class AdminMiddleware(BaseMiddleware):
                             return await handler(event, data)
                         
                         # 2. Проверяем админов в БД (по user_id)
-                        if not admin_repo.is_admin(user_id):
+                        if not await admin_repo.is_admin(user_id):
                             print(f"❌ User user_id:{user_id} не имеет прав админа")
                             await event.answer("❌ Нет прав доступа к админ-панели")
                             return
@@ -57,7 +57,5 @@ class AdminMiddleware(BaseMiddleware):
                         print(f"❌ Ошибка при проверке прав админа: {e}")
                         await event.answer("❌ Ошибка при проверке прав доступа")
                         return
-                    finally:
-                        db.close()
         
         return await handler(event, data)
\ No newline at end of file
@@ -0,0 +1,19 @@
+from aiogram import BaseMiddleware
+from database.session import session_scope
+
+
+class DatabaseMiddleware(BaseMiddleware):
+    """
+    Middleware "единица работы": одна сессия БД на один update.
+    Сессия передается в хендлеры и middleware через data['db'],
+    commit выполняется один раз после обработки, rollback - при ошибке.
+    """
+
+    def __init__(self, session_factory=None):
+        # Фабрика сессий (по умолчанию - open_session из режима config.DB_MODE)
+        self.session_factory = session_factory
+
+    async def __call__(self, handler, event, data):
+        async with session_scope(self.session_factory) as db:
+            data['db'] = db
+            return await handler(event, data)
@@ -0,0 +1,22 @@
+from aiogram import BaseMiddleware
+from database.profiler import current_handler
+
+
+class HandlerTagMiddleware(BaseMiddleware):
+    """
+    Middleware для профилировщика SQL: помечает запросы update
+    именем хендлера, который его обрабатывает (модуль.функция)
+    """
+
+    async def __call__(self, handler, event, data):
+        handler_object = data.get('handler')
+        if handler_object is None:
+            return await handler(event, data)
+
+        callback = handler_object.callback
+        module = callback.__module__.rsplit('.', 1)[-1]
+        token = current_handler.set(f"{module}.{callback.__name__}")
+        try:
+            return await handler(event, data)
+        finally:
+            current_handler.reset(token)
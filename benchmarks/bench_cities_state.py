@@ -0,0 +1,158 @@
+"""
+Бенчмарк состояния игры «Города» в FSM: прежний CitiesGame (set названий
+городов, текущий город строкой, datetime), битовая маска по позициям индекса
+и текущий CitiesGame (отсортированный список id использованных городов).
+
+Кроме городов из data/cities.csv в индекс добавляются случайные названия
+до нужного размера (по умолчанию 100 тыс.): маска растет вместе с позицией
+самого дальнего названного города, а список id - только с числом ходов.
+Для каждого хода партий замеряются размер состояния после pickle и JSON
+(хранилища FSM вне памяти процесса сериализуют данные; прежнее состояние
+в JSON не помещалось вовсе) и цена обновления: отметить города хода
+и сериализовать состояние, как перед state.update_data().
+
+Запуск:
+    python -m benchmarks.bench_cities_state --games 50 --cities 100000
+"""
+import argparse
+import json
+import os
+import pickle
+import random
+import sys
+import time
+from datetime import datetime
+
+# Бенчмарку не нужен бот - подставляем значения для загрузки конфига
+os.environ.setdefault('TG_TOKEN', 'benchmark')
+os.environ.setdefault('DB_URL', 'sqlite:///:memory:')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.handlers.games.cities import CitiesGame
+from benchmarks.bench_city_lookup import real_cities, synthetic_cities
+from database.city_index import CityIndex
+
+
+class SetCitiesGame:
+    """Прежнее состояние игры: набор названий использованных городов"""
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.used_cities = set()
+        self.current_city = None
+        self.user_score = 0
+        self.bot_score = 0
+        self.moves_count = 0
+        self.start_time = datetime.now()
+
+    def set_current_city(self, city: str):
+        self.current_city = city
+        self.used_cities.add(city)
+
+
+def play_games(index: CityIndex, games: int, max_moves: int, seed: int = 1) -> list[list[list[int]]]:
+    """
+    Партии как списки ходов; ход - id городов, названных до следующего сохранения состояния.
+    Партия заканчивается, когда кончились города или после max_moves ходов игрока
+    """
+    random_generator = random.Random(seed)
+    result = []
+    for _ in range(games):
+        current = index.random_city(random_generator)
+        used = {current}
+        moves = [[current]]
+        while len(moves) <= max_moves:
+            # Игрок называет случайный неиспользованный город на нужную букву, бот отвечает
+            candidates = [city_id for city_id in index.cities_on(index.game_letter(current)) if city_id not in used]
+            if not candidates:
+                break
+            player = random_generator.choice(candidates)
+            used.add(player)
+            bot = index.first_unused(index.game_letter(player), used)
+            if bot is None:
+                break
+            used.add(bot)
+            moves.append([player, bot])
+            current = bot
+        result.append(moves)
+    return result
+
+
+def percentile(values: list, share: float):
+    return sorted(values)[min(len(values) - 1, int(len(values) * share))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк состояния игры «Города»")
+    parser.add_argument('--games', type=int, default=50, help="Партий для набора ходов")
+    parser.add_argument('--cities', type=int, default=100000, help="Названий в индексе")
+    parser.add_argument('--moves', type=int, default=200, help="Наибольшее число ходов игрока в партии")
+    args = parser.parse_args()
+    random_generator = random.Random(1)
+
+    # Перехватываем print() загрузки городов, чтобы не мешать замеру
+    real_stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        names = real_cities()
+    finally:
+        sys.stdout.close()
+        sys.stdout = real_stdout
+    names += synthetic_cities(max(0, args.cities - len(names)), random_generator)
+    index = CityIndex(enumerate(names, start=1))
+
+    games = play_games(index, args.games, args.moves)
+
+    old_sizes, mask_sizes, new_sizes, new_json_sizes = [], [], [], []
+    old_seconds = mask_seconds = new_seconds = 0.0
+    moves = 0
+    for game_moves in games:
+        old_game, new_game = SetCitiesGame(user_id=1), CitiesGame(user_id=1)
+        # Прежнее состояние с маской: те же поля, но used_mask вместо used_ids
+        mask_state = CitiesGame(user_id=1).to_state()
+        del mask_state['used_ids']
+        mask_state['used_mask'] = 0
+        for city_ids in game_moves:
+            names = [index.name(city_id) for city_id in city_ids]
+
+            started = time.perf_counter()
+            for name in names:
+                old_game.set_current_city(name)
+            old_state = pickle.dumps(old_game)
+            old_seconds += time.perf_counter() - started
+
+            # Маска по позициям индекса (id по порядку с 1 - позиция id - 1)
+            started = time.perf_counter()
+            for city_id in city_ids:
+                mask_state['used_mask'] |= 1 << (city_id - 1)
+            mask_pickled = pickle.dumps(mask_state)
+            mask_seconds += time.perf_counter() - started
+
+            started = time.perf_counter()
+            for city_id in city_ids:
+                new_game.set_current_city(index, city_id)
+            new_state = pickle.dumps(new_game.to_state())
+            new_seconds += time.perf_counter() - started
+
+            assert all(new_game.is_city_used(index.find(name)) for name in old_game.used_cities)
+            old_sizes.append(len(old_state))
+            mask_sizes.append(len(mask_pickled))
+            new_sizes.append(len(new_state))
+            new_json_sizes.append(len(json.dumps(new_game.to_state())))
+            moves += 1
+
+    print(f"Городов: {len(index)}, партий: {len(games)}, ходов: {moves}")
+    print(f"{'состояние':>18} {'байт, медиана':>14} {'байт, p95':>10} {'байт, max':>10} {'мкс/ход':>8}")
+    for label, sizes, seconds in (
+        ('set (pickle)', old_sizes, old_seconds),
+        ('маска (pickle)', mask_sizes, mask_seconds),
+        ('список id (pickle)', new_sizes, new_seconds),
+        ('список id (JSON)', new_json_sizes, None)
+    ):
+        cost = f"{seconds / moves * 1_000_000:>8.2f}" if seconds is not None else f"{'-':>8}"
+        print(
+            f"{label:>18} {percentile(sizes, 0.5):>14} {percentile(sizes, 0.95):>10} {max(sizes):>10} {cost}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Бенчмарк хода игры «Города»: прежние запросы к БД (city_exists и
+get_city_for_bot с NOT IN по использованным городам) против индекса городов в памяти
+и ход бота по уровням (easy, normal, hard), а также выбор стартового города.
+
+Ходы берутся из настоящих партий по data/cities.csv: игрок называет
+неиспользованный город на нужную букву, бот отвечает.
+
+Запуск:
+    python -m benchmarks.bench_city_index --games 50
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Бенчмарку не нужен бот - подставляем значения для загрузки конфига
+os.environ.setdefault('TG_TOKEN', 'benchmark')
+os.environ.setdefault('DB_URL', 'sqlite:///:memory:')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from database.city_index import CityIndex, mark_used
+from database.city_strategy import LEVELS, choose_bot_city
+from database.engine import create_db_engine
+from database.initial_data import create_initial_cities
+from database.models import Base, City
+from repositories import CityRepository
+
+
+def load_cities(Session):
+    """Загружает города из data/cities.csv в пустую БД"""
+    # Перехватываем print() загрузки городов, чтобы не мешать замеру
+    real_stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    real_directory = os.getcwd()
+    try:
+        os.chdir(ROOT)
+        with Session() as db:
+            create_initial_cities(db)
+    finally:
+        os.chdir(real_directory)
+        sys.stdout.close()
+        sys.stdout = real_stdout
+
+
+def play_games(index: CityIndex, games: int, seed: int = 1) -> list[tuple[str, str, set]]:
+    """Ходы партий: (город игрока, игровая буква для бота, названия использованных городов)"""
+    random_generator = random.Random(seed)
+    moves = []
+    for _ in range(games):
+        current = index.random_city(random_generator)
+        used, used_ids = {current}, [current]
+        while True:
+            # Игрок называет случайный неиспользованный город на нужную букву
+            letter = index.game_letter(current)
+            candidates = [city_id for city_id in index._ids_by_letter.get(letter, ()) if city_id not in used]
+            if not candidates:
+                break
+            player = random_generator.choice(candidates)
+            used.add(player)
+            mark_used(used_ids, player)
+            moves.append((index.name(player), index.game_letter(player), {index.name(city_id) for city_id in used}))
+            bot = index.first_unused(index.game_letter(player), used_ids)
+            if bot is None:
+                break
+            used.add(bot)
+            mark_used(used_ids, bot)
+            current = bot
+    return moves
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк хода игры «Города»")
+    parser.add_argument('--games', type=int, default=50, help="Партий для набора ходов")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_engine = create_db_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}", profile='performance')
+        Base.metadata.create_all(db_engine)
+        Session = sessionmaker(bind=db_engine)
+
+        load_cities(Session)
+        with Session() as db:
+            started = time.perf_counter()
+            index = CityIndex.from_db(db)
+            build_ms = (time.perf_counter() - started) * 1000
+
+        moves = play_games(index, args.games)
+
+        with Session() as db:
+            city_repo = CityRepository(db)
+            # Ответы индекса совпадают с прежним ходом бота. SQLite lower() не меняет регистр
+            # кириллицы, поэтому NOT IN не исключал использованные города и хендлер
+            # дофильтровывал их в Python - сравниваем с этим результатом
+            for city, letter, used in moves[:20]:
+                assert city_repo.city_exists(city)
+                used_ids = sorted(index.find(name) for name in used)
+                bot_id = index.first_unused(letter, used_ids)
+                expected = next((c.name for c in city_repo.get_cities_by_first_letter(letter) if c.name not in used), None)
+                assert expected == (index.name(bot_id) if bot_id else None)
+
+            started = time.perf_counter()
+            for city, letter, used in moves:
+                city_repo.city_exists(city)
+                city_repo.get_city_for_bot(letter, used)
+            sql_us = (time.perf_counter() - started) / len(moves) * 1_000_000
+
+            # Старт партии: прежний ORDER BY random() сортировал всю таблицу
+            starts = min(len(moves), 500)
+            started = time.perf_counter()
+            for _ in range(starts):
+                db.query(City).order_by(func.random()).first()
+            start_sql_us = (time.perf_counter() - started) / starts * 1_000_000
+
+        moves_with_ids = []
+        for city, letter, used in moves:
+            used_ids = sorted(index.find(name) for name in used)
+            moves_with_ids.append((city, letter, used_ids, index.letter_counts(used_ids)))
+        started = time.perf_counter()
+        for city, letter, used_ids, _ in moves_with_ids:
+            index.find(city)
+            index.first_unused(letter, used_ids)
+        index_us = (time.perf_counter() - started) / len(moves) * 1_000_000
+
+        # Ход бота по уровню: перебор городов на одну букву со счетчиками партии
+        level_us = {}
+        for level in LEVELS:
+            started = time.perf_counter()
+            for city, letter, used_ids, remaining in moves_with_ids:
+                index.find(city)
+                choose_bot_city(index, letter, used_ids, remaining, level)
+            level_us[level] = (time.perf_counter() - started) / len(moves) * 1_000_000
+
+        started = time.perf_counter()
+        for _ in range(len(moves)):
+            index.random_city()
+        start_index_us = (time.perf_counter() - started) / len(moves) * 1_000_000
+
+        print(f"Городов: {len(index)}, ходов: {len(moves)}, построение индекса: {build_ms:.1f} мс")
+        print(f"Стартовый город: ORDER BY random() {start_sql_us:.0f} мкс, индекс {start_index_us:.2f} мкс")
+        print(
+            f"{'запросы к БД, мкс/ход':>24} {'индекс, мкс/ход':>16}"
+            + ''.join(f" {level + ', мкс/ход':>16}" for level in LEVELS)
+        )
+        print(f"{sql_us:>24.0f} {index_us:>16.2f}" + ''.join(f" {level_us[level]:>16.2f}" for level in LEVELS))
+
+        db_engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
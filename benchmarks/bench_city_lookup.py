@@ -0,0 +1,161 @@
+"""
+Бенчмарк неточного поиска города: словарь удалений (FuzzyIndex) против
+перебора всех названий с расстоянием Дамерау-Левенштейна.
+
+Кроме городов из data/cities.csv в индекс добавляются случайные названия
+до нужного размера (по умолчанию 100 тыс.). Запросы - названия с одной
+опечаткой (замена, пропуск, лишняя буква, перестановка), точные названия
+и названия, которых нет.
+
+Запуск:
+    python -m benchmarks.bench_city_lookup --cities 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Бенчмарку не нужен бот - подставляем значения для загрузки конфига
+os.environ.setdefault('TG_TOKEN', 'benchmark')
+os.environ.setdefault('DB_URL', 'sqlite:///:memory:')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.bench_city_index import load_cities
+from database.city_index import FUZZY_MIN_LENGTH, CityIndex, normalize_city_key
+from database.engine import create_db_engine
+from database.fuzzy_index import edit_distance
+from database.models import Base, City
+
+SYLLABLES = ("ка", "ло", "ми", "но", "ра", "се", "то", "ву", "зы", "ле", "гор", "ск", "ов", "ин", "ань", "ево", "ль", "ря")
+ALPHABET = "абвгдежзиклмнопрстуфхцчшщэюя"
+
+
+def real_cities() -> list[str]:
+    """Названия городов из data/cities.csv"""
+    with tempfile.TemporaryDirectory() as directory:
+        db_engine = create_db_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}", profile='performance')
+        Base.metadata.create_all(db_engine)
+        Session = sessionmaker(bind=db_engine)
+        load_cities(Session)
+        with Session() as db:
+            names = list(db.scalars(select(City.name).order_by(City.id)))
+        db_engine.dispose()
+    return names
+
+
+def synthetic_cities(count: int, random_generator: random.Random) -> list[str]:
+    """Случайные названия из слогов (иногда из двух слов через дефис)"""
+    names = set()
+    while len(names) < count:
+        words = [
+            "".join(random_generator.choice(SYLLABLES) for _ in range(random_generator.randint(2, 4)))
+            for _ in range(1 if random_generator.random() < 0.9 else 2)
+        ]
+        names.add("-".join(words).capitalize())
+    return list(names)
+
+
+def make_typo(name: str, random_generator: random.Random) -> str:
+    """Одна опечатка в названии"""
+    position = random_generator.randrange(len(name) - 1)
+    kind = random_generator.choice(('replace', 'delete', 'insert', 'swap'))
+    if kind == 'replace':
+        return name[:position] + random_generator.choice(ALPHABET) + name[position + 1:]
+    if kind == 'delete':
+        return name[:position] + name[position + 1:]
+    if kind == 'insert':
+        return name[:position] + random_generator.choice(ALPHABET) + name[position:]
+    return name[:position] + name[position + 1] + name[position] + name[position + 2:]
+
+
+def brute_force(keys: list[tuple[int, str]], query: str) -> list[int]:
+    """
+    Перебор всех названий: ближайшие на расстоянии не больше 1.
+    Как и в индексе, короткие запросы ищутся только точно
+    """
+    key = normalize_city_key(query)
+    limit = 1 if len(key) >= FUZZY_MIN_LENGTH else 0
+    best, best_distance = [], limit + 1
+    for city_id, city_key in keys:
+        distance = edit_distance(key, city_key, 1)
+        if distance > limit:
+            continue
+        if distance < best_distance:
+            best, best_distance = [city_id], distance
+        elif distance == best_distance:
+            best.append(city_id)
+    return best
+
+
+def measure(function, queries: list) -> float:
+    """Среднее время одного вызова, мкс"""
+    started = time.perf_counter()
+    for query in queries:
+        function(query)
+    return (time.perf_counter() - started) / len(queries) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк неточного поиска города")
+    parser.add_argument('--cities', type=int, default=100000, help="Названий в индексе")
+    parser.add_argument('--lookups', type=int, default=20000, help="Запросов к индексу на замер")
+    parser.add_argument('--brute-lookups', type=int, default=20, help="Запросов перебором на замер")
+    args = parser.parse_args()
+    random_generator = random.Random(1)
+
+    # Перехватываем print() загрузки городов, чтобы не мешать замеру
+    real_stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        names = real_cities()
+    finally:
+        sys.stdout.close()
+        sys.stdout = real_stdout
+    names += synthetic_cities(max(0, args.cities - len(names)), random_generator)
+
+    started = time.perf_counter()
+    index = CityIndex(enumerate(names, start=1))
+    build_sec = time.perf_counter() - started
+
+    # Память - на втором построении: tracemalloc замедляет его в разы
+    del index
+    tracemalloc.start()
+    index = CityIndex(enumerate(names, start=1))
+    memory_mb = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+    tracemalloc.stop()
+
+    sample = [random_generator.randint(1, len(names)) for _ in range(args.lookups)]
+    queries = {
+        'опечатка': [make_typo(names[city_id - 1], random_generator) for city_id in sample],
+        'точное': [names[city_id - 1].lower() for city_id in sample],
+        'нет такого': ["".join(random_generator.choice(ALPHABET) for _ in range(8)) for _ in sample]
+    }
+
+    # Индекс находит то же, что перебор, и почти всегда - задуманный город
+    # Как и в индексе, из названий с одинаковым ключом остается первое
+    keys = {}
+    for city_id, name in enumerate(names, start=1):
+        keys.setdefault(normalize_city_key(name), city_id)
+    keys = [(city_id, key) for key, city_id in keys.items()]
+    for query in queries['опечатка'][:args.brute_lookups] + queries['нет такого'][:args.brute_lookups]:
+        assert index.lookup(query) == brute_force(keys, query), query
+    found = sum(city_id in index.lookup(query) for city_id, query in zip(sample, queries['опечатка']))
+
+    print(
+        f"Названий: {len(index)}, построение: {build_sec:.1f} с, память индекса: {memory_mb:.0f} МБ, "
+        f"опечатка нашла задуманный город: {found / len(sample) * 100:.1f}%"
+    )
+    print(f"{'запрос':>12} {'индекс, мкс':>12} {'перебор, мкс':>13}")
+    for label, batch in queries.items():
+        index_us = measure(index.lookup, batch)
+        brute_us = measure(lambda query: brute_force(keys, query), batch[:args.brute_lookups])
+        print(f"{label:>12} {index_us:>12.1f} {brute_us:>13.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Бенчмарк group commit: сколько записей (создание и завершение сессий)
+в секунду проходит при конкурентных игроках - когда каждая запись
+фиксируется своей транзакцией и когда записи собираются в пачки.
+
+Запуск:
+    python -m benchmarks.bench_group_commit --players 64 --games 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Бенчмарку не нужен бот - подставляем значения для загрузки конфига
+os.environ.setdefault('TG_TOKEN', 'benchmark')
+os.environ.setdefault('DB_URL', 'sqlite:///:memory:')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from database.engine import SQLITE_PROFILES, create_db_engine
+from database.executor import DBExecutor
+from database.session import session_scope
+from database.writer import GroupCommitWriter
+from repositories import GameSessionRepository
+from repositories.aio import AsyncGameSessionRepository
+from benchmarks.bench_sqlite_profile import prepare_database
+
+
+async def play_direct(executor: DBExecutor, user_id: int, game_id: int, games: int):
+    """Игрок: каждая запись - отдельный update со своим commit"""
+    for i in range(games):
+        async with session_scope(executor.session) as db:
+            session = await AsyncGameSessionRepository(db).create_session(user_id, game_id)
+        async with session_scope(executor.session) as db:
+            await AsyncGameSessionRepository(db).complete_session(session.id, i % 100, 1)
+
+
+async def play_group(writer: GroupCommitWriter, user_id: int, game_id: int, games: int):
+    """Игрок: записи уходят в group commit"""
+    for i in range(games):
+        session = await writer.submit(GameSessionRepository, 'create_session', user_id, game_id)
+        await writer.submit(GameSessionRepository, 'complete_session', session.id, i % 100, 1)
+
+
+async def run_mode(mode: str, profile: str, players: int, games: int, workers: int, max_batch: int) -> dict:
+    """Запускает игроков на новой файловой БД и считает commit"""
+    with tempfile.TemporaryDirectory() as directory:
+        db_engine = create_db_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}", profile=profile)
+        session_factory = sessionmaker(bind=db_engine, autoflush=False, expire_on_commit=False)
+        user_ids, game_id = prepare_database(db_engine, players)
+
+        commits = [0]
+
+        @event.listens_for(db_engine, 'commit')
+        def on_commit(connection):
+            commits[0] += 1
+
+        writer = None
+        if mode == 'group':
+            writer = GroupCommitWriter(session_factory, max_batch=max_batch)
+            await writer.start()
+            tasks = [play_group(writer, user_id, game_id, games) for user_id in user_ids]
+        else:
+            executor = DBExecutor(session_factory, max_workers=workers)
+            tasks = [play_direct(executor, user_id, game_id, games) for user_id in user_ids]
+
+        started = time.perf_counter()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+        if writer is not None:
+            await writer.stop()
+        else:
+            executor.shutdown()
+        db_engine.dispose()
+
+    writes = players * games * 2
+    return {
+        'mode': mode,
+        'profile': profile,
+        'writes': writes,
+        'commits': commits[0],
+        'elapsed': elapsed,
+        'writes_per_sec': writes / elapsed if elapsed else 0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк group commit")
+    parser.add_argument('--players', type=int, default=64, help="Количество одновременных игроков")
+    parser.add_argument('--games', type=int, default=20, help="Игр на игрока")
+    parser.add_argument('--workers', type=int, default=4, help="Потоков БД в режиме direct")
+    parser.add_argument('--max-batch', type=int, default=64, help="Максимальный размер пачки")
+    args = parser.parse_args()
+
+    # Перехватываем print() репозиториев, чтобы не мешать замеру
+    real_stdout = sys.stdout
+    results = []
+    for profile in SQLITE_PROFILES:
+        for mode in ('direct', 'group'):
+            sys.stdout = open(os.devnull, 'w')
+            try:
+                results.append(asyncio.run(
+                    run_mode(mode, profile, args.players, args.games, args.workers, args.max_batch)
+                ))
+            finally:
+                sys.stdout.close()
+                sys.stdout = real_stdout
+
+    print(f"Игроков: {args.players}, игр на игрока: {args.games}")
+    print(f"{'профиль':<12} {'режим':<7} {'записей':>8} {'commit':>7} {'время, с':>9} {'записей/с':>10}")
+    for result in results:
+        print(
+            f"{result['profile']:<12} {result['mode']:<7} {result['writes']:>8} {result['commits']:>7} "
+            f"{result['elapsed']:>9.2f} {result['writes_per_sec']:>10.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Бенчмарк окна топа вокруг игрока (/leaderboard me) на 1 млн игроков.
+
+Для общего топа и топа игры замеряются:
+- соседи    - поиск игроков выше и ниже по индексу: время в БД (от отправки
+              запроса до получения строк) и полное время вызова репозитория
+- COUNT     - место игрока подсчетом строк выше него (RANK_INDEX=sql)
+- индекс    - место игрока по индексу в памяти (RANK_INDEX=memory)
+
+Запуск:
+    python -m benchmarks.bench_leaderboard_around --users 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Бенчмарку не нужен бот - подставляем значения для загрузки конфига
+os.environ.setdefault('TG_TOKEN', 'benchmark')
+os.environ.setdefault('DB_URL', 'sqlite:///:memory:')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from database.engine import create_db_engine
+from database.models import Base
+from database.rank_index import GameRankIndexes, ScoreRankIndex
+from repositories import RatingRepository
+
+GAME_ID = 1
+RADIUS = 5
+
+
+def prepare_database(db_engine, users_count: int, seed: int = 1):
+    """Заполняет users, ratings одной игры и user_totals"""
+    Base.metadata.create_all(db_engine)
+    random_generator = random.Random(seed)
+
+    connection = db_engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("INSERT INTO games (id, name, code, is_active) VALUES (?, 'Бенчмарк', 'benchmark', 1)", (GAME_ID,))
+        cursor.executemany(
+            "INSERT INTO users (id, telegram_id, first_name) VALUES (?, ?, ?)",
+            ((user_id, user_id, f"User{user_id}") for user_id in range(1, users_count + 1))
+        )
+        cursor.executemany(
+            "INSERT INTO ratings (user_id, game_id, total_score, games_played, best_score) VALUES (?, ?, ?, 1, 0)",
+            ((user_id, GAME_ID, random_generator.randint(0, 100000)) for user_id in range(1, users_count + 1))
+        )
+        cursor.execute("""
+            INSERT INTO user_totals (user_id, total_score, total_games, best_score)
+            SELECT user_id, total_score, games_played, best_score FROM ratings
+        """)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+class DBTimer:
+    """Суммарное время выполнения SQL на соединениях движка и время последнего запроса"""
+
+    def __init__(self, db_engine):
+        self.total = 0.0
+        self.last = 0.0
+        self.last_statement = None
+        event.listen(db_engine, 'before_cursor_execute', self._before)
+        event.listen(db_engine, 'after_cursor_execute', self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        context._bench_started = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        self.last = time.perf_counter() - context._bench_started
+        self.last_statement = statement
+        self.total += self.last
+
+
+def measure(function, user_ids: list) -> float:
+    """Среднее время одного вызова, мс"""
+    started = time.perf_counter()
+    for user_id in user_ids:
+        function(user_id)
+    return (time.perf_counter() - started) / len(user_ids) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк окна топа вокруг игрока")
+    parser.add_argument('--users', type=int, default=1000000, help="Игроков с рейтингом")
+    parser.add_argument('--lookups', type=int, default=200, help="Окон на замер")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_engine = create_db_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}", profile='performance')
+        prepare_database(db_engine, args.users)
+        Session = sessionmaker(bind=db_engine)
+        random_generator = random.Random(2)
+        user_ids = [random_generator.randint(1, args.users) for _ in range(args.lookups)]
+
+        timer = DBTimer(db_engine)
+
+        print(f"Игроков: {args.users}, окно: {RADIUS} выше и ниже, мс на окно")
+        print(f"{'топ':>6} {'соседи: БД':>11} {'соседи: всего':>14} {'место: COUNT':>13} {'место: индекс':>14}")
+        with Session() as db:
+            rating_repo = RatingRepository(db)
+            game_indexes = GameRankIndexes()
+            global_index = ScoreRankIndex()
+            # Перехватываем print() загрузки индексов, чтобы не мешать таблице
+            real_stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+            try:
+                global_index.load(db)
+                game_indexes.load(db)
+            finally:
+                sys.stdout.close()
+                sys.stdout = real_stdout
+
+            for title, game_id, index in (("общий", None, global_index), ("игра", GAME_ID, game_indexes.get(GAME_ID))):
+                def window(user_id):
+                    return rating_repo.get_leaderboard_around(user_id, game_id, RADIUS, with_place=False)
+
+                def window_with_place(user_id):
+                    return rating_repo.get_leaderboard_around(user_id, game_id, RADIUS)
+
+                # Место из индекса совпадает с подсчетом в БД
+                for user_id in user_ids[:5]:
+                    place, rows = window_with_place(user_id)
+                    caller_row = next(row for row, (user, *_) in enumerate(rows) if user.id == user_id)
+                    assert index.position(user_id) == place + caller_row
+
+                timer.total = 0.0
+                window_ms = measure(window, user_ids)
+                db_ms = timer.total / len(user_ids) * 1000
+
+                # COUNT места - последний запрос окна с местом, замеряется тем же таймером, что и соседи
+                count_total = 0.0
+                for user_id in user_ids:
+                    window_with_place(user_id)
+                    assert 'count(' in timer.last_statement.lower()
+                    count_total += timer.last
+                count_ms = count_total / len(user_ids) * 1000
+                index_ms = measure(index.position, user_ids)
+                print(f"{title:>6} {db_ms:>11.3f} {window_ms:>14.3f} {count_ms:>13.3f} {index_ms:>14.4f}")
+
+        db_engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
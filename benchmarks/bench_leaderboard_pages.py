@@ -0,0 +1,110 @@
+"""
+Бенчмарк листания топа игры: OFFSET против пагинации по ключу
+(total_score, user_id) на глубоких страницах.
+
+Запуск:
+    python -m benchmarks.bench_leaderboard_pages --users 300000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Бенчмарку не нужен бот - подставляем значения для загрузки конфига
+os.environ.setdefault('TG_TOKEN', 'benchmark')
+os.environ.setdefault('DB_URL', 'sqlite:///:memory:')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from database.engine import create_db_engine
+from database.models import Base, Rating, User
+from repositories import RatingRepository
+
+GAME_ID = 1
+PAGE_SIZE = 10
+
+
+def prepare_database(db_engine, users_count: int, seed: int = 1):
+    """Заполняет users и ratings одной игры"""
+    Base.metadata.create_all(db_engine)
+    random_generator = random.Random(seed)
+
+    connection = db_engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("INSERT INTO games (id, name, code, is_active) VALUES (?, 'Бенчмарк', 'benchmark', 1)", (GAME_ID,))
+        cursor.executemany(
+            "INSERT INTO users (id, telegram_id, first_name) VALUES (?, ?, ?)",
+            ((user_id, user_id, f"User{user_id}") for user_id in range(1, users_count + 1))
+        )
+        cursor.executemany(
+            "INSERT INTO ratings (user_id, game_id, total_score, games_played, best_score) VALUES (?, ?, ?, 1, 0)",
+            ((user_id, GAME_ID, random_generator.randint(0, 5000)) for user_id in range(1, users_count + 1))
+        )
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def offset_page(db, offset: int):
+    """Страница топа через OFFSET"""
+    stmt = (
+        select(Rating, User)
+        .join(User, Rating.user_id == User.id)
+        .where(Rating.game_id == GAME_ID)
+        .order_by(Rating.total_score.desc(), Rating.user_id)
+        .offset(offset)
+        .limit(PAGE_SIZE)
+    )
+    return db.execute(stmt).all()
+
+
+def measure(function, repeats: int) -> float:
+    """Среднее время вызова, мс"""
+    started = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - started) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк листания топа игры")
+    parser.add_argument('--users', type=int, default=300000, help="Игроков с рейтингом")
+    parser.add_argument('--repeats', type=int, default=20, help="Повторов на замер")
+    args = parser.parse_args()
+
+    depths = [depth for depth in (0, 1000, 10000, 100000, args.users - PAGE_SIZE) if depth <= args.users - PAGE_SIZE]
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_engine = create_db_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}", profile='performance')
+        prepare_database(db_engine, args.users)
+        Session = sessionmaker(bind=db_engine)
+
+        print(f"Игроков: {args.users}, страница: {PAGE_SIZE}, мс на страницу")
+        print(f"{'с места':>9} {'OFFSET':>9} {'по ключу':>9}")
+        with Session() as db:
+            rating_repo = RatingRepository(db)
+            for depth in depths:
+                # Ключ строки перед страницей - то, что приходит в кнопке "Вперед"
+                after = None
+                if depth:
+                    rating, _ = offset_page(db, depth - 1)[0]
+                    after = (rating.total_score, rating.user_id)
+
+                keyset_rows, _ = rating_repo.get_leaderboard_page(GAME_ID, PAGE_SIZE, after=after)
+                offset_rows = offset_page(db, depth)
+                assert [rating.user_id for rating, _ in keyset_rows] == [rating.user_id for rating, _ in offset_rows]
+
+                offset_ms = measure(lambda: offset_page(db, depth), args.repeats)
+                keyset_ms = measure(lambda: rating_repo.get_leaderboard_page(GAME_ID, PAGE_SIZE, after=after), args.repeats)
+                print(f"{depth + 1:>9} {offset_ms:>9.2f} {keyset_ms:>9.2f}")
+
+        db_engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Бенчмарк глобального ранга (/rating): индекс в памяти против запросов к БД
+на 100 тыс. и 1 млн игроков.
+
+Сравниваются:
+- group_by   - прежний запрос: суммы очков всех игроков по ratings и подсчет тех, кто выше
+- user_totals - текущий запрос к БД: подсчет по индексу user_totals
+- index      - ScoreRankIndex (дерево Фенвика в памяти)
+
+Запуск:
+    python -m benchmarks.bench_rank_index --users 100000,1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Бенчмарку не нужен бот - подставляем значения для загрузки конфига
+os.environ.setdefault('TG_TOKEN', 'benchmark')
+os.environ.setdefault('DB_URL', 'sqlite:///:memory:')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from database.engine import create_db_engine
+from database.models import Base
+from database.rank_index import ScoreRankIndex
+from repositories import RatingRepository
+
+GAMES = 3
+
+# Глобальный ранг до появления user_totals
+GROUP_BY_RANK = text("""
+    SELECT count(*) FROM (
+        SELECT users.id, sum(ratings.total_score) AS total_score
+        FROM users JOIN ratings ON users.id = ratings.user_id
+        GROUP BY users.id
+    ) AS user_scores
+    WHERE user_scores.total_score > (SELECT sum(total_score) FROM ratings WHERE user_id = :user_id)
+""")
+
+
+def prepare_database(db_engine, users_count: int, seed: int = 1):
+    """Заполняет users, ratings (по GAMES игр на игрока) и user_totals"""
+    Base.metadata.create_all(db_engine)
+    random_generator = random.Random(seed)
+
+    connection = db_engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.executemany(
+            "INSERT INTO games (id, name, code, is_active) VALUES (?, ?, ?, 1)",
+            [(game_id, f"Game {game_id}", f"game{game_id}") for game_id in range(1, GAMES + 1)]
+        )
+        cursor.executemany(
+            "INSERT INTO users (id, telegram_id, first_name) VALUES (?, ?, ?)",
+            ((user_id, user_id, f"User{user_id}") for user_id in range(1, users_count + 1))
+        )
+        cursor.executemany(
+            "INSERT INTO ratings (user_id, game_id, total_score, games_played, best_score) VALUES (?, ?, ?, 1, ?)",
+            (
+                (user_id, game_id, score, score)
+                for user_id in range(1, users_count + 1)
+                for game_id in range(1, GAMES + 1)
+                for score in (random_generator.randint(0, 1000),)
+            )
+        )
+        cursor.execute("""
+            INSERT INTO user_totals (user_id, total_score, total_games, best_score)
+            SELECT user_id, sum(total_score), sum(games_played), max(best_score) FROM ratings GROUP BY user_id
+        """)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def measure(function, user_ids: list) -> float:
+    """Среднее время одного вызова, мкс"""
+    started = time.perf_counter()
+    for user_id in user_ids:
+        function(user_id)
+    return (time.perf_counter() - started) / len(user_ids) * 1_000_000
+
+
+def run(users_count: int, sql_lookups: int, index_lookups: int) -> dict:
+    """Замеры на новой файловой БД с users_count игроками"""
+    with tempfile.TemporaryDirectory() as directory:
+        db_engine = create_db_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}", profile='performance')
+        prepare_database(db_engine, users_count)
+        Session = sessionmaker(bind=db_engine)
+        random_generator = random.Random(2)
+
+        with Session() as db:
+            rating_repo = RatingRepository(db)
+            index = ScoreRankIndex()
+            started = time.perf_counter()
+            index.load(db)
+            load_time = time.perf_counter() - started
+
+            sql_users = [random_generator.randint(1, users_count) for _ in range(sql_lookups)]
+            index_users = [random_generator.randint(1, users_count) for _ in range(index_lookups)]
+            sql_places = [random_generator.randint(1, users_count) for _ in range(sql_lookups)]
+            index_places = [random_generator.randint(1, users_count) for _ in range(index_lookups)]
+
+            # Ответы индекса совпадают с запросом к БД
+            for user_id in sql_users[:5]:
+                assert index.rank(user_id) == rating_repo.get_user_global_rank(user_id)
+            for place in sql_places[:5]:
+                assert index.user_at_rank(place) == rating_repo.get_user_id_at_rank(place)
+
+            result = {
+                'users': users_count,
+                'load_sec': load_time,
+                'group_by_us': measure(lambda user_id: db.execute(GROUP_BY_RANK, {'user_id': user_id}).scalar(), sql_users),
+                'user_totals_us': measure(rating_repo.get_user_global_rank, sql_users),
+                'index_us': measure(index.rank, index_users),
+                'at_rank_sql_us': measure(rating_repo.get_user_id_at_rank, sql_places),
+                'at_rank_index_us': measure(index.user_at_rank, index_places)
+            }
+
+        db_engine.dispose()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк глобального ранга")
+    parser.add_argument('--users', default='100000,1000000', help="Количество игроков через запятую")
+    parser.add_argument('--sql-lookups', type=int, default=20, help="Запросов ранга к БД на замер")
+    parser.add_argument('--index-lookups', type=int, default=100000, help="Запросов ранга к индексу на замер")
+    args = parser.parse_args()
+
+    # Перехватываем print() индекса, чтобы не мешать замеру
+    real_stdout = sys.stdout
+    results = []
+    for users_count in (int(value) for value in args.users.split(',')):
+        sys.stdout = open(os.devnull, 'w')
+        try:
+            results.append(run(users_count, args.sql_lookups, args.index_lookups))
+        finally:
+            sys.stdout.close()
+            sys.stdout = real_stdout
+
+    print("Ранг игрока, мкс на запрос (загрузка индекса - один раз при старте)")
+    print(
+        f"{'игроков':>9} {'загрузка, с':>12} {'group_by':>10} {'user_totals':>12} {'индекс':>8}"
+        f" {'место K: БД':>12} {'место K: индекс':>16}"
+    )
+    for result in results:
+        print(
+            f"{result['users']:>9} {result['load_sec']:>12.2f} {result['group_by_us']:>10.0f}"
+            f" {result['user_totals_us']:>12.0f} {result['index_us']:>8.1f}"
+            f" {result['at_rank_sql_us']:>12.0f} {result['at_rank_index_us']:>16.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
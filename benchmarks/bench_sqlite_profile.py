@@ -0,0 +1,128 @@
+"""
+Бенчмарк профилей SQLite: сколько завершений игр (commit) в секунду
+выдерживает БД при конкурентной записи из нескольких потоков.
+
+Запуск:
+    python -m benchmarks.bench_sqlite_profile --threads 8 --commits 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Бенчмарку не нужен бот - подставляем значения для загрузки конфига
+os.environ.setdefault('TG_TOKEN', 'benchmark')
+os.environ.setdefault('DB_URL', 'sqlite:///:memory:')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from database.engine import SQLITE_PROFILES, create_db_engine
+from database.models import Base, User, Game
+from repositories import GameSessionRepository
+
+
+def prepare_database(db_engine, users_count: int) -> tuple[list[int], int]:
+    """Создает таблицы, пользователей и игру"""
+    Base.metadata.create_all(db_engine)
+    Session = sessionmaker(bind=db_engine)
+    with Session() as db:
+        game = Game(name="Бенчмарк", code="benchmark")
+        users = [User(telegram_id=i, first_name=f"User{i}") for i in range(users_count)]
+        db.add(game)
+        db.add_all(users)
+        db.commit()
+        return [user.id for user in users], game.id
+
+
+def run_profile(profile: str, threads: int, commits: int) -> dict:
+    """Запускает конкурентные завершения сессий на новой файловой БД"""
+    with tempfile.TemporaryDirectory() as directory:
+        db_url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        db_engine = create_db_engine(db_url, profile=profile)
+        Session = sessionmaker(bind=db_engine, autoflush=False)
+        user_ids, game_id = prepare_database(db_engine, threads)
+
+        commits_count = [0]
+        commits_lock = threading.Lock()
+
+        @event.listens_for(db_engine, 'commit')
+        def on_commit(connection):
+            with commits_lock:
+                commits_count[0] += 1
+
+        errors = []
+        completed = []
+        start_barrier = threading.Barrier(threads)
+
+        def worker(user_id: int):
+            start_barrier.wait()
+            done = 0
+            for i in range(commits):
+                db = Session()
+                try:
+                    session_repo = GameSessionRepository(db)
+                    session = session_repo.create_session(user_id, game_id)
+                    session_repo.complete_session(session.id, i % 100, 1)
+                    db.commit()
+                    done += 1
+                except OperationalError as e:
+                    db.rollback()
+                    errors.append(str(e.orig))
+                finally:
+                    db.close()
+            completed.append(done)
+
+        workers = [threading.Thread(target=worker, args=(user_id,)) for user_id in user_ids]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        db_engine.dispose()
+
+    games = sum(completed)
+    return {
+        'profile': profile,
+        'games': games,
+        'commits': commits_count[0],
+        'errors': len(errors),
+        'elapsed': elapsed,
+        'commits_per_sec': commits_count[0] / elapsed if elapsed else 0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк профилей SQLite")
+    parser.add_argument('--threads', type=int, default=8, help="Количество пишущих потоков")
+    parser.add_argument('--commits', type=int, default=200, help="Завершений игр на поток")
+    args = parser.parse_args()
+
+    # Перехватываем print() репозиториев, чтобы не мешать замеру
+    real_stdout = sys.stdout
+    results = []
+    for profile in SQLITE_PROFILES:
+        sys.stdout = open(os.devnull, 'w')
+        try:
+            results.append(run_profile(profile, args.threads, args.commits))
+        finally:
+            sys.stdout.close()
+            sys.stdout = real_stdout
+
+    print(f"Потоков: {args.threads}, завершений игр на поток: {args.commits}")
+    print(f"{'профиль':<12} {'игр':>7} {'commit':>7} {'ошибок':>7} {'время, с':>9} {'commit/с':>9}")
+    for result in results:
+        print(
+            f"{result['profile']:<12} {result['games']:>7} {result['commits']:>7} {result['errors']:>7} "
+            f"{result['elapsed']:>9.2f} {result['commits_per_sec']:>9.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+import bisect
+import math
+import random
+import re
+from types import MappingProxyType
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.config import config
+from database.fuzzy_index import FuzzyIndex
+from database.models import City
+
+# Буквы, на которые города не начинаются - при выборе игровой буквы пропускаются
+BAD_LETTERS = ('Ь', 'Ъ', 'Ы', 'Й')
+
+
+# Пробелы, дефисы и тире между частями названия
+CITY_SEPARATORS = re.compile(r'[\s\-\u2010-\u2015]+')
+
+# Запросы короче не ищутся неточно: одна опечатка в них - уже другое слово
+FUZZY_MIN_LENGTH = 4
+
+# Стартовый город не выбирается, если на его игровую букву меньше городов
+START_MIN_REPLIES = 20
+
+
+def normalize_city_key(city_name: str) -> str:
+    """Ключ поиска города: без регистра, ё как е, дефисы и пробелы - один пробел"""
+    return CITY_SEPARATORS.sub(' ', city_name.casefold().replace('ё', 'е')).strip()
+
+
+def get_game_letter(city_name: str) -> str:
+    """Определяет игровую букву для следующего города (последняя буква с учетом правил)"""
+    # Убираем пробелы и дефисы, переводим в верхний регистр
+    clean_city = city_name.replace(' ', '').replace('-', '').upper()
+
+    # Идем с конца и ищем первую подходящую букву (игнорируя Ь,Ъ,Ы,Й)
+    for current_char in reversed(clean_city):
+        if current_char not in BAD_LETTERS:
+            return current_char
+
+    # Если все буквы "плохие", берем последнюю
+    return clean_city[-1]
+
+
+def get_first_letter(city_name: str) -> str:
+    """Получает первую букву города"""
+    return city_name.strip()[0].upper() if city_name.strip() else ''
+
+
+def mark_used(used_ids: list[int], city_id: int) -> bool:
+    """Добавляет город в отсортированный список использованных (False - уже был в нем)"""
+    position = bisect.bisect_left(used_ids, city_id)
+    if position < len(used_ids) and used_ids[position] == city_id:
+        return False
+    used_ids.insert(position, city_id)
+    return True
+
+
+def is_used(used_ids: list[int], city_id: int) -> bool:
+    """Есть ли город в отсортированном списке использованных"""
+    position = bisect.bisect_left(used_ids, city_id)
+    return position < len(used_ids) and used_ids[position] == city_id
+
+
+class AliasSampler:
+    """
+    Случайный выбор значения с весами за O(1) (метод псевдонимов Уолкера).
+
+    Таблица строится один раз за O(N): каждая ячейка хранит вероятность
+    остаться в ней и значение-псевдоним, в которое уходит остаток.
+    Выбор - одно случайное число: номер ячейки и дробная часть.
+    """
+
+    __slots__ = ('_values', '_probabilities', '_aliases')
+
+    def __init__(self, values: list, weights: list[float]):
+        count, total = len(values), sum(weights)
+        scaled = [weight * count / total for weight in weights] if total else [1.0] * count
+        probabilities, aliases = [1.0] * count, list(range(count))
+        small = [position for position, weight in enumerate(scaled) if weight < 1]
+        large = [position for position, weight in enumerate(scaled) if weight >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            probabilities[less], aliases[less] = scaled[less], more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+        # Оставшиеся ячейки (погрешность округления) всегда выбирают себя
+
+        self._values = tuple(values)
+        self._probabilities = tuple(probabilities)
+        self._aliases = tuple(aliases)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def sample(self, random_generator=random):
+        """Случайное значение (None - значений нет)"""
+        if not self._values:
+            return None
+        point = random_generator.random() * len(self._values)
+        position = int(point)
+        if point - position >= self._probabilities[position]:
+            position = self._aliases[position]
+        return self._values[position]
+
+
+class CityIndex:
+    """
+    Неизменяемый индекс городов в памяти для игры «Города».
+
+    Строится один раз по таблице cities: нормализованное название -> id,
+    для каждого города - название, первая и игровая буква (get_game_letter
+    посчитан заранее), для каждой первой буквы - кортеж id городов.
+    Ход игры (проверка города и ответ бота) не обращается к БД.
+
+    Использованные в партии города хранятся отсортированным списком id
+    (used_ids, см. mark_used): его размер зависит от числа ходов, а не от
+    размера индекса. Первые буквы городов пронумерованы (letters): счетчики оставшихся
+    городов на каждую букву - список по этим номерам (letter_counts).
+
+    Название без точного совпадения ищется неточно (lookup): словарь
+    удалений FuzzyIndex находит города на расстоянии до max_typos опечаток.
+
+    Стартовый город выбирается за O(1) из заранее собранной таблицы
+    AliasSampler: без городов, на игровую букву которых меньше
+    START_MIN_REPLIES ответов, с весом - корнем из населения
+    (weight_by_population) или равновероятно.
+    """
+
+    __slots__ = (
+        '_ids_by_key', '_names', '_first_letters', '_game_letters', '_ids_by_letter', '_ids', 'letters', '_letter_positions', '_fuzzy', '_starts'
+    )
+
+    def __init__(self, cities, max_typos: int = 1, weight_by_population: bool = False,
+                 start_min_replies: int = START_MIN_REPLIES):
+        """
+        cities - пары (id, название) или тройки (id, название, население)
+        в порядке, в котором бот перебирает города
+        """
+        ids_by_key, names, first_letters, game_letters, ids_by_letter, populations = {}, {}, {}, {}, {}, {}
+        for city_id, name, *population in cities:
+            key = normalize_city_key(name)
+            if not key or key in ids_by_key:
+                continue
+            ids_by_key[key] = city_id
+            names[city_id] = name
+            populations[city_id] = population[0] if population else None
+            first_letters[city_id] = get_first_letter(name)
+            game_letters[city_id] = get_game_letter(name)
+            ids_by_letter.setdefault(first_letters[city_id], []).append(city_id)
+
+        self._ids_by_key = MappingProxyType(ids_by_key)
+        self._names = MappingProxyType(names)
+        self._first_letters = MappingProxyType(first_letters)
+        self._game_letters = MappingProxyType(game_letters)
+        self._ids_by_letter = MappingProxyType({letter: tuple(ids) for letter, ids in ids_by_letter.items()})
+        self._ids = tuple(names)
+        self.letters = tuple(sorted(self._ids_by_letter))
+        self._letter_positions = MappingProxyType({letter: position for position, letter in enumerate(self.letters)})
+        self._fuzzy = FuzzyIndex(ids_by_key.items(), max_typos)
+        self._starts = self._build_starts(populations, weight_by_population, start_min_replies)
+
+    def _build_starts(self, populations: dict, weight_by_population: bool, start_min_replies: int) -> AliasSampler:
+        """Таблица выбора стартового города (если сильных букв нет - из всех городов)"""
+        start_ids = [
+            city_id for city_id in self._ids
+            if len(self._ids_by_letter.get(self._game_letters[city_id], ())) >= start_min_replies
+        ] or list(self._ids)
+        if not weight_by_population:
+            return AliasSampler(start_ids, [1.0] * len(start_ids))
+
+        # Корень сглаживает разницу: крупные города чаще, но Москва не в каждой игре.
+        # Город без населения весит как медианный
+        weights = {city_id: math.sqrt(populations[city_id]) for city_id in start_ids if populations[city_id]}
+        known = sorted(weights.values())
+        default_weight = known[len(known) // 2] if known else 1.0
+        return AliasSampler(start_ids, [weights.get(city_id, default_weight) for city_id in start_ids])
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError("CityIndex неизменяем")
+        super().__setattr__(name, value)
+
+    @classmethod
+    def from_db(cls, db: Session) -> 'CityIndex':
+        """Строит индекс по таблице cities (порядок - по id, как при выборке из БД)"""
+        index = cls(
+            db.execute(select(City.id, City.name, City.population).order_by(City.id)),
+            weight_by_population=config.CITIES_START_WEIGHT == 'population'
+        )
+        print(f"🏙️ Индекс городов построен: {len(index)} городов")
+        return index
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def find(self, city_name: str) -> int | None:
+        """id города по названию (без учета регистра) или None"""
+        return self._ids_by_key.get(normalize_city_key(city_name))
+
+    def lookup(self, city_name: str) -> list[int]:
+        """
+        id городов для введенного названия: точное совпадение или ближайшие
+        с опечатками (пусто - ничего похожего)
+        """
+        key = normalize_city_key(city_name)
+        city_id = self._ids_by_key.get(key)
+        if city_id is not None:
+            return [city_id]
+        if len(key) < FUZZY_MIN_LENGTH:
+            return []
+        return self._fuzzy.lookup(key)[0]
+
+    def name(self, city_id: int) -> str:
+        """Название города"""
+        return self._names[city_id]
+
+    def first_letter(self, city_id: int) -> str:
+        """Первая буква города"""
+        return self._first_letters[city_id]
+
+    def game_letter(self, city_id: int) -> str:
+        """Буква, на которую должен начинаться следующий город"""
+        return self._game_letters[city_id]
+
+    def cities_on(self, letter: str) -> tuple:
+        """id городов на букву (в порядке id)"""
+        return self._ids_by_letter.get(letter, ())
+
+    def letter_position(self, letter: str) -> int | None:
+        """Номер первой буквы в letters (None - на букву нет городов)"""
+        return self._letter_positions.get(letter)
+
+    def letter_counts(self, used_ids: list[int] = ()) -> list[int]:
+        """Сколько городов на каждую букву letters нет среди использованных used_ids"""
+        counts = [len(self._ids_by_letter[letter]) for letter in self.letters]
+        for city_id in used_ids:
+            counts[self._letter_positions[self._first_letters[city_id]]] -= 1
+        return counts
+
+    def first_unused(self, letter: str, used_ids: list[int]) -> int | None:
+        """Первый город на букву letter, которого нет среди использованных used_ids (None - города кончились)"""
+        used = set(used_ids)
+        for city_id in self._ids_by_letter.get(letter, ()):
+            if city_id not in used:
+                return city_id
+        return None
+
+    def random_city(self, random_generator=random) -> int | None:
+        """id случайного города для начала игры за O(1) (None - городов нет)"""
+        return self._starts.sample(random_generator)
+
+
+# Индекс бота: строится при старте (или при первом ходе) и заменяется целиком
+_city_index: CityIndex | None = None
+
+
+def get_city_index() -> CityIndex | None:
+    """Построенный индекс городов или None"""
+    return _city_index
+
+
+def set_city_index(index: CityIndex | None) -> CityIndex | None:
+    """Публикует индекс городов (None - сбросить, следующий ход построит заново)"""
+    global _city_index
+    _city_index = index
+    return index
@@ -0,0 +1,44 @@
+import random
+from database.city_index import CityIndex
+
+# Уровни бота в «Городах»
+LEVELS = ('easy', 'normal', 'hard')
+
+
+def replies_left(city_index: CityIndex, city_id: int, remaining: list[int]) -> int:
+    """
+    Сколько ответов останется у игрока, если бот назовет город.
+
+    remaining - счетчики неиспользованных городов по буквам city_index.letters;
+    сам город (если он начинается на свою игровую букву) уже не ответ.
+    """
+    game_letter = city_index.game_letter(city_id)
+    position = city_index.letter_position(game_letter)
+    if position is None:
+        return 0
+    return remaining[position] - (city_index.first_letter(city_id) == game_letter)
+
+
+def choose_bot_city(city_index: CityIndex, letter: str, used_ids: list[int], remaining: list[int],
+                    level: str = 'normal', random_generator=random) -> int | None:
+    """
+    Ход бота: город на букву letter, которого нет среди использованных used_ids (None - города кончились).
+
+    - easy   - город, после которого у игрока больше всего ответов
+    - normal - случайный город
+    - hard   - город, после которого у игрока меньше всего ответов
+
+    Перебираются только города на одну букву: число ответов берется
+    из счетчиков remaining, которые игра обновляет на каждом ходе.
+    Из равных по оценке городов выбирается случайный.
+    """
+    used = set(used_ids)
+    candidates = [city_id for city_id in city_index.cities_on(letter) if city_id not in used]
+    if not candidates:
+        return None
+    if level == 'normal':
+        return random_generator.choice(candidates)
+
+    scores = [replies_left(city_index, city_id, remaining) for city_id in candidates]
+    best = min(scores) if level == 'hard' else max(scores)
+    return random_generator.choice([city_id for city_id, score in zip(candidates, scores) if score == best])
@@ -0,0 +1,68 @@
+import asyncio
+from collections import defaultdict
+from datetime import date, datetime
+from database.session import session_scope
+from repositories.game_session_repository import GameSessionRepository
+
+
+class GameStartCounter:
+    """
+    Счетчик запусков игр в памяти.
+
+    Запуск игры только увеличивает число в словаре, а в таблицу
+    game_start_stats накопленные значения попадают одним запросом
+    раз в несколько секунд. Так брошенные игры не пишут в БД на каждом
+    старте, а статистика админки (всего игр, процент завершения) остается точной.
+    """
+
+    def __init__(self):
+        self._pending = defaultdict(int)  # (game_id, day) -> запусков с последнего сброса
+
+    def increment(self, game_id: int):
+        """Учитывает запуск игры (день - по UTC, как started_at сессий)"""
+        self._pending[(game_id, datetime.utcnow().date())] += 1
+
+    def pending_count(self, game_id: int = None, since_day: date = None) -> int:
+        """Запуски, еще не сброшенные в БД"""
+        return sum(
+            count for (pending_game_id, day), count in self._pending.items()
+            if (game_id is None or pending_game_id == game_id)
+            and (since_day is None or day >= since_day)
+        )
+
+    def take(self) -> dict:
+        """Забирает накопленные запуски для записи"""
+        pending, self._pending = self._pending, defaultdict(int)
+        return dict(pending)
+
+    def restore(self, pending: dict):
+        """Возвращает запуски обратно, если записать их не удалось"""
+        for key, count in pending.items():
+            self._pending[key] += count
+
+    async def flush(self, session_factory=None):
+        """Записывает накопленные запуски в game_start_stats одной транзакцией"""
+        pending = self.take()
+        if not pending:
+            return
+        try:
+            async with session_scope(session_factory) as db:
+                await db.run_sync(lambda sync_db: GameSessionRepository(sync_db).add_session_starts(pending))
+        except Exception as e:
+            self.restore(pending)
+            print(f"❌ Ошибка записи счетчика запусков: {e}")
+
+
+# Общий счетчик бота
+game_start_counter = GameStartCounter()
+
+
+async def run_counter_flush(interval: float):
+    """Периодически сбрасывает счетчик запусков в БД (задача живет все время работы бота)"""
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            await game_start_counter.flush()
+    finally:
+        # При остановке бота сохраняем то, что успели накопить
+        await game_start_counter.flush()
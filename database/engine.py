@@ -1,15 +1,112 @@
 import os
-from sqlalchemy import create_engine
+from alembic import command
+from alembic.config import Config as AlembicConfig
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool, QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from app.config import config
 from database.models import Base
+from database.profiler import StatementProfiler
+
+# Профили настройки SQLite, применяются к каждому новому соединению.
+# default - настройки SQLite по умолчанию (rollback journal, без ожидания блокировок)
+# performance - WAL: читатели не блокируют писателя, commit без fsync на каждую транзакцию
+SQLITE_PROFILES = {
+    'default': {
+        'pragmas': {},
+        'pool_size': 5,
+        'max_overflow': 10
+    },
+    'performance': {
+        'pragmas': {
+            'journal_mode': 'WAL',        # Журнал с упреждающей записью
+            'synchronous': 'NORMAL',      # fsync только при checkpoint (безопасно в WAL)
+            'busy_timeout': 5000,         # Ждать блокировку до 5 с вместо "database is locked"
+            'cache_size': -65536,         # Кэш страниц 64 МБ (отрицательное значение - в КБ)
+            'mmap_size': 268435456,       # Чтение через mmap до 256 МБ
+            'temp_store': 'MEMORY'        # Временные таблицы и индексы в памяти
+        },
+        # Постоянные соединения сохраняют прогретый кэш страниц и mmap
+        'pool_size': 10,
+        'max_overflow': 10
+    }
+}
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: dict):
+    """Выполняет PRAGMA для нового соединения SQLite"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def _is_sqlite_memory(db_url: str) -> bool:
+    """Проверяет, что URL указывает на SQLite в памяти"""
+    url = make_url(db_url)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def _engine_options(db_url: str, profile: str, is_async: bool) -> dict:
+    """Подбирает класс пула и его размер под профиль"""
+    if make_url(db_url).get_backend_name() != 'sqlite':
+        return {}
+
+    if _is_sqlite_memory(db_url):
+        # БД в памяти существует, пока живет соединение - одно на всех
+        return {'poolclass': StaticPool, 'connect_args': {'check_same_thread': False}}
+
+    settings = SQLITE_PROFILES[profile]
+    return {
+        'poolclass': AsyncAdaptedQueuePool if is_async else QueuePool,
+        'pool_size': settings['pool_size'],
+        'max_overflow': settings['max_overflow']
+    }
+
+
+def _attach_sqlite_profile(sync_engine, profile: str):
+    """Подписывается на подключение и применяет PRAGMA профиля"""
+    if sync_engine.dialect.name != 'sqlite':
+        return
+
+    pragmas = SQLITE_PROFILES[profile]['pragmas']
+    if not pragmas:
+        return
+
+    @event.listens_for(sync_engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
+
+
+def create_db_engine(db_url: str, profile: str = config.DB_PROFILE):
+    """Создает синхронный движок с профилем SQLite"""
+    db_engine = create_engine(
+        db_url,
+        echo=False,            # Показывать SQL запросы в консоли (для разработки)
+        future=True,           # Использовать SQLAlchemy 2.0 style
+        **_engine_options(db_url, profile, is_async=False)
+    )
+    _attach_sqlite_profile(db_engine, profile)
+    return db_engine
+
+
+def create_async_db_engine(db_url: str, profile: str = config.DB_PROFILE):
+    """Создает асинхронный движок (aiosqlite) с профилем SQLite"""
+    db_engine = create_async_engine(
+        db_url,
+        echo=False,
+        **_engine_options(db_url, profile, is_async=True)
+    )
+    _attach_sqlite_profile(db_engine.sync_engine, profile)
+    return db_engine
+
 
 # Создаем движок БД
-engine = create_engine(
-    config.DB_URL,  
-    echo=False,            # Показывать SQL запросы в консоли (для разработки)
-    future=True           # Использовать SQLAlchemy 2.0 style
-)
+engine = create_db_engine(config.DB_URL)
 
 # Создаем фабрику сессий
 SessionLocal = sessionmaker(
@@ -18,11 +115,72 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# Фабрика сессий для режима executor: сессия живет в потоке воркера,
+# а загруженные объекты читаются в event loop, поэтому без expire_on_commit
+ExecutorSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    bind=engine
+)
+
+# Асинхронный движок (aiosqlite) для хендлеров - запросы не блокируют event loop
+async_engine = create_async_db_engine(config.ASYNC_DB_URL)
+
+# Фабрика асинхронных сессий.
+# expire_on_commit=False - после commit объекты остаются доступными в хендлерах
+# без повторной (ленивой) загрузки, которая в async-режиме невозможна
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Профилировщик SQL (DB_PROFILER=on): время и число строк по каждому запросу
+# с разбивкой по методу репозитория и хендлеру, лог медленных запросов с EXPLAIN
+sql_profiler: StatementProfiler = None
+if config.DB_PROFILER == 'on':
+    sql_profiler = StatementProfiler(slow_query_ms=config.DB_SLOW_QUERY_MS)
+    sql_profiler.attach(engine)
+    sql_profiler.attach(async_engine.sync_engine)
+
+# Конфигурация Alembic лежит в корне проекта
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'alembic.ini')
+
+# Ревизия, соответствующая схеме, которую раньше создавал create_all
+BASELINE_REVISION = '0001'
+
+
+def get_alembic_config() -> AlembicConfig:
+    """Возвращает конфигурацию Alembic проекта"""
+    return AlembicConfig(ALEMBIC_INI)
+
+
+def run_migrations(db_engine=None, revision: str = 'head'):
+    """Применяет миграции Alembic к БД движка"""
+    db_engine = db_engine or engine
+    alembic_config = get_alembic_config()
+
+    with db_engine.begin() as connection:
+        # Миграции используют переданное соединение вместо своего движка
+        alembic_config.attributes['connection'] = connection
+
+        tables = set(inspect(connection).get_table_names())
+        if tables and 'alembic_version' not in tables:
+            # БД создана через create_all до появления миграций -
+            # отмечаем базовую ревизию и докатываем только новые изменения
+            print("🏷️ Существующая БД без миграций, отмечаем базовую ревизию...")
+            command.stamp(alembic_config, BASELINE_REVISION)
+
+        command.upgrade(alembic_config, revision)
+
+
 def init_db():
-    """Создает все таблицы в БД"""
-    print("🗃️ Создаем таблицы в базе данных...")
-    Base.metadata.create_all(bind=engine)
-    print("✅ Таблицы созданы успешно!")
+    """Приводит схему БД к последней миграции"""
+    print("🗃️ Применяем миграции базы данных...")
+    run_migrations()
+    print("✅ Схема БД актуальна!")
 
 def get_db():
     """Генератор сессий для dependency injection"""
@@ -30,4 +188,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    """Асинхронный генератор сессий для dependency injection"""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,170 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from sqlalchemy.orm import Session
+
+
+class DBExecutor:
+    """
+    Ограниченный пул потоков для синхронных репозиториев.
+
+    Каждый воркер - отдельный поток со своей очередью задач. Сессия берет
+    свободного воркера на один вызов и сразу возвращает его, если в БД
+    не осталось открытой записи. Пока запись открыта (после flush и до
+    commit/rollback), воркер остается за сессией - так транзакция не
+    переходит между потоками, а вторая запись в том же потоке не ждет
+    блокировку, которую держит первая. Если все воркеры заняты, вызовы
+    ждут в очереди - так нагрузка на БД остается ограниченной, а event loop
+    не блокируется.
+    """
+
+    def __init__(self, session_factory, max_workers: int = 4):
+        self.session_factory = session_factory
+        self.max_workers = max_workers
+        self._workers = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"db-worker-{i}")
+            for i in range(max_workers)
+        ]
+        self._free_workers = None
+
+        # Статистика
+        self.waiting = 0            # Сколько сессий сейчас ждут воркера
+        self.max_waiting = 0        # Максимальная глубина очереди
+        self.acquired_count = 0     # Сколько раз выдавали воркера
+        self.total_wait = 0.0       # Суммарное время ожидания (сек)
+        self.max_wait = 0.0         # Максимальное время ожидания (сек)
+
+    def _get_free_workers(self) -> asyncio.Queue:
+        """Очередь свободных воркеров (создается в работающем event loop)"""
+        if self._free_workers is None:
+            self._free_workers = asyncio.Queue()
+            for worker in self._workers:
+                self._free_workers.put_nowait(worker)
+        return self._free_workers
+
+    async def acquire(self) -> ThreadPoolExecutor:
+        """Ждет свободного воркера и учитывает время ожидания"""
+        free_workers = self._get_free_workers()
+
+        started = time.perf_counter()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            worker = await free_workers.get()
+        finally:
+            self.waiting -= 1
+
+        wait = time.perf_counter() - started
+        self.acquired_count += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        return worker
+
+    def release(self, worker: ThreadPoolExecutor):
+        """Возвращает воркера в пул"""
+        self._get_free_workers().put_nowait(worker)
+
+    def session(self) -> 'ExecutorSession':
+        """Создает новую сессию, работающую через пул"""
+        return ExecutorSession(self)
+
+    def stats(self) -> dict:
+        """Возвращает статистику пула: глубину очереди и время ожидания"""
+        free_workers = self._free_workers.qsize() if self._free_workers else self.max_workers
+        return {
+            'workers': self.max_workers,
+            'busy_workers': self.max_workers - free_workers,
+            'queue_depth': self.waiting,
+            'max_queue_depth': self.max_waiting,
+            'acquired': self.acquired_count,
+            'avg_wait_ms': (self.total_wait / self.acquired_count * 1000) if self.acquired_count else 0,
+            'max_wait_ms': self.max_wait * 1000
+        }
+
+    def shutdown(self):
+        """Останавливает все воркеры"""
+        for worker in self._workers:
+            worker.shutdown(wait=True)
+
+
+def has_open_write(session: Session) -> bool:
+    """
+    Открыта ли в БД запись: SQLite начинает транзакцию только перед
+    INSERT/UPDATE/DELETE, чтение ее не открывает.
+    Для драйверов без in_transaction и для транзакции после ошибки
+    (ждет rollback) считаем, что открыта
+    """
+    transaction = session.get_transaction()
+    if transaction is None:
+        return False
+    if not transaction.is_active:
+        return True
+    dbapi_connection = session.connection().connection.dbapi_connection
+    return getattr(dbapi_connection, 'in_transaction', True)
+
+
+class ExecutorSession:
+    """
+    Сессия БД, выполняющая запросы в потоках-воркерах DBExecutor.
+    Повторяет интерфейс AsyncSession (run_sync, commit, rollback, close),
+    поэтому асинхронные репозитории работают с ней без изменений.
+
+    Воркер занимается только на время вызова (или открытой записи), поэтому
+    между запросами - например, пока хендлер ждет ответа Telegram - сессия
+    не держит место в пуле
+    """
+
+    def __init__(self, executor: DBExecutor):
+        self.executor = executor
+        self._worker = None
+        self._holds_worker = False
+        self._sync_session: Session = None
+
+    def _call_in_worker(self, fn, *args, **kwargs):
+        """Выполняется в потоке воркера: создает Session при первом обращении и вызывает fn(session)"""
+        if self._sync_session is None:
+            self._sync_session = self.executor.session_factory()
+        try:
+            return fn(self._sync_session, *args, **kwargs)
+        finally:
+            self._holds_worker = has_open_write(self._sync_session)
+
+    async def _call(self, fn, *args, **kwargs):
+        """Выполняет fn(session, ...) в потоке воркера и возвращает воркера, если запись не открыта"""
+        if self._worker is None:
+            self._worker = await self.executor.acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._worker, partial(self._call_in_worker, fn, *args, **kwargs))
+        finally:
+            if not self._holds_worker:
+                self.executor.release(self._worker)
+                self._worker = None
+
+    async def run_sync(self, fn, *args, **kwargs):
+        """Вызывает fn(session, *args, **kwargs) в потоке воркера"""
+        return await self._call(fn, *args, **kwargs)
+
+    async def commit(self):
+        if self._sync_session is not None:
+            await self._call(Session.commit)
+
+    async def rollback(self):
+        if self._sync_session is not None:
+            await self._call(Session.rollback)
+
+    async def close(self):
+        """Закрывает Session (воркер к этому моменту уже возвращен в пул)"""
+        if self._sync_session is None:
+            return
+        try:
+            await self._call(Session.close)
+        finally:
+            self._sync_session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
@@ -0,0 +1,115 @@
+from types import MappingProxyType
+from typing import Iterable
+
+
+def _distance_up_to_one(first: str, second: str) -> int:
+    """edit_distance при limit=1: один проход вместо таблицы"""
+    if first == second:
+        return 0
+    if len(first) > len(second):
+        first, second = second, first
+    if len(second) - len(first) > 1:
+        return 2
+
+    # Первая различающаяся буква
+    i = 0
+    while i < len(first) and first[i] == second[i]:
+        i += 1
+    if len(first) < len(second):
+        return 1 if first[i:] == second[i + 1:] else 2
+    if first[i + 1:] == second[i + 1:]:
+        return 1
+    # Перестановка соседних букв
+    if (i + 1 < len(first) and first[i] == second[i + 1] and first[i + 1] == second[i]
+            and first[i + 2:] == second[i + 2:]):
+        return 1
+    return 2
+
+
+def edit_distance(first: str, second: str, limit: int) -> int:
+    """
+    Расстояние Дамерау-Левенштейна (вставка, удаление, замена и перестановка
+    соседних букв). Больше limit не считается - возвращается limit + 1
+    """
+    if limit == 1:
+        return _distance_up_to_one(first, second)
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+
+    previous_row, row = None, list(range(len(second) + 1))
+    for i in range(1, len(first) + 1):
+        before_previous, previous_row = previous_row, row
+        row = [i] + [0] * len(second)
+        for j in range(1, len(second) + 1):
+            cost = first[i - 1] != second[j - 1]
+            row[j] = min(previous_row[j] + 1, row[j - 1] + 1, previous_row[j - 1] + cost)
+            if (i > 1 and j > 1 and first[i - 1] == second[j - 2] and first[i - 2] == second[j - 1]):
+                row[j] = min(row[j], before_previous[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+    return min(row[-1], limit + 1)
+
+
+def deletes(key: str, max_distance: int) -> set[str]:
+    """Сам ключ и все строки, получаемые из него удалением до max_distance букв"""
+    variants, edge = {key}, {key}
+    for _ in range(max_distance):
+        edge = {variant[:i] + variant[i + 1:] for variant in edge if len(variant) > 1 for i in range(len(variant))}
+        variants |= edge
+    return variants
+
+
+class FuzzyIndex:
+    """
+    Неточный поиск по ключам (SymSpell): словарь удалений.
+
+    Для каждого ключа заранее записаны все варианты с удалением до
+    max_distance букв. Запрос порождает свои варианты удалений (их столько,
+    сколько букв в запросе, а не сколько ключей в словаре), ищет их в
+    словаре и проверяет найденных кандидатов настоящим расстоянием.
+    Поиск не зависит от числа ключей, память - примерно (длина ключа) записей на ключ.
+    """
+
+    __slots__ = ('max_distance', '_keys', '_deletes')
+
+    def __init__(self, items: Iterable[tuple[str, int]], max_distance: int = 1):
+        """items - пары (нормализованный ключ, значение)"""
+        keys, variants = {}, {}
+        for key, value in items:
+            keys[value] = key
+            for variant in deletes(key, max_distance):
+                variants.setdefault(variant, []).append(value)
+
+        self.max_distance = max_distance
+        self._keys = MappingProxyType(keys)
+        # Один вариант почти всегда ведет к одному ключу - храним значение без списка
+        self._deletes = MappingProxyType({
+            variant: values[0] if len(values) == 1 else tuple(values) for variant, values in variants.items()
+        })
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def lookup(self, key: str) -> tuple[list, int]:
+        """
+        Значения ближайших к нормализованному key ключей и расстояние до них.
+        Ничего не нашлось ближе max_distance - ([], max_distance + 1)
+        """
+        candidates = set()
+        for variant in deletes(key, self.max_distance):
+            found = self._deletes.get(variant)
+            if found is None:
+                continue
+            if isinstance(found, tuple):
+                candidates.update(found)
+            else:
+                candidates.add(found)
+
+        best, best_distance = [], self.max_distance + 1
+        for value in candidates:
+            distance = edit_distance(key, self._keys[value], self.max_distance)
+            if distance < best_distance:
+                best, best_distance = [value], distance
+            elif distance == best_distance and distance <= self.max_distance:
+                best.append(value)
+        return sorted(best), best_distance
@@ -1,9 +1,9 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from database.models import Game, QuizQuestion, City
 from database.engine import SessionLocal
 import os
 import csv
+import re
 
 def create_initial_games(db: Session):
     """Создает начальный набор игр"""
@@ -275,9 +275,13 @@ def create_initial_quiz_questions(db: Session):
     db.commit()
     print("❓ Начальные вопросы викторины добавлены в БД")
 
-def create_initial_cities(db: Session):
+def parse_population(value: str) -> int | None:
+    """Население из CSV: число в начале ячейки (бывают сноски вида "96[3]"), пусто - None"""
+    match = re.match(r'\d+', (value or '').strip())
+    return int(match.group()) if match else None
+
+def create_initial_cities(db: Session, csv_file_path: str = './data/cities.csv'):
     """Создает начальный набор городов из CSV файла КЛАДР/ФИАС"""
-    csv_file_path = './data/cities.csv'
     
     if not os.path.exists(csv_file_path):
         print(f"❌ Файл {csv_file_path} не найден!")
@@ -288,6 +292,9 @@ def create_initial_cities(db: Session):
     
     try:
         unique_city_names = set()
+        # Уже загруженные города - одним запросом; SQLite lower() не понимает кириллицу,
+        # поэтому регистр сравнивается в Python
+        existing_cities = {city.name.lower(): city for city in db.query(City)}
         
         with open(csv_file_path, 'r', encoding='utf-8') as csvfile:
             reader = csv.DictReader(csvfile, delimiter=',')
@@ -316,14 +323,16 @@ def create_initial_cities(db: Session):
                 if city_name_lower not in unique_city_names:
                     unique_city_names.add(city_name_lower)
                     
-                    existing_city = db.query(City)\
-                        .filter(func.lower(City.name) == city_name_lower)\
-                        .first()
+                    existing_city = existing_cities.get(city_name_lower)
                     
+                    population = parse_population(row.get('Население', ''))
                     if not existing_city:
-                        db.add(City(name=city_name, region=region))
+                        db.add(City(name=city_name, region=region, population=population))
                         cities_added += 1
                     else:
+                        # Города, загруженные до появления колонки, получают население
+                        if existing_city.population is None and population is not None:
+                            existing_city.population = population
                         cities_skipped += 1
         
         db.commit()
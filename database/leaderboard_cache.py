@@ -0,0 +1,176 @@
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config import config
+
+
+class LeaderboardEntry:
+    """Закэшированный топ: строки get_leaderboard и готовый текст сообщения"""
+
+    __slots__ = ('rows', 'text', 'user_ids', 'cutoff', 'full', 'expires_at')
+
+    def __init__(self, rows: list, scores: list[tuple[int, int]], limit: int, expires_at: float):
+        self.rows = rows
+        self.text = None
+        self.user_ids = {user_id for user_id, _ in scores}
+        self.cutoff = min((score for _, score in scores), default=0)  # Очки последнего места топа
+        self.full = len(rows) >= limit  # Неполный топ меняется от любого нового игрока
+        self.expires_at = expires_at
+
+
+class LeaderboardCache:
+    """
+    Кэш топов игроков по ключу (game_id, limit); game_id=None - общий топ.
+
+    Запись сбрасывается только тогда, когда изменение рейтинга может
+    изменить топ: очки изменились у игрока из топа, новая сумма не ниже
+    последнего места или топ еще неполный. Остальные завершения игр кэш
+    не трогают. TTL - страховка от изменений в обход update_rating
+    (имена пользователей, ручные правки БД).
+    """
+
+    def __init__(self, ttl: float = 60):
+        self.ttl = ttl
+        self._entries: dict[tuple, LeaderboardEntry] = {}
+        # Версия топов игры (None - общего): растет при каждом изменении рейтинга,
+        # чтобы не положить в кэш результат, прочитанный до этого изменения
+        self._versions: dict = {}
+        # Изменения приходят из разных потоков (executor, group commit)
+        self._lock = threading.Lock()
+
+        # Статистика
+        self.hits = 0
+        self.misses = 0
+        self.text_hits = 0
+        self.text_misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _live_entry(self, game_id, limit: int) -> LeaderboardEntry:
+        entry = self._entries.get((game_id, limit))
+        if entry is not None and entry.expires_at <= time.monotonic():
+            del self._entries[(game_id, limit)]
+            return None
+        return entry
+
+    def version(self, game_id) -> int:
+        """Текущая версия топов игры - берется до запроса к БД и передается в put() и put_text()"""
+        with self._lock:
+            return self._versions.get(game_id, 0)
+
+    def get(self, game_id, limit: int):
+        """Строки топа из кэша или None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._live_entry(game_id, limit)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry.rows
+
+    def put(self, game_id, limit: int, rows: list, version: int):
+        """Кэширует строки топа, если с момента version рейтинг игры не менялся"""
+        if not self.enabled:
+            return
+        scores = self._row_scores(game_id, rows)
+        with self._lock:
+            if self._versions.get(game_id, 0) != version:
+                return
+            self._entries[(game_id, limit)] = LeaderboardEntry(rows, scores, limit, time.monotonic() + self.ttl)
+
+    def get_text(self, game_id, limit: int):
+        """Готовый текст сообщения с топом или None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._live_entry(game_id, limit)
+            if entry is None or entry.text is None:
+                self.text_misses += 1
+                return None
+            self.text_hits += 1
+            return entry.text
+
+    def put_text(self, game_id, limit: int, text: str, version: int):
+        """
+        Запоминает текст для закэшированных строк топа (сбрасывается вместе с ними),
+        если с момента version рейтинг игры не менялся - иначе текст мог быть
+        построен по строкам, которые уже заменила более новая запись
+        """
+        with self._lock:
+            if self._versions.get(game_id, 0) != version:
+                return
+            entry = self._live_entry(game_id, limit)
+            if entry is not None:
+                entry.text = text
+
+    @staticmethod
+    def _row_scores(game_id, rows: list) -> list[tuple[int, int]]:
+        """Пары (user_id, очки) из строк get_leaderboard"""
+        if game_id is None:
+            return [(user.id, total_score) for user, total_score, *_ in rows]  # (User, total_score, total_games, best_score)
+        return [(rating.user_id, rating.total_score) for rating, *_ in rows]  # (Rating, User, Game)
+
+    def _affects(self, entry: LeaderboardEntry, user_id: int, score: int) -> bool:
+        return user_id in entry.user_ids or not entry.full or score >= entry.cutoff
+
+    def rating_changed(self, user_id: int, game_id: int, game_total: int, global_total: int):
+        """Сбрасывает топы, которые может изменить новая сумма очков игрока"""
+        with self._lock:
+            for key in (game_id, None):
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+            for (entry_game_id, limit), entry in list(self._entries.items()):
+                if entry_game_id is None:
+                    affected = self._affects(entry, user_id, global_total)
+                elif entry_game_id == game_id:
+                    affected = self._affects(entry, user_id, game_total)
+                else:
+                    continue
+                if affected:
+                    del self._entries[(entry_game_id, limit)]
+                    self.invalidations += 1
+
+    def clear(self):
+        """Очищает кэш и статистику"""
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self.hits = self.misses = self.text_hits = self.text_misses = self.invalidations = 0
+
+    def stats(self) -> dict:
+        """Возвращает статистику: записи, попадания и промахи, сбросы"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups * 100) if lookups else 0,
+                'text_hits': self.text_hits,
+                'text_misses': self.text_misses,
+                'invalidations': self.invalidations
+            }
+
+
+# Общий кэш бота
+leaderboard_cache = LeaderboardCache(ttl=config.LEADERBOARD_CACHE_TTL)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_rating_changes(session):
+    """Топы сбрасываются после commit изменений рейтинга"""
+    changes = session.info.pop('leaderboard_updates', None)
+    if changes and leaderboard_cache.enabled:
+        for change in changes:
+            leaderboard_cache.rating_changed(*change)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rating_changes(session):
+    session.info.pop('leaderboard_updates', None)
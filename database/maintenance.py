@@ -0,0 +1,88 @@
+"""
+Обслуживание денормализованных таблиц.
+
+Запуск:
+    python -m database.maintenance check-totals     # Сверить user_totals с ratings
+    python -m database.maintenance rebuild-totals   # Пересобрать user_totals по ratings
+    python -m database.maintenance rebuild-ratings  # Пересчитать ratings и user_totals по game_sessions
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.engine import SessionLocal
+from repositories.rating_repository import RatingRepository
+
+# Сколько расхождений печатать (остальные только считаются)
+MAX_REPORTED = 20
+
+
+def check_totals(session_factory=SessionLocal) -> list[dict]:
+    """Печатает расхождения user_totals с ratings и возвращает их"""
+    with session_factory() as db:
+        mismatches = RatingRepository(db).check_user_totals()
+
+    if not mismatches:
+        print("✅ Итоги игроков совпадают с рейтингами")
+        return mismatches
+
+    print(f"⚠️ Расхождений в итогах игроков: {len(mismatches)}")
+    for mismatch in mismatches[:MAX_REPORTED]:
+        print(f"   User {mismatch['user_id']}: ожидалось {mismatch['expected']}, в таблице {mismatch['actual']}")
+    if len(mismatches) > MAX_REPORTED:
+        print(f"   ... и еще {len(mismatches) - MAX_REPORTED}")
+    return mismatches
+
+
+def rebuild_totals(session_factory=SessionLocal) -> int:
+    """Пересобирает user_totals одной транзакцией"""
+    with session_factory() as db:
+        rebuilt = RatingRepository(db).rebuild_user_totals()
+        db.commit()
+    return rebuilt
+
+
+def rebuild_ratings(session_factory=SessionLocal, chunk_size: int = 10000) -> dict:
+    """
+    Пересчитывает ratings по завершенным сессиям одной транзакцией
+    (бот до commit видит старые рейтинги) и печатает скорость
+    """
+    started = time.perf_counter()
+
+    def report(sessions: int, ratings: int):
+        elapsed = time.perf_counter() - started
+        print(f"   ... {sessions} сессий, {ratings} рейтингов, {sessions / elapsed:.0f} сессий/с", flush=True)
+
+    with session_factory() as db:
+        result = RatingRepository(db).rebuild_ratings_from_sessions(chunk_size, progress=report)
+        db.commit()
+
+    elapsed = time.perf_counter() - started
+    result['elapsed'] = elapsed
+    print(
+        f"✅ Рейтинги пересчитаны за {elapsed:.1f} с: {result['sessions']} сессий "
+        f"({result['sessions'] / elapsed if elapsed else 0:.0f}/с), {result['ratings']} рейтингов"
+    )
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Обслуживание денормализованных таблиц")
+    parser.add_argument('command', choices=['check-totals', 'rebuild-totals', 'rebuild-ratings'])
+    parser.add_argument('--chunk-size', type=int, default=10000, help="Сессий в одной пачке (rebuild-ratings)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'check-totals':
+        return 1 if check_totals() else 0
+    if args.command == 'rebuild-ratings':
+        rebuild_ratings(chunk_size=args.chunk_size)
+        return 0
+    rebuild_totals()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,8 @@
 # app/database/models.py
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Float, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Text, Float, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
 Base = declarative_base()
 
@@ -24,6 +24,11 @@ class User(Base):
     # Связи
     game_sessions = relationship("GameSession", back_populates="user")
     ratings = relationship("Rating", back_populates="user")
+    
+    __table_args__ = (
+        # Новые пользователи за период (get_users_since_count)
+        Index('ix_users_created_at', 'created_at'),
+    )
 
 class Game(Base):
     """Доступные игры"""
@@ -56,6 +61,23 @@ class GameSession(Base):
     # Связи
     user = relationship("User", back_populates="game_sessions")
     game = relationship("Game", back_populates="game_sessions")
+    
+    __table_args__ = (
+        # Сессии пользователя (get_user_sessions, get_user_best_score, статистика пользователя)
+        Index('ix_game_sessions_user_game_completed', 'user_id', 'game_id', 'completed'),
+        # Сессии за период (get_sessions_since_count, активные сегодня)
+        Index('ix_game_sessions_started_at', 'started_at'),
+        # Частичный индекс только по завершенным сессиям (статистика игр)
+        Index('ix_game_sessions_completed_game', 'game_id', sqlite_where=completed == True),
+    )
+
+class GameStartStat(Base):
+    """Количество запусков игр по дням (считается в памяти и сбрасывается пачкой)"""
+    __tablename__ = 'game_start_stats'
+
+    game_id = Column(Integer, ForeignKey('games.id'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    starts = Column(Integer, nullable=False, default=0)
 
 class Rating(Base):
     """Рейтинги игроков по играм (агрегированные данные)"""
@@ -74,8 +96,141 @@ class Rating(Base):
     user = relationship("User", back_populates="ratings")
     game = relationship("Game", back_populates="ratings")
     
-    # Уникальность пары пользователь-игра
-    __table_args__ = (UniqueConstraint('user_id', 'game_id', name='unique_user_game'),)
+    __table_args__ = (
+        # Уникальность пары пользователь-игра
+        UniqueConstraint('user_id', 'game_id', name='unique_user_game'),
+        # Топ по игре (get_leaderboard(game_id)), user_id - для стабильного порядка
+        Index('ix_ratings_game_total_score', 'game_id', total_score.desc(), 'user_id'),
+        # Лучшие игроки по игре (get_top_players_by_game)
+        Index('ix_ratings_game_best_score', 'game_id', best_score.desc()),
+    )
+
+class UserTotal(Base):
+    """Итоги игрока по всем играм (денормализация ratings для общего топа).
+    Обновляется в той же транзакции, что и рейтинг"""
+    __tablename__ = 'user_totals'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    total_score = Column(Integer, nullable=False, default=0)       # Сумма очков по всем играм
+    total_games = Column(Integer, nullable=False, default=0)       # Сыграно игр
+    best_score = Column(Integer, nullable=False, default=0)        # Лучший результат
+
+    user = relationship("User")
+
+    __table_args__ = (
+        # Общий топ и глобальный ранг - проход по индексу вместо GROUP BY по ratings
+        Index('ix_user_totals_total_score', total_score.desc(), 'user_id'),
+    )
+
+class UserActivity(Base):
+    """Счетчики игр пользователя по всем играм (профиль и самые активные без чтения game_sessions)"""
+    __tablename__ = 'user_activity'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    sessions = Column(Integer, nullable=False, default=0)          # Строк game_sessions (включая незавершенные)
+    completed = Column(Integer, nullable=False, default=0)         # Завершенных игр
+    score_sum = Column(Integer, nullable=False, default=0)         # Сумма очков завершенных игр
+    best_score = Column(Integer, nullable=False, default=0)        # Лучший результат
+    attempts_sum = Column(Integer, nullable=False, default=0)      # Сумма попыток завершенных игр
+
+    user = relationship("User")
+
+    __table_args__ = (
+        # Самые активные пользователи (get_most_active_users)
+        Index('ix_user_activity_sessions', sessions.desc(), 'user_id'),
+    )
+
+class UserGameActivity(Base):
+    """Те же счетчики пользователя по каждой игре"""
+    __tablename__ = 'user_game_activity'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    game_id = Column(Integer, ForeignKey('games.id'), primary_key=True)
+    sessions = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Integer, nullable=False, default=0)
+    best_score = Column(Integer, nullable=False, default=0)
+    attempts_sum = Column(Integer, nullable=False, default=0)
+
+    game = relationship("Game")
+
+class PeriodScore(Base):
+    """Очки игрока за день, неделю или месяц (топы за период без сканирования game_sessions).
+    Дни, недели (с понедельника) и месяцы считаются по UTC"""
+    __tablename__ = 'period_scores'
+
+    PERIODS = ('day', 'week', 'month')
+
+    period = Column(String(10), primary_key=True)                  # day, week или month
+    period_start = Column(Date, primary_key=True)                  # Первый день периода
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    total_score = Column(Integer, nullable=False, default=0)       # Сумма очков за период
+    games_played = Column(Integer, nullable=False, default=0)      # Сыграно игр за период
+    best_score = Column(Integer, nullable=False, default=0)        # Лучший результат за период
+
+    user = relationship("User")
+
+    __table_args__ = (
+        # Топ за период - проход по индексу
+        Index('ix_period_scores_top', 'period', 'period_start', total_score.desc(), 'user_id'),
+    )
+
+    @staticmethod
+    def start_of(period: str, day: date) -> date:
+        """Первый день периода, в который попадает day"""
+        if period == 'day':
+            return day
+        if period == 'week':
+            return day - timedelta(days=day.weekday())
+        if period == 'month':
+            return day.replace(day=1)
+        raise ValueError(f"Неизвестный период: {period}")
+
+class ScoreHistogram(Base):
+    """Гистограмма очков игроков в игре по логарифмическим корзинам (процентили без сканирования ratings).
+    Корзина 0 - очки <= 0, корзина k - очки от 2^(k-1) до 2^k - 1, последняя корзина не ограничена сверху"""
+    __tablename__ = 'score_histograms'
+
+    METRICS = ('total', 'best')    # Rating.total_score и Rating.best_score
+    BUCKETS = 32
+
+    game_id = Column(Integer, ForeignKey('games.id'), primary_key=True)
+    metric = Column(String(10), primary_key=True)                  # total или best
+    bucket = Column(Integer, primary_key=True)                     # Номер корзины
+    players = Column(Integer, nullable=False, default=0)           # Игроков с очками в корзине
+
+    @staticmethod
+    def bucket_of(score: int) -> int:
+        """Корзина, в которую попадают очки"""
+        return min(score.bit_length(), ScoreHistogram.BUCKETS - 1) if score > 0 else 0
+
+    @staticmethod
+    def bucket_sql(expression: str) -> str:
+        """SQL-выражение корзины для очков expression (то же, что bucket_of)"""
+        ladder = " ".join(
+            f"WHEN {expression} < {2 ** bucket} THEN {bucket}" for bucket in range(1, ScoreHistogram.BUCKETS - 1)
+        )
+        return f"CASE WHEN {expression} <= 0 THEN 0 {ladder} ELSE {ScoreHistogram.BUCKETS - 1} END"
+
+    @staticmethod
+    def percentile(histogram: dict, score: int) -> float | None:
+        """
+        Процент других игроков с меньшими очками по гистограмме {корзина: игроков}.
+        Внутри корзины очки считаются распределенными равномерно.
+        None - кроме игрока в игре никого нет
+        """
+        total = sum(histogram.values())
+        if total <= 1:
+            return None
+        bucket = ScoreHistogram.bucket_of(score)
+        below = sum(players for other, players in histogram.items() if other < bucket)
+        if bucket == 0:
+            fraction = 0.0
+        else:
+            low = 2 ** (bucket - 1)
+            fraction = min((score - low) / low, 1.0)  # Ширина корзины k равна 2^(k-1)
+        same = max(histogram.get(bucket, 0) - 1, 0)
+        return min(100 * (below + same * fraction) / (total - 1), 100.0)
 
 class Admin(Base):
     """Таблица администраторов"""
@@ -113,5 +268,6 @@ class City(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String(100), unique=True, nullable=False)  # "Москва"
     region = Column(String(100), nullable=True)              # "Московская область"
+    population = Column(Integer, nullable=True)              # Население из data/cities.csv (вес стартового города)
 
     
\ No newline at end of file
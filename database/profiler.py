@@ -0,0 +1,178 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Кто выполняет запрос: метод репозитория и хендлер update.
+# Выставляются вокруг вызова синхронного репозитория (AsyncBaseRepository._run)
+# в том потоке, где реально выполняется запрос, - поэтому работают и в режиме executor
+current_repository_method: ContextVar[str] = ContextVar('current_repository_method', default='-')
+current_handler: ContextVar[str] = ContextVar('current_handler', default='-')
+
+
+@contextmanager
+def profile_tags(repository_method: str, handler: str):
+    """Помечает запросы внутри блока методом репозитория и хендлером"""
+    method_token = current_repository_method.set(repository_method)
+    handler_token = current_handler.set(handler)
+    try:
+        yield
+    finally:
+        current_repository_method.reset(method_token)
+        current_handler.reset(handler_token)
+
+
+class StatementStats:
+    """Накопленная статистика одного запроса (SQL + метод репозитория + хендлер)"""
+
+    __slots__ = ('statement', 'repository_method', 'handler', 'count', 'total_time', 'max_time', 'rows')
+
+    def __init__(self, statement: str, repository_method: str, handler: str):
+        self.statement = statement
+        self.repository_method = repository_method
+        self.handler = handler
+        self.count = 0
+        self.total_time = 0.0   # сек
+        self.max_time = 0.0     # сек
+        self.rows = 0           # Строки: прочитанные из результата SELECT или затронутые записью
+
+    @property
+    def avg_time(self) -> float:
+        return self.total_time / self.count if self.count else 0.0
+
+
+class CountingCursor:
+    """
+    Обертка курсора DBAPI для SELECT: считает строки по мере чтения результата.
+    SQLite не сообщает rowcount для SELECT (всегда -1), поэтому строки
+    считаются при fetch - уже после after_cursor_execute
+    """
+
+    __slots__ = ('_cursor', '_on_rows')
+
+    def __init__(self, cursor, on_rows):
+        self._cursor = cursor
+        self._on_rows = on_rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._on_rows(1)
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._cursor.fetchmany(*args)
+        if rows:
+            self._on_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        if rows:
+            self._on_rows(len(rows))
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class StatementProfiler:
+    """
+    Профилировщик SQL на событиях движка before/after_cursor_execute.
+
+    Для каждого запроса копит количество вызовов, суммарное и максимальное
+    время и число строк (прочитанных для SELECT, затронутых для записи)
+    с разбивкой по методу репозитория и хендлеру. Запросы дольше
+    slow_query_ms пишутся в лог медленных запросов вместе с EXPLAIN QUERY PLAN.
+    """
+
+    def __init__(self, slow_query_ms: float = 100, slow_log_size: int = 50):
+        self.slow_query_ms = slow_query_ms
+        self.slow_queries = deque(maxlen=slow_log_size)  # Последние медленные запросы
+        self._stats: dict[tuple, StatementStats] = {}
+        # События приходят из разных потоков (executor, group commit)
+        self._lock = threading.Lock()
+
+    def attach(self, sync_engine):
+        """Подписывает профилировщик на события движка"""
+        event.listen(sync_engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(sync_engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('profiler_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['profiler_started'].pop()
+        repository_method = current_repository_method.get()
+        handler = current_handler.get()
+        # Для записи строки известны сразу, для SELECT - считаются при чтении результата
+        reads = cursor.description is not None and context is not None
+        rows = 0 if reads or not cursor.rowcount or cursor.rowcount < 0 else cursor.rowcount
+
+        key = (statement, repository_method, handler)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = StatementStats(statement, repository_method, handler)
+            stats.count += 1
+            stats.total_time += elapsed
+            stats.max_time = max(stats.max_time, elapsed)
+            stats.rows += rows
+
+        if reads:
+            # CursorResult читает строки из context.cursor
+            context.cursor = CountingCursor(cursor, lambda count: self._add_rows(stats, count))
+
+        if elapsed * 1000 >= self.slow_query_ms and not executemany:
+            self._log_slow_query(conn, statement, parameters, elapsed, repository_method, handler)
+
+    def _add_rows(self, stats: StatementStats, count: int):
+        with self._lock:
+            stats.rows += count
+
+    def _explain(self, conn, statement: str, parameters) -> list[str]:
+        """EXPLAIN QUERY PLAN на том же соединении (курсор запроса не трогаем)"""
+        if conn.dialect.name != 'sqlite':
+            return []
+        try:
+            cursor = conn.connection.cursor()
+            try:
+                cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                return [row[-1] for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+        except Exception as e:
+            return [f"EXPLAIN не выполнен: {e}"]
+
+    def _log_slow_query(self, conn, statement, parameters, elapsed, repository_method, handler):
+        plan = self._explain(conn, statement, parameters)
+        entry = {
+            'time': time.time(),
+            'elapsed_ms': elapsed * 1000,
+            'statement': statement,
+            'repository_method': repository_method,
+            'handler': handler,
+            'plan': plan
+        }
+        self.slow_queries.append(entry)
+        logger.warning(
+            "🐢 Медленный запрос %.1f мс [%s / %s]: %s\nПлан: %s",
+            entry['elapsed_ms'], repository_method, handler, ' '.join(statement.split()), '; '.join(plan)
+        )
+
+    def top(self, limit: int = 10) -> list[StatementStats]:
+        """Запросы с наибольшим суммарным временем"""
+        with self._lock:
+            stats = list(self._stats.values())
+        return sorted(stats, key=lambda item: item.total_time, reverse=True)[:limit]
+
+    def reset(self):
+        """Сбрасывает накопленную статистику"""
+        with self._lock:
+            self._stats.clear()
+        self.slow_queries.clear()
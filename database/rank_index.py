@@ -0,0 +1,265 @@
+import bisect
+import threading
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from database.models import Rating, UserTotal
+
+
+# Корзины очков для дерева Фенвика: суммы до 2 * SUB_BUCKETS - каждая в своей
+# корзине, дальше - SUB_BUCKETS корзин на каждое удвоение суммы
+SUB_BUCKET_BITS = 7
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# Корзин хватает на суммы до 2^63, большие попадают в последнюю корзину
+TREE_CAPACITY = 8192
+
+
+def score_bucket(score: int) -> int:
+    """Номер корзины для суммы очков (корзины возрастают вместе с очками)"""
+    shift = max(score.bit_length() - SUB_BUCKET_BITS - 1, 0)
+    return min((shift << SUB_BUCKET_BITS) + (score >> shift), TREE_CAPACITY - 1)
+
+
+class ScoreRankIndex:
+    """
+    Индекс глобального рейтинга в памяти.
+
+    Дерево Фенвика по корзинам значений total_score (score_bucket): в ячейке
+    корзины - число игроков с суммой из нее. Малые суммы лежат каждая в своей
+    корзине, большие - в логарифмических, поэтому размер дерева фиксирован
+    (TREE_CAPACITY) и не растет с максимальной суммой, а новая сумма после
+    commit обновляет дерево за O(log) без перестроек. Внутри корзины игроки
+    отсортированы по сумме (по убыванию) и user_id - это порядок общего топа.
+
+    Ранг игрока (1 + число игроков с большей суммой) и игрок на месте K
+    находятся за O(log) по дереву плюс двоичный поиск в корзине.
+
+    Индекс загружается из user_totals при старте бота (или из готового словаря
+    через load_scores), а дальше получает новые суммы игроков после commit
+    транзакций с update_rating.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._tree = [0] * (TREE_CAPACITY + 1)  # Дерево Фенвика, индексы с 1: корзина b лежит в позиции b + 1
+        self._scores = {}       # user_id -> total_score
+        self._buckets = {}      # корзина -> user_id, отсортированные по (-total_score, user_id)
+        # Обновления приходят из разных потоков (executor, group commit)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def _order_key(self, user_id: int) -> tuple:
+        """Порядок общего топа: сумма очков по убыванию, затем user_id"""
+        return -self._scores[user_id], user_id
+
+    def _add(self, bucket: int, delta: int):
+        position = bucket + 1
+        while position <= TREE_CAPACITY:
+            self._tree[position] += delta
+            position += position & -position
+
+    def _count_up_to(self, bucket: int) -> int:
+        """Число игроков в корзинах <= bucket"""
+        position = bucket + 1
+        count = 0
+        while position > 0:
+            count += self._tree[position]
+            position -= position & -position
+        return count
+
+    def _count_before(self, score: int, key: tuple) -> int:
+        """Число игроков выше key = (-score, ...) в порядке общего топа"""
+        bucket = score_bucket(score)
+        above_bucket = len(self._scores) - self._count_up_to(bucket)
+        return above_bucket + bisect.bisect_left(self._buckets[bucket], key, key=self._order_key)
+
+    def _set(self, user_id: int, score: int):
+        score = max(score, 0)
+        old_score = self._scores.get(user_id)
+        if old_score == score:
+            return
+        if old_score is not None:
+            bucket = score_bucket(old_score)
+            users = self._buckets[bucket]
+            users.pop(bisect.bisect_left(users, (-old_score, user_id), key=self._order_key))
+            if not users:
+                del self._buckets[bucket]
+            self._add(bucket, -1)
+
+        self._scores[user_id] = score
+        bucket = score_bucket(score)
+        bisect.insort(self._buckets.setdefault(bucket, []), user_id, key=self._order_key)
+        self._add(bucket, 1)
+
+    def load(self, db: Session):
+        """Загружает суммы очков всех игроков из user_totals"""
+        scores = {}
+        rows = db.execute(
+            select(UserTotal.user_id, UserTotal.total_score).execution_options(yield_per=10000)
+        )
+        for user_id, total_score in rows:
+            scores[user_id] = max(total_score or 0, 0)
+
+        self.load_scores(scores)
+        print(f"🏅 Индекс рейтинга загружен: {len(scores)} игроков")
+
+    def load_scores(self, scores: dict):
+        """Заменяет содержимое индекса суммами очков (user_id -> total_score)"""
+        scores = {user_id: max(score, 0) for user_id, score in scores.items()}
+        buckets = {}
+        for user_id in sorted(scores, key=lambda user_id: (-scores[user_id], user_id)):
+            buckets.setdefault(score_bucket(scores[user_id]), []).append(user_id)
+
+        # Дерево строится сразу по всем корзинам за O(TREE_CAPACITY)
+        tree = [0] * (TREE_CAPACITY + 1)
+        for bucket, users in buckets.items():
+            tree[bucket + 1] = len(users)
+        for position in range(1, TREE_CAPACITY + 1):
+            parent = position + (position & -position)
+            if parent <= TREE_CAPACITY:
+                tree[parent] += tree[position]
+
+        with self._lock:
+            self._scores = scores
+            self._buckets = buckets
+            self._tree = tree
+            self.loaded = True
+
+    def apply(self, scores: dict):
+        """Применяет новые суммы очков игроков (user_id -> total_score)"""
+        with self._lock:
+            for user_id, score in scores.items():
+                self._set(user_id, score)
+
+    def rank(self, user_id: int) -> int:
+        """
+        Глобальный ранг игрока: 1 + число игроков с большей суммой очков.
+        Для игрока без итогов - 1, как и у запроса к БД
+        """
+        with self._lock:
+            score = self._scores.get(user_id)
+            if score is None:
+                return 1
+            return self._count_before(score, (-score,)) + 1
+
+    def position(self, user_id: int) -> int | None:
+        """
+        Место игрока в общем топе с учетом порядка по user_id при равных очках
+        (как в user_at_rank). None - у игрока нет итогов
+        """
+        with self._lock:
+            score = self._scores.get(user_id)
+            if score is None:
+                return None
+            return self._count_before(score, (-score, user_id)) + 1
+
+    def user_at_rank(self, rank: int) -> int | None:
+        """user_id игрока на месте rank в общем топе (None - нет такого места)"""
+        with self._lock:
+            total = len(self._scores)
+            if not 1 <= rank <= total:
+                return None
+
+            # Место rank сверху - это место total - rank + 1 снизу:
+            # ищем наименьшую корзину, до которой набирается столько игроков
+            remaining = total - rank + 1
+            position = 0
+            step = TREE_CAPACITY
+            while step:
+                if position + step <= TREE_CAPACITY and self._tree[position + step] < remaining:
+                    position += step
+                    remaining -= self._tree[position]
+                step >>= 1
+            bucket = position  # Позиция в дереве position + 1 соответствует корзине position
+
+            # Внутри корзины порядок - по сумме очков и user_id
+            above = total - self._count_up_to(bucket)
+            return self._buckets[bucket][rank - above - 1]
+
+    def clear(self):
+        """Выгружает индекс (ранги снова считаются запросом к БД)"""
+        with self._lock:
+            self.loaded = False
+            self._tree = [0] * (TREE_CAPACITY + 1)
+            self._scores = {}
+            self._buckets = {}
+
+
+class GameRankIndexes:
+    """
+    Индексы рейтинга в памяти по играм: ScoreRankIndex на каждую игру
+    по ratings.total_score. Дают место игрока в топе игры (/leaderboard me <игра>)
+    без подсчета всех строк выше него
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._indexes: dict[int, ScoreRankIndex] = {}
+        self._lock = threading.Lock()
+
+    def load(self, db: Session):
+        """Загружает суммы очков по всем играм из ratings"""
+        scores = {}
+        rows = db.execute(
+            select(Rating.game_id, Rating.user_id, Rating.total_score).execution_options(yield_per=10000)
+        )
+        for game_id, user_id, total_score in rows:
+            scores.setdefault(game_id, {})[user_id] = total_score or 0
+
+        indexes = {}
+        for game_id, game_scores in scores.items():
+            indexes[game_id] = ScoreRankIndex()
+            indexes[game_id].load_scores(game_scores)
+
+        with self._lock:
+            self._indexes = indexes
+            self.loaded = True
+        print(f"🏅 Индексы рейтинга игр загружены: {len(indexes)} игр, {sum(map(len, indexes.values()))} рейтингов")
+
+    def get(self, game_id: int) -> ScoreRankIndex | None:
+        """Индекс игры (None - в игру еще никто не играл)"""
+        with self._lock:
+            return self._indexes.get(game_id)
+
+    def apply(self, updates: dict):
+        """Применяет новые суммы очков в играх ((game_id, user_id) -> total_score)"""
+        by_game = {}
+        for (game_id, user_id), score in updates.items():
+            by_game.setdefault(game_id, {})[user_id] = score
+
+        for game_id, scores in by_game.items():
+            with self._lock:
+                index = self._indexes.get(game_id)
+                if index is None:
+                    index = self._indexes[game_id] = ScoreRankIndex()
+                    index.load_scores({})
+            index.apply(scores)
+
+    def clear(self):
+        """Выгружает индексы (места в топах игр снова считаются запросом к БД)"""
+        with self._lock:
+            self.loaded = False
+            self._indexes = {}
+
+
+# Общие индексы бота
+rank_index = ScoreRankIndex()
+game_rank_indexes = GameRankIndexes()
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_rank_updates(session):
+    """Новые суммы очков попадают в индекс только после commit транзакции"""
+    updates = session.info.pop('rank_updates', None)
+    if updates and rank_index.loaded:
+        rank_index.apply(updates)
+    game_updates = session.info.pop('game_rank_updates', None)
+    if game_updates and game_rank_indexes.loaded:
+        game_rank_indexes.apply(game_updates)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rank_updates(session):
+    session.info.pop('rank_updates', None)
+    session.info.pop('game_rank_updates', None)
@@ -0,0 +1,22 @@
+import asyncio
+from database.session import session_scope
+from repositories.rating_repository import RatingRepository
+
+
+async def prune_period_scores(session_factory=None) -> int:
+    """Удаляет из period_scores периоды старше предыдущего"""
+    async with session_scope(session_factory) as db:
+        deleted = await db.run_sync(lambda sync_db: RatingRepository(sync_db).prune_period_scores())
+    if deleted:
+        print(f"🧹 Удалены очки за старые периоды: {deleted}")
+    return deleted
+
+
+async def run_period_prune(interval: float):
+    """Периодически чистит очки за старые периоды (задача живет все время работы бота)"""
+    while True:
+        try:
+            await prune_period_scores()
+        except Exception as e:
+            print(f"❌ Ошибка очистки очков за периоды: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,95 @@
+from contextlib import asynccontextmanager
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import config
+from database.engine import AsyncSessionLocal, ExecutorSessionLocal
+from database.executor import DBExecutor, ExecutorSession
+from database.writer import GroupCommitWriter
+
+# Сессия, с которой работают асинхронные репозитории в любом режиме
+DBSession = AsyncSession | ExecutorSession
+
+_db_executor: DBExecutor = None
+_group_writer: GroupCommitWriter = None
+
+
+def get_db_executor() -> DBExecutor:
+    """Возвращает пул потоков для режима executor (создается при первом обращении)"""
+    global _db_executor
+    if _db_executor is None:
+        _db_executor = DBExecutor(ExecutorSessionLocal, max_workers=config.DB_EXECUTOR_WORKERS)
+    return _db_executor
+
+
+def open_session() -> DBSession:
+    """
+    Открывает сессию БД в режиме из config.DB_MODE:
+    async - AsyncSession на aiosqlite, executor - сессия в пуле потоков
+    """
+    if config.DB_MODE == 'executor':
+        return get_db_executor().session()
+    return AsyncSessionLocal()
+
+
+@asynccontextmanager
+async def session_scope(session_factory=None):
+    """
+    Единица работы: одна сессия и одна транзакция.
+    commit - при успешном выходе, rollback - при исключении.
+    """
+    db = (session_factory or open_session)()
+    try:
+        yield db
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+    finally:
+        await db.close()
+
+
+def get_db_executor_stats() -> dict:
+    """Статистика пула потоков или None, если режим executor не включен"""
+    if config.DB_MODE != 'executor' or _db_executor is None:
+        return None
+    return _db_executor.stats()
+
+
+def shutdown_db_executor():
+    """Останавливает пул потоков (при завершении бота)"""
+    global _db_executor
+    if _db_executor is not None:
+        _db_executor.shutdown()
+        _db_executor = None
+
+
+async def start_group_writer():
+    """Запускает group commit для записей, если он включен в config.DB_WRITE_MODE"""
+    global _group_writer
+    if config.DB_WRITE_MODE != 'group' or _group_writer is not None:
+        return
+    _group_writer = GroupCommitWriter(
+        ExecutorSessionLocal,
+        max_batch=config.DB_WRITER_MAX_BATCH,
+        max_delay=config.DB_WRITER_MAX_DELAY_MS / 1000
+    )
+    await _group_writer.start()
+
+
+def get_group_writer() -> GroupCommitWriter:
+    """Возвращает запущенный group commit или None"""
+    return _group_writer
+
+
+def get_group_writer_stats() -> dict:
+    """Статистика group commit или None, если он не запущен"""
+    if _group_writer is None:
+        return None
+    return _group_writer.stats()
+
+
+async def stop_group_writer():
+    """Фиксирует оставшиеся записи и останавливает group commit (при завершении бота)"""
+    global _group_writer
+    if _group_writer is not None:
+        await _group_writer.stop()
+        _group_writer = None
@@ -0,0 +1,185 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from database.profiler import current_handler, profile_tags
+
+
+class GroupCommitWriter:
+    """
+    Групповая фиксация записей (group commit).
+
+    Записи (создание и завершение сессий, обновление рейтинга) ставятся
+    в очередь, а отдельная задача собирает их в пачки и выполняет каждую
+    пачку одной транзакцией в своем потоке. Один commit (и один fsync SQLite)
+    приходится на всю пачку, поэтому пропускная способность записи растет
+    вместе с нагрузкой. Future каждого вызова разрешается после commit пачки.
+
+    Пачка закрывается, когда набрано max_batch записей или прошло max_delay
+    секунд с первой записи. Пока пачка фиксируется, новые записи копятся
+    в очереди и уходят следующей пачкой.
+    """
+
+    def __init__(self, session_factory, max_batch: int = 64, max_delay: float = 0.002):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        # Один поток: SQLite допускает только одного писателя
+        self._thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._queue: asyncio.Queue = None
+        self._task: asyncio.Task = None
+
+        # Статистика
+        self.batches = 0            # Сколько пачек зафиксировано
+        self.items = 0              # Сколько записей выполнено
+        self.max_batch_size = 0     # Самая большая пачка
+        self.failed_batches = 0     # Пачки, откатившиеся из-за ошибки в одной из записей
+        self.total_commit = 0.0     # Суммарное время выполнения пачек (сек)
+
+    async def start(self):
+        """Запускает задачу записи в текущем event loop"""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run(), name="db-group-writer")
+
+    async def stop(self):
+        """Дожидается записи всех поставленных в очередь данных и останавливает задачу"""
+        if self._task is not None:
+            self._queue.put_nowait(None)
+            await self._task
+            self._task = None
+        self._thread.shutdown(wait=True)
+
+    async def submit(self, repository_class, method_name: str, *args, **kwargs):
+        """
+        Ставит вызов метода синхронного репозитория в очередь
+        и возвращает его результат после commit пачки
+        """
+        if self._task is None:
+            raise RuntimeError("GroupCommitWriter не запущен")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((repository_class, method_name, args, kwargs, current_handler.get(), future))
+        return await future
+
+    async def _collect_batch(self, first_item) -> tuple[list, bool]:
+        """Собирает пачку: до max_batch записей или до истечения max_delay"""
+        batch = [first_item]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+
+        while len(batch) < self.max_batch:
+            if self._queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self._queue.get_nowait()
+
+            if item is None:
+                return batch, True
+            batch.append(item)
+
+        return batch, False
+
+    async def _run(self):
+        """Цикл записи: собрать пачку, зафиксировать в потоке, разрешить future"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+
+            batch, stopping = await self._collect_batch(item)
+            started = time.perf_counter()
+            try:
+                outcomes = await loop.run_in_executor(self._thread, self._commit_batch, batch)
+            except Exception as e:
+                # Пачка не выполнилась даже по отдельности (не открылась сессия, упал rollback):
+                # ошибка достается всем ее вызывающим, а цикл продолжает читать очередь
+                print(f"❌ Group commit: пачка из {len(batch)} записей не выполнена: {e}")
+                self.failed_batches += 1
+                outcomes = [(None, e)] * len(batch)
+            self.total_commit += time.perf_counter() - started
+
+            for (*_, future), (result, error) in zip(batch, outcomes):
+                if future.done():  # Вызывающий отменил ожидание
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    def _apply(self, db, batch: list) -> list:
+        """Выполняет записи пачки в сессии"""
+        results = []
+        for repository_class, method_name, args, kwargs, handler, _ in batch:
+            with profile_tags(f"{repository_class.__name__}.{method_name}", handler):
+                repository = repository_class(db)
+                results.append(getattr(repository, method_name)(*args, **kwargs))
+        return results
+
+    def _commit_batch(self, batch: list) -> list:
+        """
+        Выполняет пачку одной транзакцией (в потоке записи).
+        Возвращает пары (результат, ошибка) в порядке пачки
+        """
+        self.batches += 1
+        self.items += len(batch)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+
+        db = None
+        try:
+            db = self.session_factory()
+            results = self._apply(db, batch)
+            db.commit()
+            return [(result, None) for result in results]
+        except Exception as e:
+            if db is not None:
+                db.rollback()
+            if len(batch) == 1:
+                return [(None, e)]
+        finally:
+            if db is not None:
+                db.close()
+
+        # Одна запись сломала пачку - фиксируем записи по отдельности,
+        # чтобы ошибка досталась только ее вызывающему
+        self.failed_batches += 1
+        return self._commit_each(batch)
+
+    def _commit_each(self, batch: list) -> list:
+        """Выполняет каждую запись своей транзакцией"""
+        outcomes = []
+        for item in batch:
+            db = None
+            try:
+                db = self.session_factory()
+                result = self._apply(db, [item])[0]
+                db.commit()
+                outcomes.append((result, None))
+            except Exception as e:
+                if db is not None:
+                    db.rollback()
+                outcomes.append((None, e))
+            finally:
+                if db is not None:
+                    db.close()
+        return outcomes
+
+    def stats(self) -> dict:
+        """Возвращает статистику: число пачек, средний размер и время commit"""
+        return {
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch_size': (self.items / self.batches) if self.batches else 0,
+            'max_batch_size': self.max_batch_size,
+            'failed_batches': self.failed_batches,
+            'avg_commit_ms': (self.total_commit / self.batches * 1000) if self.batches else 0
+        }
@@ -0,0 +1,67 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+
+from app.config import config as app_config
+from database.models import Base
+
+config = context.config
+
+# Соединение передается при запуске из кода (database.engine.init_db),
+# в этом случае логирование бота не перенастраиваем
+connection = config.attributes.get('connection')
+
+if connection is None and config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def get_url() -> str:
+    """URL БД: из параметра -x db_url=..., иначе из конфига бота"""
+    return context.get_x_argument(as_dictionary=True).get('db_url', app_config.DB_URL)
+
+
+def run_migrations_offline() -> None:
+    """Генерирует SQL миграций без подключения к БД"""
+    context.configure(
+        url=get_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_with_connection(connection) -> None:
+    # render_as_batch - SQLite не умеет ALTER для большинства изменений
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=True
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Применяет миграции к БД"""
+    if connection is not None:
+        run_migrations_with_connection(connection)
+        return
+
+    db_engine = create_engine(get_url())
+    with db_engine.connect() as db_connection:
+        run_migrations_with_connection(db_connection)
+    db_engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
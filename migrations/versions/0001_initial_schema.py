@@ -0,0 +1,130 @@
+"""Начальная схема БД
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Создает таблицы, которые раньше создавались через Base.metadata.create_all"""
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('telegram_id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=100), nullable=True),
+        sa.Column('first_name', sa.String(length=100), nullable=False),
+        sa.Column('last_name', sa.String(length=100), nullable=True),
+        sa.Column('language_code', sa.String(length=10), nullable=True),
+        sa.Column('is_blocked', sa.Boolean(), nullable=True),
+        sa.Column('block_reason', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_users_telegram_id', 'users', ['telegram_id'], unique=True)
+
+    op.create_table(
+        'games',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('code', sa.String(length=50), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('code'),
+        sa.UniqueConstraint('name')
+    )
+
+    op.create_table(
+        'quiz_questions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('question', sa.Text(), nullable=False),
+        sa.Column('option1', sa.String(length=200), nullable=False),
+        sa.Column('option2', sa.String(length=200), nullable=False),
+        sa.Column('option3', sa.String(length=200), nullable=False),
+        sa.Column('option4', sa.String(length=200), nullable=False),
+        sa.Column('correct_option', sa.Integer(), nullable=False),
+        sa.Column('difficulty', sa.String(length=20), nullable=True),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('explanation', sa.Text(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table(
+        'cities',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('region', sa.String(length=100), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+
+    op.create_table(
+        'admins',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('added_by', sa.Integer(), nullable=False),
+        sa.Column('added_at', sa.DateTime(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['added_by'], ['users.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+    op.create_table(
+        'game_sessions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('game_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Integer(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.Column('completed', sa.Boolean(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['game_id'], ['games.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table(
+        'ratings',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('game_id', sa.Integer(), nullable=False),
+        sa.Column('total_score', sa.Integer(), nullable=True),
+        sa.Column('games_played', sa.Integer(), nullable=True),
+        sa.Column('best_score', sa.Integer(), nullable=True),
+        sa.Column('average_score', sa.Float(), nullable=True),
+        sa.Column('last_played', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['game_id'], ['games.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'game_id', name='unique_user_game')
+    )
+
+
+def downgrade() -> None:
+    """Удаляет все таблицы"""
+    op.drop_table('ratings')
+    op.drop_table('game_sessions')
+    op.drop_table('admins')
+    op.drop_table('cities')
+    op.drop_table('quiz_questions')
+    op.drop_table('games')
+    op.drop_index('ix_users_telegram_id', table_name='users')
+    op.drop_table('users')
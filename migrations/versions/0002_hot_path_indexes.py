@@ -0,0 +1,61 @@
+"""Индексы для горячих запросов
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:30:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Добавляет составные и частичные индексы под запросы репозиториев
+
+    if_not_exists - часть индексов могла появиться в БД, созданной через create_all
+    """
+    # Сессии пользователя и группировка по пользователю
+    op.create_index(
+        'ix_game_sessions_user_game_completed', 'game_sessions',
+        ['user_id', 'game_id', 'completed'],
+        if_not_exists=True
+    )
+    # Сессии за период
+    op.create_index('ix_game_sessions_started_at', 'game_sessions', ['started_at'], if_not_exists=True)
+    # Только завершенные сессии (статистика игр)
+    op.create_index(
+        'ix_game_sessions_completed_game', 'game_sessions', ['game_id'],
+        sqlite_where=sa.text('completed = 1'),
+        if_not_exists=True
+    )
+    # Топ по игре и лучшие игроки по игре
+    op.create_index(
+        'ix_ratings_game_total_score', 'ratings',
+        ['game_id', sa.text('total_score DESC'), 'user_id'],
+        if_not_exists=True
+    )
+    op.create_index(
+        'ix_ratings_game_best_score', 'ratings',
+        ['game_id', sa.text('best_score DESC')],
+        if_not_exists=True
+    )
+    # Новые пользователи за период
+    op.create_index('ix_users_created_at', 'users', ['created_at'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_created_at', table_name='users')
+    op.drop_index('ix_ratings_game_best_score', table_name='ratings')
+    op.drop_index('ix_ratings_game_total_score', table_name='ratings')
+    op.drop_index('ix_game_sessions_completed_game', table_name='game_sessions')
+    op.drop_index('ix_game_sessions_started_at', table_name='game_sessions')
+    op.drop_index('ix_game_sessions_user_game_completed', table_name='game_sessions')
@@ -0,0 +1,42 @@
+"""Счетчик запусков игр
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Создает game_start_stats и переносит в нее запуски из game_sessions"""
+    op.create_table(
+        'game_start_stats',
+        sa.Column('game_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('starts', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['game_id'], ['games.id']),
+        sa.PrimaryKeyConstraint('game_id', 'day')
+    )
+    # До появления счетчика каждый запуск создавал строку в game_sessions
+    op.execute("""
+        INSERT INTO game_start_stats (game_id, day, starts)
+        SELECT game_id, date(started_at), count(*)
+        FROM game_sessions
+        WHERE started_at IS NOT NULL
+        GROUP BY game_id, date(started_at)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('game_start_stats')
@@ -0,0 +1,46 @@
+"""Итоги игроков по всем играм
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 14:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Создает user_totals и заполняет ее из ratings"""
+    op.create_table(
+        'user_totals',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('total_score', sa.Integer(), nullable=False),
+        sa.Column('total_games', sa.Integer(), nullable=False),
+        sa.Column('best_score', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index(
+        'ix_user_totals_total_score', 'user_totals',
+        [sa.text('total_score DESC'), 'user_id']
+    )
+    op.execute("""
+        INSERT INTO user_totals (user_id, total_score, total_games, best_score)
+        SELECT user_id, coalesce(sum(total_score), 0), coalesce(sum(games_played), 0), coalesce(max(best_score), 0)
+        FROM ratings
+        GROUP BY user_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_totals_total_score', table_name='user_totals')
+    op.drop_table('user_totals')
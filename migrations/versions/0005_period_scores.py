@@ -0,0 +1,60 @@
+"""Очки игроков за день, неделю и месяц
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 16:00:00
+
+"""
+from datetime import datetime, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Создает period_scores и заполняет текущие периоды из game_sessions"""
+    op.create_table(
+        'period_scores',
+        sa.Column('period', sa.String(length=10), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('total_score', sa.Integer(), nullable=False),
+        sa.Column('games_played', sa.Integer(), nullable=False),
+        sa.Column('best_score', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('period', 'period_start', 'user_id')
+    )
+    op.create_index(
+        'ix_period_scores_top', 'period_scores',
+        ['period', 'period_start', sa.text('total_score DESC'), 'user_id']
+    )
+
+    # Текущие день, неделя и месяц (UTC, как finished_at)
+    today = datetime.utcnow().date()
+    period_starts = {
+        'day': today,
+        'week': today - timedelta(days=today.weekday()),
+        'month': today.replace(day=1)
+    }
+    backfill = sa.text("""
+        INSERT INTO period_scores (period, period_start, user_id, total_score, games_played, best_score)
+        SELECT :period, :period_start, user_id, coalesce(sum(score), 0), count(*), coalesce(max(score), 0)
+        FROM game_sessions
+        WHERE completed = 1 AND finished_at >= :period_start
+        GROUP BY user_id
+    """).bindparams(sa.bindparam('period_start', type_=sa.Date()))
+    for period, period_start in period_starts.items():
+        op.execute(backfill.bindparams(period=period, period_start=period_start))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_period_scores_top', table_name='period_scores')
+    op.drop_table('period_scores')
@@ -0,0 +1,65 @@
+"""Счетчики игр пользователей
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 18:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTER_COLUMNS = ('sessions', 'completed', 'score_sum', 'best_score', 'attempts_sum')
+
+
+def upgrade() -> None:
+    """Создает user_activity и user_game_activity и заполняет их из game_sessions"""
+    op.create_table(
+        'user_activity',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        *(sa.Column(column, sa.Integer(), nullable=False) for column in COUNTER_COLUMNS),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index('ix_user_activity_sessions', 'user_activity', [sa.text('sessions DESC'), 'user_id'])
+    op.create_table(
+        'user_game_activity',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('game_id', sa.Integer(), nullable=False),
+        *(sa.Column(column, sa.Integer(), nullable=False) for column in COUNTER_COLUMNS),
+        sa.ForeignKeyConstraint(['game_id'], ['games.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id', 'game_id')
+    )
+
+    # Очки, лучший результат и попытки - только по завершенным играм, как в /profile
+    op.execute("""
+        INSERT INTO user_game_activity (user_id, game_id, sessions, completed, score_sum, best_score, attempts_sum)
+        SELECT user_id, game_id, count(*),
+               coalesce(sum(completed = 1), 0),
+               coalesce(sum(CASE WHEN completed = 1 THEN score END), 0),
+               coalesce(max(CASE WHEN completed = 1 THEN score END), 0),
+               coalesce(sum(CASE WHEN completed = 1 THEN attempts END), 0)
+        FROM game_sessions
+        GROUP BY user_id, game_id
+    """)
+    op.execute("""
+        INSERT INTO user_activity (user_id, sessions, completed, score_sum, best_score, attempts_sum)
+        SELECT user_id, sum(sessions), sum(completed), sum(score_sum), max(best_score), sum(attempts_sum)
+        FROM user_game_activity
+        GROUP BY user_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('user_game_activity')
+    op.drop_index('ix_user_activity_sessions', table_name='user_activity')
+    op.drop_table('user_activity')
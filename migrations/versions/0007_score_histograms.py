@@ -0,0 +1,51 @@
+"""Гистограммы очков по играм
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 20:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BUCKETS = 32
+
+
+def bucket_sql(expression: str) -> str:
+    """Корзина очков: 0 - очки <= 0, k - от 2^(k-1) до 2^k - 1 (как ScoreHistogram.bucket_sql)"""
+    ladder = " ".join(f"WHEN {expression} < {2 ** bucket} THEN {bucket}" for bucket in range(1, BUCKETS - 1))
+    return f"CASE WHEN {expression} <= 0 THEN 0 {ladder} ELSE {BUCKETS - 1} END"
+
+
+def upgrade() -> None:
+    """Создает score_histograms и заполняет их по ratings"""
+    op.create_table(
+        'score_histograms',
+        sa.Column('game_id', sa.Integer(), nullable=False),
+        sa.Column('metric', sa.String(length=10), nullable=False),
+        sa.Column('bucket', sa.Integer(), nullable=False),
+        sa.Column('players', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['game_id'], ['games.id']),
+        sa.PrimaryKeyConstraint('game_id', 'metric', 'bucket')
+    )
+
+    for metric, column in (('total', 'total_score'), ('best', 'best_score')):
+        op.execute(f"""
+            INSERT INTO score_histograms (game_id, metric, bucket, players)
+            SELECT game_id, '{metric}', {bucket_sql(f'coalesce({column}, 0)')} AS bucket, count(*)
+            FROM ratings
+            GROUP BY game_id, bucket
+        """)
+
+
+def downgrade() -> None:
+    op.drop_table('score_histograms')
@@ -0,0 +1,29 @@
+"""Население городов
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 22:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Добавляет cities.population (заполняется из data/cities.csv при старте бота)"""
+    with op.batch_alter_table('cities') as batch_op:
+        batch_op.add_column(sa.Column('population', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('cities') as batch_op:
+        batch_op.drop_column('population')
@@ -44,8 +44,7 @@ class AdminRepository:
                 existing_admin.is_active = True
                 existing_admin.added_by = added_by_user_id
                 existing_admin.added_at = datetime.utcnow()
-                self.db.commit()
-                self.db.refresh(existing_admin)
+                self.db.flush()
                 return existing_admin
         else:
             # Создаем новую запись
@@ -55,8 +54,7 @@ class AdminRepository:
                 is_active=True
             )
             self.db.add(admin)
-            self.db.commit()
-            self.db.refresh(admin)
+            self.db.flush()
             return admin
     
     def remove_admin(self, user_id: int) -> bool:
@@ -66,7 +64,7 @@ class AdminRepository:
         
         if admin:
             admin.is_active = False
-            self.db.commit()
+            self.db.flush()
             return True
         return False
     
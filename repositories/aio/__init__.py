@@ -0,0 +1,19 @@
+from .base_repository import AsyncBaseRepository
+from .user_repository import AsyncUserRepository
+from .game_repository import AsyncGameRepository
+from .game_session_repository import AsyncGameSessionRepository
+from .rating_repository import AsyncRatingRepository
+from .admin_repository import AsyncAdminRepository
+from .quiz_repository import AsyncQuizRepository
+from .city_repository import AsyncCityRepository
+
+__all__ = [
+    'AsyncBaseRepository',
+    'AsyncUserRepository',
+    'AsyncGameRepository',
+    'AsyncGameSessionRepository',
+    'AsyncRatingRepository',
+    'AsyncAdminRepository',
+    'AsyncQuizRepository',
+    'AsyncCityRepository'
+]
@@ -0,0 +1,29 @@
+from database.models import Admin, User
+from repositories.admin_repository import AdminRepository
+from .base_repository import AsyncBaseRepository
+
+
+class AsyncAdminRepository(AsyncBaseRepository):
+    """Асинхронный репозиторий для работы с администраторами"""
+
+    repository_class = AdminRepository
+
+    async def is_admin(self, user_id: int) -> bool:
+        """Проверяет является ли пользователь админом по user_id"""
+        return await self._run('is_admin', user_id)
+
+    async def add_admin(self, user_id: int, added_by_user_id: int) -> Admin:
+        """Добавляет пользователя в админы по user_id"""
+        return await self._run('add_admin', user_id, added_by_user_id)
+
+    async def remove_admin(self, user_id: int) -> bool:
+        """Удаляет пользователя из админов по user_id"""
+        return await self._run('remove_admin', user_id)
+
+    async def get_all_admins(self) -> list[tuple[Admin, User]]:
+        """Возвращает всех активных админов с информацией о пользователе"""
+        return await self._run('get_all_admins')
+
+    async def get_admin_by_user_id(self, user_id: int) -> Admin:
+        """Находит админа по user_id"""
+        return await self._run('get_admin_by_user_id', user_id)
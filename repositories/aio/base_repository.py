@@ -0,0 +1,54 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.profiler import current_handler, profile_tags
+from database.session import get_group_writer
+from repositories.base_repository import BaseRepository
+
+
+class AsyncBaseRepository:
+    """
+    Базовый класс для асинхронных репозиториев.
+    Выполняет методы синхронного репозитория через run_sync сессии:
+    AsyncSession (запросы идут через aiosqlite) или ExecutorSession
+    (запросы идут в пуле потоков). В обоих случаях event loop не блокируется,
+    а логика запросов остается в одном месте - в синхронном репозитории.
+    """
+
+    repository_class = BaseRepository
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _run(self, method_name: str, *args, **kwargs):
+        """Вызывает метод синхронного репозитория внутри асинхронной сессии"""
+        # Метки для профилировщика SQL: хендлер берем здесь, в event loop,
+        # а выставляем в call - там, где выполняются запросы (в т.ч. в потоке executor)
+        repository_method = f"{self.repository_class.__name__}.{method_name}"
+        handler = current_handler.get()
+
+        def call(sync_db):
+            with profile_tags(repository_method, handler):
+                repository = self.repository_class(sync_db)
+                return getattr(repository, method_name)(*args, **kwargs)
+
+        return await self.db.run_sync(call)
+
+    async def _write(self, method_name: str, *args, **kwargs):
+        """
+        Вызывает пишущий метод синхронного репозитория.
+        Если включен group commit (DB_WRITE_MODE=group), запись уходит в общую
+        пачку и фиксируется ее транзакцией, а не транзакцией update - поэтому
+        так вызываются только самостоятельные записи (сессии и рейтинг),
+        которые не зависят от незафиксированных изменений текущего update
+        """
+        writer = get_group_writer()
+        if writer is None:
+            return await self._run(method_name, *args, **kwargs)
+        return await writer.submit(self.repository_class, method_name, *args, **kwargs)
+
+    async def save(self, obj):
+        """Сохраняет объект в БД"""
+        return await self._run('save', obj)
+
+    async def save_all(self, objects):
+        """Сохраняет несколько объектов в БД"""
+        return await self._run('save_all', objects)
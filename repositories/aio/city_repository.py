@@ -0,0 +1,36 @@
+from database.city_index import CityIndex, get_city_index, set_city_index
+from repositories.city_repository import CityRepository
+from .base_repository import AsyncBaseRepository
+
+
+class AsyncCityRepository(AsyncBaseRepository):
+    """Асинхронный репозиторий для работы с городами"""
+
+    repository_class = CityRepository
+
+    async def get_city_by_name(self, city_name: str):
+        """Находит город по названию"""
+        return await self._run('get_city_by_name', city_name)
+
+    async def get_cities_by_first_letter(self, letter: str, exclude_cities: set = None):
+        """Находит города по первой букве, исключая использованные"""
+        return await self._run('get_cities_by_first_letter', letter, exclude_cities)
+
+    async def get_city_for_bot(self, last_letter: str, used_cities: set) -> str:
+        """Находит город для хода бота по первой букве"""
+        return await self._run('get_city_for_bot', last_letter, used_cities)
+
+    async def get_random_start_city(self):
+        """Получает случайный город для начала игры"""
+        return await self._run('get_random_start_city')
+
+    async def city_exists(self, city_name: str) -> bool:
+        """Проверяет, существует ли город в БД"""
+        return await self._run('city_exists', city_name)
+
+    async def get_city_index(self) -> CityIndex:
+        """Индекс городов в памяти; строится запросом к БД только при первом обращении"""
+        index = get_city_index()
+        if index is None:
+            index = set_city_index(await self._run('build_city_index'))
+        return index
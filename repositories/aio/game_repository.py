@@ -0,0 +1,33 @@
+from database.models import Game
+from repositories.game_repository import GameRepository
+from .base_repository import AsyncBaseRepository
+
+
+class AsyncGameRepository(AsyncBaseRepository):
+    """Асинхронный репозиторий для работы с играми"""
+
+    repository_class = GameRepository
+
+    async def get_game_by_id(self, game_id: int) -> Game:
+        """Находит игру по ID"""
+        return await self._run('get_game_by_id', game_id)
+
+    async def get_game_by_code(self, game_code: str) -> Game:
+        """Находит игру по коду (например, 'guess_number')"""
+        return await self._run('get_game_by_code', game_code)
+
+    async def get_all_games(self) -> list[Game]:
+        """Возвращает все игры"""
+        return await self._run('get_all_games')
+
+    async def get_active_games(self) -> list[Game]:
+        """Возвращает только активные игры"""
+        return await self._run('get_active_games')
+
+    async def toggle_game(self, game_code: str) -> bool:
+        """Переключает статус игры (вкл/выкл)"""
+        return await self._run('toggle_game', game_code)
+
+    async def get_game_stats(self, game_id: int) -> dict:
+        """Возвращает статистику по игре"""
+        return await self._run('get_game_stats', game_id)
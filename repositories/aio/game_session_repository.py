@@ -0,0 +1,90 @@
+from datetime import datetime
+from app.config import config
+from database.counters import game_start_counter
+from database.models import GameSession
+from repositories.game_session_repository import GameSessionRepository
+from .base_repository import AsyncBaseRepository
+
+
+class AsyncGameSessionRepository(AsyncBaseRepository):
+    """Асинхронный репозиторий для работы с игровыми сессиями"""
+
+    repository_class = GameSessionRepository
+
+    async def create_session(self, user_id: int, game_id: int) -> GameSession:
+        """Создает новую игровую сессию"""
+        return await self._write('create_session', user_id, game_id)
+
+    async def start_session(self, user_id: int, game_id: int) -> dict:
+        """
+        Начинает игру и возвращает ее данные для FSM.
+        Запуск учитывается в счетчике в памяти. В режиме eager сразу создается
+        строка game_sessions, в режиме lazy строки нет (session_id = None) -
+        она будет записана при завершении, а брошенная игра не пишет в БД
+        """
+        game_start_counter.increment(game_id)
+
+        if config.GAME_SESSION_MODE == 'lazy':
+            session_id, started_at = None, datetime.utcnow()
+        else:
+            session = await self.create_session(user_id, game_id)
+            session_id, started_at = session.id, session.started_at
+
+        return {
+            'session_id': session_id,
+            'user_id': user_id,
+            'game_id': game_id,
+            'started_at': started_at
+        }
+
+    async def finish_session(self, game_session: dict, score: int, attempts: int) -> GameSession:
+        """Завершает игру, начатую через start_session, и обновляет рейтинг"""
+        return await self._write(
+            'finish_session',
+            game_session['session_id'], game_session['user_id'], game_session['game_id'],
+            game_session['started_at'], score, attempts
+        )
+
+    async def get_user_sessions(self, user_id: int, game_id: int = None) -> list[GameSession]:
+        """Возвращает сессии пользователя"""
+        return await self._run('get_user_sessions', user_id, game_id)
+
+    async def get_user_best_score(self, user_id: int, game_id: int) -> int:
+        """Возвращает лучший результат пользователя в игре"""
+        return await self._run('get_user_best_score', user_id, game_id)
+
+    async def get_user_activity(self, user_id: int):
+        """Счетчики игр пользователя по всем играм (None - еще не играл)"""
+        return await self._run('get_user_activity', user_id)
+
+    async def get_user_game_activity(self, user_id: int) -> list:
+        """Счетчики по играм с завершенными играми пользователя: (UserGameActivity, Game)"""
+        return await self._run('get_user_game_activity', user_id)
+
+    async def complete_session(self, session_id: int, score: int, attempts: int):
+        """Завершает игровую сессию с результатами и обновляет рейтинг"""
+        return await self._write('complete_session', session_id, score, attempts)
+
+    async def get_sessions_since_count(self, since_date) -> int:
+        """Количество запущенных игр с указанной даты (с учетом еще не сброшенного счетчика)"""
+        since_day = since_date.date() if isinstance(since_date, datetime) else since_date
+        count = await self._run('get_sessions_since_count', since_date)
+        return count + game_start_counter.pending_count(since_day=since_day)
+
+    async def get_most_active_users(self, limit=5) -> list:
+        """Самые активные пользователи по количеству игр"""
+        return await self._run('get_most_active_users', limit)
+
+    async def get_total_sessions_count(self) -> int:
+        """Общее количество запущенных игр (с учетом еще не сброшенного счетчика)"""
+        return await self._run('get_total_sessions_count') + game_start_counter.pending_count()
+
+    async def get_completed_sessions_count(self) -> int:
+        """Количество завершенных игровых сессий"""
+        return await self._run('get_completed_sessions_count')
+
+    async def get_game_stats(self, game_id: int) -> dict:
+        """Статистика по конкретной игре"""
+        stats = await self._run('get_game_stats', game_id)
+        stats['total_sessions'] += game_start_counter.pending_count(game_id=game_id)
+        return stats
@@ -0,0 +1,21 @@
+from repositories.quiz_repository import QuizRepository
+from .base_repository import AsyncBaseRepository
+
+
+class AsyncQuizRepository(AsyncBaseRepository):
+    """Асинхронный репозиторий для работы с вопросами викторины"""
+
+    repository_class = QuizRepository
+
+    async def get_questions_by_difficulty(self, difficulty: str, limit: int = 10):
+        return await self._run('get_questions_by_difficulty', difficulty, limit)
+
+    async def get_random_questions(self, limit: int = 10):
+        return await self._run('get_random_questions', limit)
+
+    async def get_questions_by_category(self, category: str, limit: int = 10):
+        return await self._run('get_questions_by_category', category, limit)
+
+    async def get_balanced_questions(self, easy: int = 3, medium: int = 3, hard: int = 2):
+        """Получает сбалансированный набор вопросов по сложности"""
+        return await self._run('get_balanced_questions', easy, medium, hard)
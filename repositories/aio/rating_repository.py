@@ -0,0 +1,100 @@
+from dataclasses import replace
+from database.leaderboard_cache import leaderboard_cache
+from database.rank_index import game_rank_indexes, rank_index
+from repositories.rating_repository import RatingRepository
+from .base_repository import AsyncBaseRepository
+
+
+class AsyncRatingRepository(AsyncBaseRepository):
+    """Асинхронный репозиторий для работы с рейтингами"""
+
+    repository_class = RatingRepository
+
+    async def update_rating(self, user_id: int, game_id: int, score: int):
+        """Обновляет рейтинг пользователя после завершения игры"""
+        return await self._write('update_rating', user_id, game_id, score)
+
+    async def get_user_ratings(self, user_id: int):
+        """Возвращает все рейтинги пользователя с информацией об играх"""
+        return await self._run('get_user_ratings', user_id)
+
+    async def get_leaderboard(self, game_id: int = None, limit: int = 10):
+        """Возвращает топ игроков (общий или по конкретной игре), по возможности из кэша"""
+        rows = leaderboard_cache.get(game_id, limit)
+        if rows is None:
+            version = leaderboard_cache.version(game_id)
+            rows = await self._run('get_leaderboard', game_id, limit)
+            leaderboard_cache.put(game_id, limit, rows, version)
+        return rows
+
+    async def get_period_leaderboard(self, period: str, limit: int = 10):
+        """Топ игроков за текущий день, неделю или месяц"""
+        return await self._run('get_period_leaderboard', period, limit)
+
+    async def prune_period_scores(self) -> int:
+        """Удаляет очки за старые периоды"""
+        return await self._write('prune_period_scores')
+
+    async def get_leaderboard_page(self, game_id: int, limit: int = 10, after: tuple = None, before: tuple = None):
+        """Страница топа игры с пагинацией по ключу (total_score, user_id)"""
+        return await self._run('get_leaderboard_page', game_id, limit, after, before)
+
+    async def get_user_global_rank(self, user_id: int):
+        """Возвращает глобальный ранг пользователя среди всех игроков"""
+        if rank_index.loaded:
+            return rank_index.rank(user_id)  # O(log n) по индексу в памяти
+        return await self._run('get_user_global_rank', user_id)
+
+    async def get_leaderboard_around(self, user_id: int, game_id: int = None, radius: int = 5):
+        """Окно топа вокруг игрока; место - из индекса в памяти, если он загружен"""
+        if game_id is None:
+            loaded, index = rank_index.loaded, rank_index
+        else:
+            loaded, index = game_rank_indexes.loaded, game_rank_indexes.get(game_id)
+        if not loaded:
+            return await self._run('get_leaderboard_around', user_id, game_id, radius)
+        if index is None:
+            return None, []  # В игру еще никто не играл
+
+        _, rows = await self._run('get_leaderboard_around', user_id, game_id, radius, False)
+        if not rows:
+            return None, []
+        position = index.position(user_id)
+        caller_row = next((row for row, (user, *_) in enumerate(rows) if user.id == user_id), None)
+        if position is None or caller_row is None:
+            # Индекс еще не знает игрока или окно прочитано после чужого commit - место считаем в БД
+            return await self._run('get_leaderboard_around', user_id, game_id, radius)
+        return position - caller_row, rows
+
+    async def get_user_id_at_rank(self, rank: int):
+        """Возвращает id пользователя на месте rank в общем топе"""
+        if rank_index.loaded:
+            return rank_index.user_at_rank(rank)
+        return await self._run('get_user_id_at_rank', rank)
+
+    async def get_user_stats(self, user_id: int):
+        """Возвращает общую статистику пользователя по всем играм"""
+        return await self._run('get_user_stats', user_id)
+
+    async def get_user_dashboard(self, user_id: int = None, telegram_id: int = None):
+        """Сводка пользователя одним запросом; ранг - из индекса в памяти, если он загружен"""
+        if rank_index.loaded:
+            dashboard = await self._run('get_user_dashboard', user_id, telegram_id, False)
+            return dashboard and replace(dashboard, rank=rank_index.rank(dashboard.user_id))
+        return await self._run('get_user_dashboard', user_id, telegram_id)
+
+    async def get_score_histograms(self, game_ids: list, metric: str = 'total') -> dict:
+        """Гистограммы очков игр: {game_id: {корзина: игроков}}"""
+        return await self._run('get_score_histograms', game_ids, metric)
+
+    async def get_top_players_by_game(self, game_id: int, limit: int = 3) -> list:
+        """Топ игроков по конкретной игре"""
+        return await self._run('get_top_players_by_game', game_id, limit)
+
+    async def check_user_totals(self) -> list[dict]:
+        """Сверяет итоги игроков (user_totals) с ratings"""
+        return await self._run('check_user_totals')
+
+    async def rebuild_user_totals(self) -> int:
+        """Пересобирает итоги игроков по ratings"""
+        return await self._write('rebuild_user_totals')
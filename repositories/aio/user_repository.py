@@ -0,0 +1,58 @@
+from database.models import User
+from repositories.user_repository import UserRepository
+from .base_repository import AsyncBaseRepository
+
+
+class AsyncUserRepository(AsyncBaseRepository):
+    """Асинхронный репозиторий для работы с пользователями"""
+
+    repository_class = UserRepository
+
+    async def get_or_create_user(self, telegram_id: int, username: str,
+                                 first_name: str, last_name: str = None) -> User:
+        """Возвращает пользователя по telegram_id или создает нового"""
+        return await self._run('get_or_create_user', telegram_id, username, first_name, last_name)
+
+    async def get_user_by_telegram_id(self, telegram_id: int) -> User:
+        """Находит пользователя по telegram_id"""
+        return await self._run('get_user_by_telegram_id', telegram_id)
+
+    async def get_user_by_id(self, user_id: int) -> User:
+        """Находит пользователя по id"""
+        return await self._run('get_user_by_id', user_id)
+
+    async def get_all_users(self) -> list[User]:
+        """Возвращает всех пользователей"""
+        return await self._run('get_all_users')
+
+    async def update_user(self, user: User) -> User:
+        """Обновляет данные пользователя"""
+        return await self._run('update_user', user)
+
+    async def block_user(self, user_id: int, reason: str) -> bool:
+        """Блокирует пользователя по user_id"""
+        return await self._run('block_user', user_id, reason)
+
+    async def unblock_user(self, user_id: int) -> bool:
+        """Разблокирует пользователя по user_id"""
+        return await self._run('unblock_user', user_id)
+
+    async def get_user_stats(self, user_id: int) -> dict:
+        """Возвращает статистику пользователя по играм"""
+        return await self._run('get_user_stats', user_id)
+
+    async def get_total_users_count(self) -> int:
+        """Возвращает общее количество пользователей"""
+        return await self._run('get_total_users_count')
+
+    async def get_blocked_users_count(self) -> int:
+        """Возвращает количество заблокированных пользователей"""
+        return await self._run('get_blocked_users_count')
+
+    async def get_active_today_count(self) -> int:
+        """Возвращает количество активных пользователей за сегодня"""
+        return await self._run('get_active_today_count')
+
+    async def get_users_since_count(self, since_date) -> int:
+        """Количество пользователей зарегистрированных с указанной даты"""
+        return await self._run('get_users_since_count', since_date)
@@ -5,6 +5,8 @@ class BaseRepository:
     """
     Базовый класс для всех репозиториев.
     Содержит общую логику работы с БД.
+    Репозитории только отправляют изменения в БД (flush),
+    транзакцию завершает единица работы (DatabaseMiddleware / session_scope).
     """
     
     def __init__(self, db: Session):
@@ -13,14 +15,11 @@ class BaseRepository:
     def save(self, obj):
         """Сохраняет объект в БД"""
         self.db.add(obj)
-        self.db.commit()
-        self.db.refresh(obj)
+        self.db.flush()
         return obj
     
     def save_all(self, objects):
         """Сохраняет несколько объектов в БД"""
         self.db.add_all(objects)
-        self.db.commit()
-        for obj in objects:
-            self.db.refresh(obj)
+        self.db.flush()
         return objects
\ No newline at end of file
@@ -1,4 +1,5 @@
 from sqlalchemy import func
+from database.city_index import CityIndex, get_city_index, set_city_index
 from database.models import City
 from repositories.base_repository import BaseRepository
 
@@ -39,9 +40,18 @@ class CityRepository(BaseRepository):
         return None
     
     def get_random_start_city(self):
-        """Получает случайный город для начала игры"""
-        return self.db.query(City).order_by(func.random()).first()
+        """
+        Получает случайный город для начала игры: id выбирается индексом
+        городов в памяти, строка читается по первичному ключу (без сортировки таблицы)
+        """
+        index = get_city_index() or set_city_index(self.build_city_index())
+        city_id = index.random_city()
+        return self.db.get(City, city_id) if city_id is not None else None
     
     def city_exists(self, city_name: str) -> bool:
         """Проверяет, существует ли город в БД"""
-        return self.get_city_by_name(city_name) is not None
\ No newline at end of file
+        return self.get_city_by_name(city_name) is not None
+
+    def build_city_index(self) -> CityIndex:
+        """Строит индекс городов в памяти по таблице cities"""
+        return CityIndex.from_db(self.db)
@@ -0,0 +1,37 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class GameRatingView:
+    """Рейтинг пользователя в одной игре (только для чтения)"""
+    game_id: int
+    game_name: str
+    total_score: int
+    games_played: int
+    best_score: int
+    average_score: float
+
+
+@dataclass(frozen=True)
+class UserDashboard:
+    """
+    Сводка пользователя для /rating и /user_stats: данные пользователя,
+    рейтинги по играм, итоги, счетчики сессий и глобальный ранг.
+    Собирается одним запросом (RatingRepository.get_user_dashboard)
+    """
+    user_id: int
+    telegram_id: int
+    first_name: str
+    username: str | None
+    total_score: int
+    total_games: int
+    best_score: int
+    sessions: int           # Всего сессий (включая незавершенные)
+    completed: int          # Завершенных игр
+    rank: int | None        # None - ранг не запрашивался
+    ratings: tuple[GameRatingView, ...]
+
+    @property
+    def completion_rate(self) -> float:
+        """Процент завершенных сессий"""
+        return (self.completed / self.sessions * 100) if self.sessions > 0 else 0
@@ -46,7 +46,7 @@ class GameRepository(BaseRepository):
         game = self.get_game_by_code(game_code)
         if game:
             game.is_active = not game.is_active
-            self.db.commit()
+            self.db.flush()
             return True
         return False
 
@@ -1,10 +1,44 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update, text, bindparam, Date
 from datetime import datetime
-from database.models import GameSession, User
+from database.models import Game, GameSession, GameStartStat, PeriodScore, User, UserActivity, UserGameActivity
 from .base_repository import BaseRepository
 from .rating_repository import RatingRepository
 
+# Добавление запусков к счетчику дня (строка создается при первом запуске за день)
+GAME_STARTS_UPSERT = text("""
+    INSERT INTO game_start_stats (game_id, day, starts)
+    VALUES (:game_id, :day, :starts)
+    ON CONFLICT (game_id, day) DO UPDATE SET starts = starts + excluded.starts
+""")
+
+# Очки игрока за текущие день, неделю и месяц - одна строка на (период, начало, игрок)
+PERIOD_SCORES_UPSERT = text("""
+    INSERT INTO period_scores (period, period_start, user_id, total_score, games_played, best_score)
+    VALUES (:period, :period_start, :user_id, :score, 1, :score)
+    ON CONFLICT (period, period_start, user_id) DO UPDATE SET
+        total_score = total_score + excluded.total_score,
+        games_played = games_played + 1,
+        best_score = max(best_score, excluded.best_score)
+""").bindparams(bindparam('period_start', type_=Date))
+
+# Счетчики игр пользователя: новая сессия и/или завершение с очками и попытками
+_ACTIVITY_SET = """
+        sessions = sessions + excluded.sessions,
+        completed = completed + excluded.completed,
+        score_sum = score_sum + excluded.score_sum,
+        best_score = max(best_score, excluded.best_score),
+        attempts_sum = attempts_sum + excluded.attempts_sum
+"""
+USER_ACTIVITY_UPSERT = text("""
+    INSERT INTO user_activity (user_id, sessions, completed, score_sum, best_score, attempts_sum)
+    VALUES (:user_id, :sessions, :completed, :score, :score, :attempts)
+    ON CONFLICT (user_id) DO UPDATE SET""" + _ACTIVITY_SET)
+USER_GAME_ACTIVITY_UPSERT = text("""
+    INSERT INTO user_game_activity (user_id, game_id, sessions, completed, score_sum, best_score, attempts_sum)
+    VALUES (:user_id, :game_id, :sessions, :completed, :score, :score, :attempts)
+    ON CONFLICT (user_id, game_id) DO UPDATE SET""" + _ACTIVITY_SET)
+
 
 class GameSessionRepository(BaseRepository):
     """Репозиторий для работы с игровыми сессиями"""
@@ -19,6 +53,7 @@ class GameSessionRepository(BaseRepository):
         )
 
         self.save(session)
+        self._count_activity(user_id, game_id, sessions=1)
         print(f"🎯 Создана игровая сессия: User {user_id}, Game {game_id}")
         return session
 
@@ -49,48 +84,128 @@ class GameSessionRepository(BaseRepository):
         return best_score
     
     def complete_session(self, session_id: int, score: int, attempts: int):
-        """Завершает игровую сессию с результатами и обновляет рейтинг"""
-        stmt = select(GameSession).where(GameSession.id == session_id)
-        result = self.db.execute(stmt)
-        session = result.scalar_one_or_none()
+        """
+        Завершает игровую сессию с результатами и обновляет рейтинг.
+        UPDATE ... RETURNING и upsert рейтинга выполняются в одной транзакции
+        (фиксирует ее единица работы), без предварительных SELECT.
+        Уже завершенная сессия повторно не засчитывается
+        """
+        stmt = (
+            update(GameSession)
+            .where(GameSession.id == session_id, GameSession.completed.is_not(True))
+            .values(
+                score=score,
+                attempts=attempts,
+                completed=True,
+                finished_at=datetime.utcnow()
+            )
+            .returning(GameSession)
+        )
+        session = self.db.scalars(
+            stmt, execution_options={'populate_existing': True}
+        ).one_or_none()
 
         if session:
-            session.score = score
-            session.attempts = attempts
-            session.completed = True
-            session.finished_at = datetime.utcnow()
-            
-            self.db.commit()
-            self.db.refresh(session)
-            
-            rating_repo = RatingRepository(self.db)
-            rating_repo.update_rating(session.user_id, session.game_id, score)
+            self._record_result(session.user_id, session.game_id, score, attempts, session.finished_at)
             
             print(f"🎯 Завершена сессия {session_id} с результатом: {score} очков")
 
         return session
     
+    def record_completed_session(self, user_id: int, game_id: int, started_at: datetime,
+                                 score: int, attempts: int) -> GameSession:
+        """
+        Записывает уже завершенную игру одной строкой и обновляет рейтинг.
+        Используется в ленивом режиме, когда строка при старте игры не создавалась
+        """
+        session = GameSession(
+            user_id=user_id,
+            game_id=game_id,
+            score=score,
+            attempts=attempts,
+            completed=True,
+            started_at=started_at,
+            finished_at=datetime.utcnow()
+        )
+        self.db.add(session)
+        self.db.flush()
+
+        self._record_result(user_id, game_id, score, attempts, session.finished_at, new_session=True)
+        print(f"🎯 Записана завершенная игра: User {user_id}, Game {game_id}, {score} очков")
+        return session
+
+    def _record_result(self, user_id: int, game_id: int, score: int, attempts: int,
+                       finished_at: datetime, new_session: bool = False):
+        """Учитывает результат игры в рейтинге, счетчиках игрока и в очках за день, неделю и месяц"""
+        RatingRepository(self.db).update_rating(user_id, game_id, score)
+        self._count_activity(user_id, game_id, sessions=int(new_session), completed=1, score=score, attempts=attempts)
+        day = finished_at.date()
+        self.db.execute(PERIOD_SCORES_UPSERT, [
+            {'period': period, 'period_start': PeriodScore.start_of(period, day), 'user_id': user_id, 'score': score}
+            for period in PeriodScore.PERIODS
+        ])
+
+    def _count_activity(self, user_id: int, game_id: int, sessions: int = 0, completed: int = 0,
+                        score: int = 0, attempts: int = 0):
+        """Добавляет сессию и/или завершенную игру к счетчикам user_activity и user_game_activity"""
+        params = {
+            'user_id': user_id, 'game_id': game_id, 'sessions': sessions,
+            'completed': completed, 'score': score or 0, 'attempts': attempts or 0
+        }
+        self.db.execute(USER_ACTIVITY_UPSERT, params)
+        self.db.execute(USER_GAME_ACTIVITY_UPSERT, params)
+
+    def get_user_activity(self, user_id: int) -> UserActivity:
+        """Счетчики игр пользователя по всем играм (None - еще не играл)"""
+        return self.db.get(UserActivity, user_id)
+
+    def get_user_game_activity(self, user_id: int) -> list:
+        """Счетчики по играм, в которых у пользователя есть завершенные игры: (UserGameActivity, Game)"""
+        stmt = (
+            select(UserGameActivity, Game)
+            .join(Game, UserGameActivity.game_id == Game.id)
+            .where(UserGameActivity.user_id == user_id, UserGameActivity.completed > 0)
+            .order_by(Game.id)
+        )
+        return self.db.execute(stmt).all()
+
+    def finish_session(self, session_id: int, user_id: int, game_id: int, started_at: datetime,
+                       score: int, attempts: int) -> GameSession:
+        """Завершает игру: обновляет созданную при старте строку или записывает новую"""
+        if session_id is not None:
+            return self.complete_session(session_id, score, attempts)
+        return self.record_completed_session(user_id, game_id, started_at, score, attempts)
+
+    def add_session_starts(self, starts: dict):
+        """Добавляет запуски игр к счетчику: {(game_id, day): количество}"""
+        if not starts:
+            return
+        self.db.execute(GAME_STARTS_UPSERT, [
+            {'game_id': game_id, 'day': day, 'starts': count}
+            for (game_id, day), count in starts.items()
+        ])
+
     def get_sessions_since_count(self, since_date) -> int:
-        """Количество игровых сессий с указанной даты"""
-        stmt = select(func.count(GameSession.id)).where(GameSession.started_at >= since_date)
+        """Количество запущенных игр с указанной даты (с точностью до дня)"""
+        since_day = since_date.date() if isinstance(since_date, datetime) else since_date
+        stmt = select(func.sum(GameStartStat.starts)).where(GameStartStat.day >= since_day)
         result = self.db.execute(stmt)
         return result.scalar() or 0
 
     def get_most_active_users(self, limit=5) -> list:
-        """Самые активные пользователи по количеству игр"""
+        """Самые активные пользователи по количеству игр (по индексу счетчиков user_activity)"""
         stmt = (
-            select(User, func.count(GameSession.id).label('game_count'))
-            .join(GameSession, User.id == GameSession.user_id)
-            .group_by(User.id)
-            .order_by(func.count(GameSession.id).desc())
+            select(User, UserActivity.sessions.label('game_count'))
+            .join(UserActivity, User.id == UserActivity.user_id)
+            .order_by(UserActivity.sessions.desc(), UserActivity.user_id)
             .limit(limit)
         )
         result = self.db.execute(stmt)
         return result.all()
     
     def get_total_sessions_count(self) -> int:
-        """Общее количество игровых сессий"""
-        stmt = select(func.count(GameSession.id))
+        """Общее количество запущенных игр (включая брошенные)"""
+        stmt = select(func.sum(GameStartStat.starts))
         result = self.db.execute(stmt)
         return result.scalar() or 0
 
@@ -102,8 +217,8 @@ class GameSessionRepository(BaseRepository):
 
     def get_game_stats(self, game_id: int) -> dict:
         """Статистика по конкретной игре"""
-        total_sessions_stmt = select(func.count(GameSession.id)).where(
-            GameSession.game_id == game_id
+        total_sessions_stmt = select(func.sum(GameStartStat.starts)).where(
+            GameStartStat.game_id == game_id
         )
         total_sessions = self.db.execute(total_sessions_stmt).scalar() or 0
         
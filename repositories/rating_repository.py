@@ -1,8 +1,61 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func, desc
-from database.models import User, Rating, Game
-from datetime import datetime
+from sqlalchemy import select, func, text, delete, insert, or_, null, true, literal, literal_column
+from database.models import User, Rating, Game, UserTotal, UserActivity, PeriodScore, GameSession, ScoreHistogram
+# Подписка индекса рейтинга и кэша топов на commit
+from database.rank_index import rank_index  # noqa: F401
+from database.leaderboard_cache import leaderboard_cache  # noqa: F401
+from datetime import date, datetime, timedelta
 from repositories.base_repository import BaseRepository
+from repositories.dashboard import GameRatingView, UserDashboard
+
+# Upsert рейтинга одним запросом. В DO UPDATE колонки без префикса - текущие
+# значения строки, excluded - значения из VALUES.
+# text(), а не sqlite.insert().on_conflict_do_update(): конструкция диалекта
+# не кэшируется и компилировалась бы заново при каждом завершении игры
+RATING_UPSERT = text("""
+    INSERT INTO ratings (user_id, game_id, total_score, games_played, best_score, average_score, last_played)
+    VALUES (:user_id, :game_id, :score, 1, :score, :score, :now)
+    ON CONFLICT (user_id, game_id) DO UPDATE SET
+        total_score = total_score + excluded.total_score,
+        games_played = games_played + 1,
+        best_score = max(best_score, excluded.best_score),
+        average_score = (total_score + excluded.total_score) * 1.0 / (games_played + 1),
+        last_played = excluded.last_played
+    RETURNING *
+""")
+
+# Итоги игрока по всем играм - обновляются тем же способом сразу после рейтинга
+USER_TOTALS_UPSERT = text("""
+    INSERT INTO user_totals (user_id, total_score, total_games, best_score)
+    VALUES (:user_id, :score, 1, :score)
+    ON CONFLICT (user_id) DO UPDATE SET
+        total_score = total_score + excluded.total_score,
+        total_games = total_games + 1,
+        best_score = max(best_score, excluded.best_score)
+    RETURNING total_score
+""")
+
+# Перенос игрока между корзинами гистограмм очков игры: -1 в корзинах текущих
+# total_score и best_score, +1 в корзинах после добавления очков. Выполняется
+# до upsert рейтинга и читает текущую строку ratings в том же запросе
+_RATING_ROW = "FROM ratings WHERE user_id = :user_id AND game_id = :game_id"
+SCORE_HISTOGRAM_UPSERT = text(f"""
+    INSERT INTO score_histograms (game_id, metric, bucket, players)
+    SELECT :game_id, metric, {ScoreHistogram.bucket_sql('score')} AS bucket, sum(delta)
+    FROM (
+        SELECT 'total' AS metric, total_score AS score, -1 AS delta {_RATING_ROW}
+        UNION ALL
+        SELECT 'best', best_score, -1 {_RATING_ROW}
+        UNION ALL
+        SELECT 'total', coalesce((SELECT total_score {_RATING_ROW}), 0) + :score, 1
+        UNION ALL
+        SELECT 'best', max(coalesce((SELECT best_score {_RATING_ROW}), :score), :score), 1
+    )
+    WHERE true
+    GROUP BY metric, bucket
+    HAVING sum(delta) != 0
+    ON CONFLICT (game_id, metric, bucket) DO UPDATE SET players = players + excluded.players
+""")
 
 class RatingRepository:
     def __init__(self, db: Session):
@@ -10,40 +63,27 @@ class RatingRepository:
     
     def update_rating(self, user_id: int, game_id: int, score: int):
         """
-        Обновляет рейтинг пользователя после завершения игры
+        Обновляет рейтинг пользователя после завершения игры.
+        Один запрос INSERT ... ON CONFLICT(user_id, game_id) DO UPDATE:
+        счетчики увеличиваются на стороне БД, без чтения строки в Python,
+        поэтому параллельные завершения не теряют очки друг друга.
+        Перед ним игрок переносится в новые корзины гистограмм очков игры
         """
-        # Находим существующий рейтинг или создаем новый
-        stmt = select(Rating).where(
-            Rating.user_id == user_id,
-            Rating.game_id == game_id
-        )
-        result = self.db.execute(stmt)
-        rating = result.scalar_one_or_none()
-        
-        if rating:
-            # Обновляем существующий рейтинг
-            rating.total_score += score
-            rating.games_played += 1
-            rating.best_score = max(rating.best_score, score)
-            rating.average_score = rating.total_score / rating.games_played
-            rating.last_played = datetime.utcnow()
-            print(f"📈 Обновлен рейтинг: User {user_id}, Game {game_id}, +{score} очков")
-        else:
-            # Создаем новый рейтинг
-            rating = Rating(
-                user_id=user_id,
-                game_id=game_id,
-                total_score=score,
-                games_played=1,
-                best_score=score,
-                average_score=score,
-                last_played=datetime.utcnow()
-            )
-            self.db.add(rating)
-            print(f"📈 Создан рейтинг: User {user_id}, Game {game_id}, {score} очков")
-        
-        self.db.commit()
-        self.db.refresh(rating)
+        params = {'user_id': user_id, 'game_id': game_id, 'score': score}
+        self.db.execute(SCORE_HISTOGRAM_UPSERT, params)
+        rating = self.db.scalars(
+            select(Rating).from_statement(RATING_UPSERT),
+            {**params, 'now': datetime.utcnow()},
+            execution_options={'populate_existing': True}  # Обновить объект, если он уже в сессии
+        ).one()
+        # В той же транзакции - общий топ не расходится с рейтингами по играм
+        total_score = self.db.execute(USER_TOTALS_UPSERT, {'user_id': user_id, 'score': score}).scalar_one()
+        # После commit новые суммы уйдут в индексы рейтинга, а топы,
+        # которые она может изменить, будут сброшены из кэша
+        self.db.info.setdefault('rank_updates', {})[user_id] = total_score
+        self.db.info.setdefault('game_rank_updates', {})[(game_id, user_id)] = rating.total_score
+        self.db.info.setdefault('leaderboard_updates', []).append((user_id, game_id, rating.total_score, total_score))
+        print(f"📈 Обновлен рейтинг: User {user_id}, Game {game_id}, +{score} очков")
         return rating
     
     def get_user_ratings(self, user_id: int):
@@ -75,47 +115,162 @@ class RatingRepository:
                 .limit(limit)
             )
         else:
-            # Общий топ (сумма очков по всем играм)
+            # Общий топ (сумма очков по всем играм) - из итогов user_totals
             stmt = (
                 select(
                     User,
-                    func.sum(Rating.total_score).label('total_score'),
-                    func.sum(Rating.games_played).label('total_games'),
-                    func.max(Rating.best_score).label('best_score')
+                    UserTotal.total_score.label('total_score'),
+                    UserTotal.total_games.label('total_games'),
+                    UserTotal.best_score.label('best_score')
                 )
-                .select_from(User)
-                .join(Rating, User.id == Rating.user_id)
-                .group_by(User.id)
-                .order_by(desc('total_score'))
+                .select_from(UserTotal)
+                .join(User, User.id == UserTotal.user_id)
+                .order_by(UserTotal.total_score.desc(), UserTotal.user_id)
                 .limit(limit)
             )
         
         result = self.db.execute(stmt)
         return result.all()
     
-    def get_user_global_rank(self, user_id: int):
+    def get_period_leaderboard(self, period: str, limit: int = 10, day: date = None):
         """
-        Возвращает глобальный ранг пользователя среди всех игроков
+        Топ игроков за текущий день, неделю или месяц (period: day, week, month).
+        Читает первые limit строк периода по индексу ix_period_scores_top
+        Возвращает строки (User, total_score, total_games, best_score), как общий топ
         """
-        # Подзапрос для сумм очков всех пользователей
-        user_scores = (
+        period_start = PeriodScore.start_of(period, day or datetime.utcnow().date())
+        stmt = (
             select(
-                User.id,
-                func.sum(Rating.total_score).label('total_score')
+                User,
+                PeriodScore.total_score.label('total_score'),
+                PeriodScore.games_played.label('total_games'),
+                PeriodScore.best_score.label('best_score')
             )
-            .select_from(User)
-            .join(Rating, User.id == Rating.user_id)
-            .group_by(User.id)
-            .subquery()
+            .select_from(PeriodScore)
+            .join(User, User.id == PeriodScore.user_id)
+            .where(PeriodScore.period == period, PeriodScore.period_start == period_start)
+            .order_by(PeriodScore.total_score.desc(), PeriodScore.user_id)
+            .limit(limit)
         )
+        result = self.db.execute(stmt)
+        return result.all()
+    
+    def prune_period_scores(self, day: date = None) -> int:
+        """
+        Удаляет очки за старые периоды: остаются текущий и предыдущий
+        день, неделя и месяц. Возвращает число удаленных строк
+        """
+        day = day or datetime.utcnow().date()
+        previous_day = {
+            'day': day - timedelta(days=1),
+            'week': day - timedelta(days=7),
+            'month': PeriodScore.start_of('month', day) - timedelta(days=1)
+        }
+        deleted = 0
+        for period in PeriodScore.PERIODS:
+            keep_from = PeriodScore.start_of(period, previous_day[period])
+            result = self.db.execute(
+                delete(PeriodScore).where(PeriodScore.period == period, PeriodScore.period_start < keep_from)
+            )
+            deleted += result.rowcount
+        return deleted
+    
+    def get_leaderboard_page(self, game_id: int, limit: int = 10, after: tuple = None, before: tuple = None):
+        """
+        Страница топа игры с пагинацией по ключу (total_score, user_id) вместо OFFSET:
+        after - ключ последней строки текущей страницы (следующая страница),
+        before - ключ первой строки (предыдущая страница).
+        Каждая страница - проход по индексу ix_ratings_game_total_score
+        от ключа, поэтому глубокие страницы стоят столько же, сколько первая.
+        Возвращает (строки (Rating, User), есть ли еще строки в направлении листания)
+        """
+        stmt = (
+            select(Rating, User)
+            .join(User, Rating.user_id == User.id)
+            .where(Rating.game_id == game_id)
+        )
+        if before is not None:
+            score, user_id = before
+            # Строки выше ключа; первое условие задает диапазон индекса
+            stmt = stmt.where(
+                Rating.total_score >= score,
+                or_(Rating.total_score > score, Rating.user_id < user_id)
+            ).order_by(Rating.total_score.asc(), Rating.user_id.desc())
+        else:
+            if after is not None:
+                score, user_id = after
+                stmt = stmt.where(
+                    Rating.total_score <= score,
+                    or_(Rating.total_score < score, Rating.user_id > user_id)
+                )
+            stmt = stmt.order_by(Rating.total_score.desc(), Rating.user_id)
         
-        # Находим количество пользователей с большей суммой очков
+        # Лишняя строка показывает, есть ли следующая страница
+        rows = self.db.execute(stmt.limit(limit + 1)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if before is not None:
+            rows.reverse()
+        return rows, has_more
+    
+    def get_leaderboard_around(self, user_id: int, game_id: int = None, radius: int = 5,
+                               with_place: bool = True):
+        """
+        Окно топа вокруг игрока: radius игроков выше, сам игрок и radius ниже.
+        game_id is None - общий топ (user_totals), иначе топ игры (ratings).
+        Соседи находятся двумя проходами по индексу (очки, user_id) от ключа игрока,
+        место - подсчетом строк выше ключа по тому же индексу (with_place=False - без него).
+        Возвращает (место первой строки окна, строки (User, total_score, games_played));
+        для игрока без очков в этом топе - (None, [])
+        """
+        if game_id is None:
+            score, owner = UserTotal.total_score, UserTotal.user_id
+            caller_stmt = select(UserTotal.total_score).where(UserTotal.user_id == user_id)
+            stmt = select(User, UserTotal.total_score, UserTotal.total_games).join(UserTotal, UserTotal.user_id == User.id)
+            count_stmt = select(func.count()).select_from(UserTotal)
+        else:
+            score, owner = Rating.total_score, Rating.user_id
+            caller_stmt = select(Rating.total_score).where(Rating.user_id == user_id, Rating.game_id == game_id)
+            stmt = (
+                select(User, Rating.total_score, Rating.games_played)
+                .join(Rating, Rating.user_id == User.id)
+                .where(Rating.game_id == game_id)
+            )
+            count_stmt = select(func.count()).select_from(Rating).where(Rating.game_id == game_id)
+
+        caller_score = self.db.execute(caller_stmt).scalar()
+        if caller_score is None:
+            return None, []
+
+        # Ключи выше игрока: больше очков или столько же и меньше user_id (порядок топа)
+        above_key = (score >= caller_score, or_(score > caller_score, owner < user_id))
+        above = self.db.execute(
+            stmt.where(*above_key).order_by(score.asc(), owner.desc()).limit(radius)
+        ).all()
+        caller_and_below = self.db.execute(
+            stmt.where(score <= caller_score, or_(score < caller_score, owner >= user_id))
+            .order_by(score.desc(), owner)
+            .limit(radius + 1)
+        ).all()
+        rows = above[::-1] + caller_and_below
+
+        if not with_place:
+            return None, rows
+        place = self.db.execute(count_stmt.where(*above_key)).scalar() + 1
+        return place - len(above), rows
+
+    def get_user_global_rank(self, user_id: int):
+        """
+        Возвращает глобальный ранг пользователя среди всех игроков
+        """
+        # Количество пользователей с большей суммой очков (по индексу user_totals)
         stmt = (
             select(func.count())
-            .select_from(user_scores)
-            .where(user_scores.c.total_score > (
-                select(func.sum(Rating.total_score))
-                .where(Rating.user_id == user_id)
+            .select_from(UserTotal)
+            .where(UserTotal.total_score > (
+                select(UserTotal.total_score)
+                .where(UserTotal.user_id == user_id)
+                .scalar_subquery()
             ))
         )
         
@@ -123,6 +278,20 @@ class RatingRepository:
         rank = result.scalar() or 0
         return rank + 1  # +1 потому что rank это количество людей выше
     
+    def get_user_id_at_rank(self, rank: int):
+        """
+        Возвращает id пользователя на месте rank в общем топе (None - нет такого места)
+        """
+        if rank < 1:
+            return None
+        stmt = (
+            select(UserTotal.user_id)
+            .order_by(UserTotal.total_score.desc(), UserTotal.user_id)
+            .offset(rank - 1)
+            .limit(1)
+        )
+        return self.db.scalar(stmt)
+    
     def get_user_stats(self, user_id: int):
         """
         Возвращает общую статистику пользователя по всем играм
@@ -139,6 +308,86 @@ class RatingRepository:
         result = self.db.execute(stmt)
         return result.first()
     
+    def get_user_dashboard(self, user_id: int = None, telegram_id: int = None,
+                           with_rank: bool = True) -> UserDashboard | None:
+        """
+        Сводка пользователя одним запросом: пользователь, итоги, счетчики сессий,
+        глобальный ранг и рейтинги по играм (строка на игру, LEFT JOIN - для
+        пользователя без игр одна строка). Пользователь ищется по id или telegram_id
+        """
+        if user_id is not None:
+            user_filter = User.id == user_id
+        else:
+            user_filter = User.telegram_id == telegram_id
+        dashboard_user = (
+            select(
+                User.id, User.telegram_id, User.first_name, User.username,
+                UserTotal.total_score, UserTotal.total_games, UserTotal.best_score,
+                UserActivity.sessions, UserActivity.completed
+            )
+            .outerjoin(UserTotal, UserTotal.user_id == User.id)
+            .outerjoin(UserActivity, UserActivity.user_id == User.id)
+            .where(user_filter)
+            .cte('dashboard_user')
+        )
+
+        dashboard_from = dashboard_user
+        if with_rank:
+            # Ранг - как в get_user_global_rank: 1 + игроки с большей суммой (по индексу user_totals).
+            # Агрегат в отдельном CTE считается один раз, а не для каждой строки рейтинга
+            dashboard_rank = (
+                select((func.count() + 1).label('rank'))
+                .where(UserTotal.total_score > select(dashboard_user.c.total_score).scalar_subquery())
+                .cte('dashboard_rank')
+            )
+            dashboard_from = dashboard_from.join(dashboard_rank, true())
+            rank = dashboard_rank.c.rank
+        else:
+            rank = null().label('rank')
+
+        stmt = (
+            select(
+                dashboard_user, rank,
+                Rating.game_id, Game.name, Rating.total_score.label('game_total_score'),
+                Rating.games_played, Rating.best_score.label('game_best_score'), Rating.average_score
+            )
+            .select_from(
+                dashboard_from
+                .outerjoin(Rating, Rating.user_id == dashboard_user.c.id)
+                .outerjoin(Game, Game.id == Rating.game_id)
+            )
+            .order_by(Rating.total_score.desc(), Rating.game_id)
+        )
+        rows = self.db.execute(stmt).all()
+        if not rows:
+            return None
+
+        first = rows[0]
+        ratings = tuple(
+            GameRatingView(
+                game_id=row.game_id,
+                game_name=row.name,
+                total_score=row.game_total_score or 0,
+                games_played=row.games_played or 0,
+                best_score=row.game_best_score or 0,
+                average_score=row.average_score or 0.0
+            )
+            for row in rows if row.game_id is not None
+        )
+        return UserDashboard(
+            user_id=first.id,
+            telegram_id=first.telegram_id,
+            first_name=first.first_name,
+            username=first.username,
+            total_score=first.total_score or 0,
+            total_games=first.total_games or 0,
+            best_score=first.best_score or 0,
+            sessions=first.sessions or 0,
+            completed=first.completed or 0,
+            rank=first.rank,
+            ratings=ratings
+        )
+
     def get_top_players_by_game(self, game_id: int, limit: int = 3) -> list:
         """Топ игроков по конкретной игре"""
         stmt = (
@@ -149,4 +398,173 @@ class RatingRepository:
             .limit(limit)
         )
         result = self.db.execute(stmt)
-        return result.all()
\ No newline at end of file
+        return result.all()
+    
+    def _expected_user_totals(self):
+        """Итоги игроков, посчитанные заново по ratings"""
+        return (
+            select(
+                Rating.user_id.label('user_id'),
+                func.coalesce(func.sum(Rating.total_score), 0).label('total_score'),
+                func.coalesce(func.sum(Rating.games_played), 0).label('total_games'),
+                func.coalesce(func.max(Rating.best_score), 0).label('best_score')
+            )
+            .group_by(Rating.user_id)
+        )
+    
+    def check_user_totals(self) -> list[dict]:
+        """
+        Сверяет user_totals с ratings.
+        Возвращает расхождения: user_id, ожидаемые и сохраненные итоги
+        (None - строки нет)
+        """
+        expected = self._expected_user_totals().subquery()
+        columns = ('total_score', 'total_games', 'best_score')
+        
+        # Итоги отсутствуют или не совпадают с ratings
+        stale = self.db.execute(
+            select(expected, UserTotal)
+            .outerjoin(UserTotal, UserTotal.user_id == expected.c.user_id)
+            .where(or_(
+                UserTotal.user_id.is_(None),
+                *(getattr(UserTotal, column) != expected.c[column] for column in columns)
+            ))
+        ).all()
+        # Итоги без единого рейтинга
+        orphans = self.db.scalars(
+            select(UserTotal).where(UserTotal.user_id.not_in(select(expected.c.user_id)))
+        ).all()
+        
+        mismatches = [
+            {
+                'user_id': row.user_id,
+                'expected': tuple(row._mapping[expected.c[column]] for column in columns),
+                'actual': tuple(getattr(row.UserTotal, column) for column in columns) if row.UserTotal else None
+            }
+            for row in stale
+        ]
+        mismatches += [
+            {
+                'user_id': total.user_id,
+                'expected': None,
+                'actual': tuple(getattr(total, column) for column in columns)
+            }
+            for total in orphans
+        ]
+        return sorted(mismatches, key=lambda mismatch: mismatch['user_id'])
+    
+    def rebuild_user_totals(self) -> int:
+        """Пересобирает user_totals по ratings. Возвращает число игроков"""
+        self.db.execute(delete(UserTotal))
+        result = self.db.execute(
+            insert(UserTotal).from_select(
+                ['user_id', 'total_score', 'total_games', 'best_score'],
+                self._expected_user_totals()
+            )
+        )
+        print(f"🔁 Итоги игроков пересобраны: {result.rowcount}")
+        return result.rowcount
+    
+    def rebuild_score_histograms(self) -> int:
+        """Пересобирает гистограммы очков по ratings. Возвращает число корзин"""
+        self.db.execute(delete(ScoreHistogram))
+        buckets = 0
+        for metric, column in (('total', Rating.total_score), ('best', Rating.best_score)):
+            bucket = literal_column(ScoreHistogram.bucket_sql('coalesce(score, 0)')).label('bucket')
+            scores = select(Rating.game_id, column.label('score')).subquery()
+            result = self.db.execute(
+                insert(ScoreHistogram).from_select(
+                    ['game_id', 'metric', 'bucket', 'players'],
+                    select(scores.c.game_id, literal(metric), bucket, func.count())
+                    .group_by(scores.c.game_id, bucket)
+                )
+            )
+            buckets += result.rowcount
+        print(f"🔁 Гистограммы очков пересобраны: {buckets} корзин")
+        return buckets
+
+    def get_score_histograms(self, game_ids: list, metric: str = 'total') -> dict:
+        """Гистограммы очков игр: {game_id: {корзина: игроков}}"""
+        if not game_ids:
+            return {}
+        stmt = (
+            select(ScoreHistogram.game_id, ScoreHistogram.bucket, ScoreHistogram.players)
+            .where(ScoreHistogram.game_id.in_(game_ids), ScoreHistogram.metric == metric)
+        )
+        histograms = {game_id: {} for game_id in game_ids}
+        for game_id, bucket, players in self.db.execute(stmt):
+            histograms[game_id][bucket] = players
+        return histograms
+
+    def rebuild_ratings_from_sessions(self, chunk_size: int = 10000, progress=None) -> dict:
+        """
+        Пересчитывает ratings (и user_totals, гистограммы очков) по завершенным game_sessions.
+        
+        Сессии читаются потоком пачками по chunk_size строк (yield_per) в порядке
+        индекса (user_id, game_id, completed), поэтому строки одной пары
+        пользователь-игра идут подряд: пара сворачивается в одну строку рейтинга,
+        как только закончилась, и память не зависит от числа сессий.
+        Строки - кортежи Core, без ORM-объектов. Готовые рейтинги вставляются
+        пачками; старые удаляются в той же транзакции (фиксирует вызывающий).
+        progress(sessions, ratings) вызывается после каждой пачки сессий.
+        Возвращает {'sessions': ..., 'ratings': ...}
+        """
+        self.db.execute(delete(Rating))
+        
+        stmt = (
+            select(GameSession.user_id, GameSession.game_id, GameSession.score, GameSession.finished_at)
+            .where(GameSession.completed == True)
+            .order_by(GameSession.user_id, GameSession.game_id)
+        )
+        rows = self.db.execute(stmt, execution_options={'yield_per': chunk_size})
+        
+        sessions = ratings = 0
+        batch = []
+        key = None
+        total_score = games_played = best_score = 0
+        last_played = None
+        
+        def close_group():
+            batch.append({
+                'user_id': key[0], 'game_id': key[1],
+                'total_score': total_score, 'games_played': games_played, 'best_score': best_score,
+                'average_score': total_score / games_played, 'last_played': last_played
+            })
+        
+        for partition in rows.partitions():
+            for user_id, game_id, score, finished_at in partition:
+                if key != (user_id, game_id):
+                    if key is not None:
+                        close_group()
+                    key = (user_id, game_id)
+                    total_score = games_played = best_score = 0
+                    last_played = None
+                
+                score = score or 0
+                total_score += score
+                games_played += 1
+                if score > best_score:
+                    best_score = score
+                if finished_at is not None and (last_played is None or finished_at > last_played):
+                    last_played = finished_at
+            
+            sessions += len(partition)
+            if len(batch) >= chunk_size:
+                self.db.execute(insert(Rating.__table__), batch)
+                ratings += len(batch)
+                batch = []
+            if progress:
+                progress(sessions, ratings)
+        
+        if key is not None:
+            close_group()
+        if batch:
+            self.db.execute(insert(Rating.__table__), batch)
+            ratings += len(batch)
+        
+        print(f"🔁 Рейтинги пересчитаны: {ratings} по {sessions} сессиям")
+        self.rebuild_user_totals()
+        self.rebuild_score_histograms()
+        # Загруженные в сессию рейтинги больше не соответствуют строкам таблицы
+        self.db.expire_all()
+        return {'sessions': sessions, 'ratings': ratings}
@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import select, func
-from datetime import datetime
+from datetime import datetime, timedelta
 from database.models import User, GameSession, Rating
 from repositories.base_repository import BaseRepository
 
@@ -46,8 +46,7 @@ class UserRepository(BaseRepository):
 
     def update_user(self, user: User) -> User:
         """Обновляет данные пользователя"""
-        self.db.commit()
-        self.db.refresh(user)
+        self.db.flush()
         return user
     
     def block_user(self, user_id: int, reason: str) -> bool:
@@ -56,7 +55,7 @@ class UserRepository(BaseRepository):
         if user:
             user.is_blocked = True
             user.block_reason = reason
-            self.db.commit()
+            self.db.flush()
             return True
         return False
 
@@ -66,7 +65,7 @@ class UserRepository(BaseRepository):
         if user:
             user.is_blocked = False
             user.block_reason = None
-            self.db.commit()
+            self.db.flush()
             return True
         return False
 
@@ -107,10 +106,12 @@ class UserRepository(BaseRepository):
 
     def get_active_today_count(self) -> int:
         """Возвращает количество активных пользователей за сегодня"""
-        today = datetime.now().date()
+        # Диапазон по started_at вместо date(started_at) - так работает индекс
+        today_start = datetime.combine(datetime.now().date(), datetime.min.time())
         return self.db.execute(
             select(func.count(func.distinct(GameSession.user_id)))
-            .where(func.date(GameSession.started_at) == today)
+            .where(GameSession.started_at >= today_start)
+            .where(GameSession.started_at < today_start + timedelta(days=1))
         ).scalar() or 0
     
     def get_users_since_count(self, since_date) -> int:
@@ -1,14 +1,27 @@
 import os
 import sys
+import asyncio
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
 # Добавляем корневую директорию в путь Python
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database.engine import Base
 from database.models import City, User, Game, GameSession, Rating
+from database.leaderboard_cache import leaderboard_cache
+from database.city_index import set_city_index
+
+
+@pytest.fixture(autouse=True)
+def clear_leaderboard_cache():
+    """Кэш топов и индекс городов общие для процесса - каждый тест начинает без них"""
+    leaderboard_cache.clear()
+    set_city_index(None)
+    yield
 
 
 @pytest.fixture(scope='function')
@@ -24,4 +37,78 @@ def test_db():
     
     yield session
     
-    session.close()
\ No newline at end of file
+    session.close()
+
+
+@pytest.fixture(scope='function')
+def async_db_factory():
+    """Фабрика асинхронных сессий для тестовой базы данных в памяти"""
+    # StaticPool - все сессии работают с одним соединением (одной БД в памяти)
+    engine = create_async_engine('sqlite+aiosqlite:///:memory:', poolclass=StaticPool)
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_tables())
+
+    yield async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    asyncio.run(engine.dispose())
+
+# Пользователи стенда хендлеров (telegram_id)
+PLAYER_TELEGRAM_ID = 1001
+ADMIN_TELEGRAM_ID = 9001
+
+
+def seed_handler_data(db):
+    """Начальные данные для хендлеров: игры, вопросы, города, игрок, админ и рейтинги"""
+    from database.initial_data import create_initial_games, create_initial_quiz_questions
+    from database.models import Admin
+    from repositories import UserRepository, GameRepository, GameSessionRepository
+
+    create_initial_games(db)
+    create_initial_quiz_questions(db)
+    db.add_all([
+        City(name="Москва", region=""), City(name="Архангельск", region="Архангельская"),
+        City(name="Калуга", region="Калужская"), City(name="Астрахань", region="Астраханская")
+    ])
+
+    user_repo = UserRepository(db)
+    users = [
+        user_repo.get_or_create_user(telegram_id, f"user{telegram_id}", f"User{telegram_id}")
+        for telegram_id in (PLAYER_TELEGRAM_ID, 1002, 1003, ADMIN_TELEGRAM_ID)
+    ]
+    admin = users[-1]
+    db.add(Admin(user_id=admin.id, added_by=admin.id))
+
+    session_repo = GameSessionRepository(db)
+    for game in GameRepository(db).get_all_games():
+        for score, user in enumerate(users, 1):
+            session = session_repo.create_session(user.id, game.id)
+            session_repo.complete_session(session.id, score * 10, 1)
+    db.commit()
+
+
+@pytest.fixture(scope='session')
+def handler_harness():
+    """Все роутеры бота поверх заполненной тестовой БД в памяти"""
+    from app.handlers import all_routers
+    from tests.handler_harness import HandlerHarness
+
+    engine = create_async_engine('sqlite+aiosqlite:///:memory:', poolclass=StaticPool)
+    session_factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    harness = HandlerHarness(all_routers, session_factory)
+
+    async def prepare():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_factory() as db:
+            await db.run_sync(seed_handler_data)
+
+    harness.run(prepare())
+
+    yield harness
+
+    harness.run(engine.dispose())
+    harness.close()
@@ -0,0 +1,152 @@
+"""
+Стенд для прогона хендлеров через Dispatcher без Telegram.
+
+Update подается в диспетчер с теми же middleware, что и в боте, поверх
+тестовой БД в памяти, а запросы к Bot API перехватывает фальшивая сессия.
+Для каждого update считаются SQL запросы и commit - так тесты ловят
+N+1 и лишние транзакции в хендлерах.
+"""
+import asyncio
+import itertools
+import typing
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+from sqlalchemy import event
+
+from app.middlewares.admin import AdminMiddleware
+from app.middlewares.database import DatabaseMiddleware
+
+BOT_ID = 42
+
+
+class FakeBotSession(BaseSession):
+    """Сессия Bot API, которая ничего не отправляет, а только запоминает вызовы"""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+        self._message_ids = itertools.count(1000)
+
+    async def make_request(self, bot, method, timeout=None):
+        self.requests.append(method)
+        returning = method.__returning__
+        if returning is Message or Message in typing.get_args(returning):
+            chat_id = getattr(method, 'chat_id', None) or 0
+            return Message(
+                message_id=next(self._message_ids),
+                date=datetime.now(),
+                chat=Chat(id=chat_id, type='private'),
+                from_user=User(id=BOT_ID, is_bot=True, first_name="Bot"),
+                text=getattr(method, 'text', None)
+            ).as_(bot)
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        raise NotImplementedError
+        yield b''
+
+    async def close(self):
+        pass
+
+
+@dataclass
+class QueryCount:
+    """SQL запросы и commit, выполненные при обработке одного update"""
+    statements: list = field(default_factory=list)
+    commits: int = 0
+
+    def assert_within(self, max_statements: int, max_commits: int = 1):
+        """Проверяет, что update уложился в бюджет запросов"""
+        listing = '\n'.join(f"  {' '.join(statement.split())}" for statement in self.statements)
+        assert len(self.statements) <= max_statements, (
+            f"{len(self.statements)} SQL запросов при бюджете {max_statements}:\n{listing}"
+        )
+        assert self.commits <= max_commits, f"{self.commits} commit при бюджете {max_commits}"
+
+
+class HandlerHarness:
+    """Диспетчер с роутерами бота, фальшивым Bot API и счетчиком запросов"""
+
+    def __init__(self, routers, session_factory):
+        self.dispatcher = Dispatcher()
+        self.dispatcher.update.outer_middleware(DatabaseMiddleware(session_factory))
+        self.dispatcher.message.middleware(AdminMiddleware())
+        for router in routers:
+            self.dispatcher.include_router(router)
+
+        self.bot = Bot("123456:TEST-TOKEN", session=FakeBotSession())
+        self.loop = asyncio.new_event_loop()
+        self._update_ids = itertools.count(1)
+        self._count: QueryCount = None
+
+        sync_engine = session_factory.kw['bind'].sync_engine
+        event.listen(sync_engine, 'before_cursor_execute', self._on_statement)
+        event.listen(sync_engine, 'commit', self._on_commit)
+
+    def _on_statement(self, conn, cursor, statement, parameters, context, executemany):
+        if self._count is not None:
+            self._count.statements.append(statement)
+
+    def _on_commit(self, conn):
+        if self._count is not None:
+            self._count.commits += 1
+
+    def run(self, coroutine):
+        """Выполняет корутину в event loop стенда"""
+        return self.loop.run_until_complete(coroutine)
+
+    def feed(self, update: Update) -> QueryCount:
+        """Обрабатывает update и возвращает число запросов к БД"""
+        self._count = QueryCount()
+        try:
+            self.run(self.dispatcher.feed_update(self.bot, update))
+            return self._count
+        finally:
+            self._count = None
+
+    def _user(self, telegram_id: int) -> User:
+        return User(id=telegram_id, is_bot=False, first_name=f"User{telegram_id}", username=f"user{telegram_id}")
+
+    def send_message(self, telegram_id: int, text: str) -> QueryCount:
+        """Сообщение пользователя в личном чате с ботом"""
+        message = Message(
+            message_id=next(self._update_ids),
+            date=datetime.now(),
+            chat=Chat(id=telegram_id, type='private'),
+            from_user=self._user(telegram_id),
+            text=text
+        )
+        return self.feed(Update(update_id=next(self._update_ids), message=message))
+
+    def send_callback(self, telegram_id: int, data: str) -> QueryCount:
+        """Нажатие inline-кнопки под последним сообщением бота"""
+        message = Message(
+            message_id=next(self._update_ids),
+            date=datetime.now(),
+            chat=Chat(id=telegram_id, type='private'),
+            from_user=User(id=BOT_ID, is_bot=True, first_name="Bot"),
+            text="..."
+        )
+        callback = CallbackQuery(
+            id=str(next(self._update_ids)),
+            from_user=self._user(telegram_id),
+            chat_instance="test",
+            message=message,
+            data=data
+        )
+        return self.feed(Update(update_id=next(self._update_ids), callback_query=callback))
+
+    def close(self):
+        """Отменяет фоновые задачи хендлеров (таймеры викторины) и закрывает loop"""
+        async def cancel_pending():
+            pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        self.run(cancel_pending())
+        self.loop.close()
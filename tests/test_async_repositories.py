@@ -0,0 +1,128 @@
+import asyncio
+from repositories.aio import (
+    AsyncUserRepository, AsyncGameRepository, AsyncGameSessionRepository, AsyncRatingRepository
+)
+from database.models import Game
+from database.rank_index import game_rank_indexes, rank_index
+from repositories.rating_repository import RatingRepository
+
+
+class TestAsyncRepositories:
+    """Тесты для асинхронных репозиториев"""
+
+    def test_get_or_create_user(self, async_db_factory):
+        """Тест создания и поиска пользователя через AsyncSession"""
+        async def scenario():
+            async with async_db_factory() as db:
+                user_repo = AsyncUserRepository(db)
+
+                created_user = await user_repo.get_or_create_user(12345, "test_user", "Test")
+                found_user = await user_repo.get_user_by_telegram_id(12345)
+
+                return created_user, found_user
+
+        created_user, found_user = asyncio.run(scenario())
+
+        assert found_user is not None
+        assert found_user.id == created_user.id
+        # Атрибуты доступны после закрытия сессии (expire_on_commit=False)
+        assert created_user.first_name == "Test"
+
+    def test_complete_session_updates_rating(self, async_db_factory):
+        """Тест завершения сессии и обновления рейтинга"""
+        async def scenario():
+            async with async_db_factory() as db:
+                user = await AsyncUserRepository(db).get_or_create_user(12345, "test_user", "Test")
+                game = await AsyncGameRepository(db).save(Game(name="Test Game", code="test"))
+
+                session_repo = AsyncGameSessionRepository(db)
+                session = await session_repo.create_session(user.id, game.id)
+                await session_repo.complete_session(session.id, 50, 3)
+
+                rating_repo = AsyncRatingRepository(db)
+                return await rating_repo.get_user_ratings(user.id), await rating_repo.get_user_global_rank(user.id)
+
+        ratings, rank = asyncio.run(scenario())
+
+        assert len(ratings) == 1
+        rating, game = ratings[0]
+        assert rating.total_score == 50
+        assert rating.games_played == 1
+        assert game.code == "test"
+        assert rank == 1
+
+    def test_leaderboard_around_uses_rank_indexes(self, async_db_factory):
+        """Тест что место в окне топа из индексов в памяти совпадает с подсчетом в БД"""
+        async def scenario():
+            async with async_db_factory() as db:
+                user_repo = AsyncUserRepository(db)
+                users = [await user_repo.get_or_create_user(telegram_id, f"user{telegram_id}", "Test") for telegram_id in range(1, 9)]
+                game = await AsyncGameRepository(db).save(Game(name="Test Game", code="test"))
+                rating_repo = AsyncRatingRepository(db)
+                for number, user in enumerate(users):
+                    await rating_repo.update_rating(user.id, game.id, (number % 3) * 10)
+                await db.commit()
+
+                windows = []
+                for game_id in (None, game.id):
+                    windows.append(await rating_repo.get_leaderboard_around(users[4].id, game_id, 2))
+                await db.run_sync(lambda sync_db: (rank_index.load(sync_db), game_rank_indexes.load(sync_db)))
+                try:
+                    for game_id in (None, game.id):
+                        windows.append(await rating_repo.get_leaderboard_around(users[4].id, game_id, 2))
+                finally:
+                    rank_index.clear()
+                    game_rank_indexes.clear()
+                return windows
+
+        windows = asyncio.run(scenario())
+
+        places = [(first_place, [user.id for user, _, _ in rows]) for first_place, rows in windows]
+        assert places[0] == places[1] == places[2] == places[3]
+        assert places[0][0] == 2
+
+    def test_leaderboard_around_falls_back_to_sql(self, async_db_factory, monkeypatch):
+        """Тест что при устаревшем индексе или окне без игрока место считается в БД, а не падает"""
+        original = RatingRepository.get_leaderboard_around
+
+        def sql_window(user_id):
+            return lambda sync_db: original(RatingRepository(sync_db), user_id, None, 2)
+
+        async def scenario():
+            async with async_db_factory() as db:
+                user_repo = AsyncUserRepository(db)
+                users = [await user_repo.get_or_create_user(telegram_id, f"user{telegram_id}", "Test") for telegram_id in range(1, 6)]
+                game = await AsyncGameRepository(db).save(Game(name="Test Game", code="test"))
+                rating_repo = AsyncRatingRepository(db)
+                for number, user in enumerate(users[:4]):
+                    await rating_repo.update_rating(user.id, game.id, number * 10)
+                await db.commit()
+                await db.run_sync(rank_index.load)
+                try:
+                    # Игрок уже есть в БД, но до индекса его очки еще не дошли (нет commit)
+                    await rating_repo.update_rating(users[4].id, game.id, 5)
+                    await db.flush()
+                    late = await rating_repo.get_leaderboard_around(users[4].id, None, 2)
+                    late_expected = await db.run_sync(sql_window(users[4].id))
+
+                    # Окно прочитано без самого игрока (его строку сдвинул чужой commit)
+                    def without_caller(self, user_id, game_id=None, radius=5, with_place=True):
+                        place, rows = original(self, user_id, game_id, radius, with_place)
+                        if with_place:
+                            return place, rows
+                        return place, [row for row in rows if row[0].id != user_id]
+
+                    monkeypatch.setattr(RatingRepository, 'get_leaderboard_around', without_caller)
+                    moved = await rating_repo.get_leaderboard_around(users[1].id, None, 2)
+                    moved_expected = await db.run_sync(sql_window(users[1].id))
+                finally:
+                    rank_index.clear()
+                return late, late_expected, moved, moved_expected
+
+        late, late_expected, moved, moved_expected = asyncio.run(scenario())
+
+        def ids(window):
+            return window[0], [user.id for user, _, _ in window[1]]
+
+        assert late[0] is not None and ids(late) == ids(late_expected)
+        assert moved[0] is not None and ids(moved) == ids(moved_expected)
@@ -0,0 +1,235 @@
+import json
+import pickle
+import random
+from collections import Counter
+import pytest
+from app.handlers.games.cities import CitiesGame
+from database.city_index import AliasSampler, CityIndex, get_game_letter, is_used, mark_used, normalize_city_key
+from database.city_strategy import choose_bot_city, replies_left
+from database.fuzzy_index import FuzzyIndex, edit_distance
+from database.models import City
+from repositories import CityRepository
+
+
+class TestCityIndex:
+    """Тесты для индекса городов в памяти"""
+
+    def create_index(self, test_db):
+        """Создает города и строит индекс по таблице"""
+        test_db.add_all([
+            City(name="Москва"), City(name="Архангельск"), City(name="Калуга"),
+            City(name="Анадырь"), City(name="Рыбинск"), City(name="Астрахань")
+        ])
+        test_db.flush()
+        return CityRepository(test_db).build_city_index()
+
+    def test_find_and_letters(self, test_db):
+        """Тест поиска без учета регистра и заранее посчитанных букв"""
+        index = self.create_index(test_db)
+
+        city_id = index.find("  анадырь ")
+        assert index.name(city_id) == "Анадырь"
+        assert index.first_letter(city_id) == "А"
+        assert index.game_letter(city_id) == get_game_letter("Анадырь") == "Р"
+        assert index.find("Атлантида") is None
+        assert len(index) == 6
+
+    def test_first_unused(self, test_db):
+        """Тест что бот берет первый неиспользованный город на букву, как прежний запрос по id"""
+        index = self.create_index(test_db)
+        arkhangelsk, anadyr, astrakhan = (index.find(name) for name in ("Архангельск", "Анадырь", "Астрахань"))
+
+        used_ids = []
+        assert mark_used(used_ids, arkhangelsk) and not mark_used(used_ids, arkhangelsk)
+        assert index.first_unused("А", []) == arkhangelsk
+        assert index.first_unused("А", used_ids) == anadyr
+        assert is_used(used_ids, arkhangelsk) and not is_used(used_ids, anadyr)
+
+        mark_used(used_ids, astrakhan)
+        mark_used(used_ids, anadyr)
+        assert used_ids == sorted(used_ids)
+        assert index.first_unused("А", used_ids) is None
+        assert index.first_unused("Я", []) is None
+
+    def test_game_state_round_trip(self, test_db):
+        """Тест что состояние партии - небольшой словарь чисел, который восстанавливается без потерь"""
+        index = self.create_index(test_db)
+        game = CitiesGame(user_id=7)
+        for name in ("Москва", "Архангельск", "Калуга"):
+            game.set_current_city(index, index.find(name))
+        game.increment_user_score()
+        game.increment_bot_score()
+
+        state = game.to_state()
+        assert json.loads(json.dumps(state)) == state
+        assert len(pickle.dumps(state)) < 300
+
+        restored = CitiesGame.from_state(state)
+        assert restored.to_state() == state
+        assert index.name(restored.current_city_id) == "Калуга"
+        assert restored.is_city_used(index.find("Москва"))
+        assert not restored.is_city_used(index.find("Рыбинск"))
+
+    def test_game_state_size_independent_of_index(self):
+        """Тест что размер состояния зависит от числа ходов, а не от id городов в большом индексе"""
+        names = ["Москва", "Архангельск", "Калуга"] + [f"Город{number}" for number in range(1000)]
+        index = CityIndex(enumerate(names, start=1_000_000))
+        game = CitiesGame(user_id=7)
+        for name in ("Калуга", "Архангельск", "Москва"):
+            game.set_current_city(index, index.find(name))
+        game.set_current_city(index, index.find("Город999"))
+
+        assert game.used_ids == sorted(game.used_ids)
+        assert len(pickle.dumps(game.to_state())) < 300
+
+    def test_immutable(self, test_db):
+        """Тест что индекс нельзя изменить после построения"""
+        index = self.create_index(test_db)
+
+        with pytest.raises(AttributeError):
+            index._names = {}
+        with pytest.raises(TypeError):
+            index._ids_by_key["новгород"] = 1
+
+    def test_empty_index(self):
+        """Тест индекса без городов"""
+        index = CityIndex([])
+
+        assert index.random_city() is None
+        assert index.find("Москва") is None
+
+    def test_alias_sampler(self):
+        """Тест что таблица псевдонимов выбирает значения пропорционально весам"""
+        sampler = AliasSampler(["a", "b", "c"], [1, 2, 7])
+        random_generator = random.Random(1)
+
+        counts = Counter(sampler.sample(random_generator) for _ in range(30000))
+        assert abs(counts["a"] / 30000 - 0.1) < 0.02
+        assert abs(counts["b"] / 30000 - 0.2) < 0.02
+        assert abs(counts["c"] / 30000 - 0.7) < 0.02
+        assert AliasSampler([], []).sample() is None
+
+    def test_start_city(self):
+        """Тест что старт не дает букву с малым числом ответов, а население повышает шанс города"""
+        cities = [
+            (1, "Москва", 12000000), (2, "Анапа", 80000), (3, "Алупка", 80000),
+            (4, "Аша", 20000), (5, "Елабуга", None), (6, "Елец", 100000)
+        ]
+        random_generator = random.Random(1)
+
+        # После Ельца нужен город на «Ц» - таких нет, поэтому Елец не стартует
+        index = CityIndex(cities, weight_by_population=True, start_min_replies=2)
+        starts = Counter(index.random_city(random_generator) for _ in range(20000))
+        assert set(starts) == {1, 2, 3, 4, 5}
+        assert starts[1] > starts[2] > starts[4]
+        assert abs(starts[2] - starts[3]) < 300
+
+        # Без весов - равновероятно; если сильных букв нет, стартует любой город
+        index = CityIndex(cities, start_min_replies=2)
+        starts = Counter(index.random_city(random_generator) for _ in range(20000))
+        assert all(abs(count / 20000 - 0.2) < 0.02 for count in starts.values())
+        index = CityIndex(cities, start_min_replies=100)
+        assert len({index.random_city(random_generator) for _ in range(2000)}) == 6
+
+    def test_repository_start_city(self, test_db):
+        """Тест что стартовый город из репозитория берется по индексу и первичному ключу"""
+        self.create_index(test_db)
+
+        city = CityRepository(test_db).get_random_start_city()
+        assert isinstance(city, City)
+        assert city.name in ("Москва", "Архангельск", "Калуга", "Анадырь", "Рыбинск", "Астрахань")
+
+
+class TestCityStrategy:
+    """Тесты для выбора города ботом по уровню"""
+
+    def create_index(self):
+        """Индекс без БД: на «А» - три города с разным числом ответов игрока"""
+        return CityIndex(enumerate([
+            "Архангельск", "Анадырь", "Астрахань", "Калуга", "Кострома", "Рыбинск", "Москва"
+        ], start=1))
+
+    def test_levels(self):
+        """Тест что hard оставляет игроку меньше всего ответов, easy - больше всего"""
+        index = self.create_index()
+        remaining = index.letter_counts()
+        arkhangelsk, anadyr, astrakhan = (index.find(name) for name in ("Архангельск", "Анадырь", "Астрахань"))
+
+        # После Архангельска игроку остаются 2 города на «К», после Анадыря - 1 на «Р», после Астрахани - ни одного
+        assert [replies_left(index, city_id, remaining) for city_id in (arkhangelsk, anadyr, astrakhan)] == [2, 1, 0]
+        assert choose_bot_city(index, "А", [], remaining, 'hard') == astrakhan
+        assert choose_bot_city(index, "А", [], remaining, 'easy') == arkhangelsk
+        assert choose_bot_city(index, "А", [], remaining, 'normal', random.Random(1)) in (arkhangelsk, anadyr, astrakhan)
+
+        assert choose_bot_city(index, "А", sorted([arkhangelsk, anadyr, astrakhan]), remaining, 'hard') is None
+
+    def test_counts_follow_moves(self):
+        """Тест что счетчики игры обновляются ходами так же, как пересчет по использованным городам"""
+        index = self.create_index()
+        game = CitiesGame(user_id=1, level='hard')
+        for name in ("Москва", "Астрахань", "Рыбинск"):
+            game.set_current_city(index, index.find(name))
+
+        assert game.remaining == index.letter_counts(game.used_ids)
+        assert game.remaining[index.letter_position("А")] == 2
+        # Рыбинск использован: после Анадыря игроку нечего ответить на «Р»
+        assert game.choose_bot_city(index, "А") == index.find("Анадырь")
+
+        # Состояние без счетчиков (сохраненное до уровней) пересчитывается по использованным городам
+        state = game.to_state()
+        del state['remaining'], state['level']
+        restored = CitiesGame.from_state(state)
+        restored.set_current_city(index, index.find("Анадырь"))
+        assert restored.remaining == index.letter_counts(restored.used_ids)
+
+
+class TestCityLookup:
+    """Тесты для нормализации и неточного поиска городов"""
+
+    def create_index(self):
+        return CityIndex(enumerate([
+            "Ростов-на-Дону", "Орёл", "Москва", "Тула", "Тулун", "Омск"
+        ], start=1))
+
+    def test_normalization(self):
+        """Тест что регистр, ё/е, дефисы и лишние пробелы не мешают точному совпадению"""
+        index = self.create_index()
+
+        assert normalize_city_key("  Ростов  на-Дону ") == normalize_city_key("ростов–на–дону") == "ростов на дону"
+        assert index.find("Ростов на Дону") == index.find("РОСТОВ-НА-ДОНУ") == 1
+        assert index.find("Орел") == index.find("орёл") == 2
+
+    def test_typos(self):
+        """Тест что одна опечатка (замена, пропуск, лишняя буква, перестановка) находит город"""
+        index = self.create_index()
+
+        for typo in ("Масква", "Мсква", "Москвва", "Моксва", "Ростов на Дон"):
+            assert len(index.lookup(typo)) == 1, typo
+        assert index.lookup("Моксва") == [3]
+        # Две опечатки и короткие названия неточно не ищутся
+        assert index.lookup("Маскба") == []
+        assert index.lookup("Омк") == []
+        # Одинаково близкие города возвращаются все
+        assert index.lookup("Тулу") == [4, 5]
+
+    def test_edit_distance(self):
+        """Тест ограниченного расстояния Дамерау-Левенштейна"""
+        assert edit_distance("москва", "москва", 1) == 0
+        assert edit_distance("москва", "моксва", 1) == 1
+        assert edit_distance("abc", "acd", 1) == 2
+        assert edit_distance("тула", "тулун", 2) == 2
+        assert edit_distance("a", "abcdef", 2) == 3
+
+    def test_fuzzy_index_matches_brute_force(self):
+        """Тест что словарь удалений находит те же ключи, что перебор всех ключей"""
+        random_generator = random.Random(1)
+        alphabet = "абвгдеклмнор"
+        keys = list({"".join(random_generator.choice(alphabet) for _ in range(random_generator.randint(4, 8))) for _ in range(300)})
+        fuzzy = FuzzyIndex(((key, value) for value, key in enumerate(keys)), max_distance=1)
+
+        for _ in range(200):
+            query = "".join(random_generator.choice(alphabet) for _ in range(random_generator.randint(4, 8)))
+            distances = {value: edit_distance(query, key, 1) for value, key in enumerate(keys)}
+            best = min(distances.values())
+            expected = sorted(value for value, distance in distances.items() if distance == best) if best <= 1 else []
+            assert fuzzy.lookup(query)[0] == expected
@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from sqlalchemy import event
+
+from app.middlewares.database import DatabaseMiddleware
+from repositories.aio import AsyncUserRepository
+
+
+class TestDatabaseMiddleware:
+    """Тесты для middleware "одна сессия БД на update\""""
+
+    def count_commits(self, async_db_factory) -> list:
+        """Подписывается на COMMIT тестового движка"""
+        commits = []
+        sync_engine = async_db_factory.kw['bind'].sync_engine
+        event.listen(sync_engine, 'commit', lambda connection: commits.append(connection))
+        return commits
+
+    def test_single_commit_per_update(self, async_db_factory):
+        """Тест что все записи хендлера фиксируются одним commit"""
+        commits = self.count_commits(async_db_factory)
+        middleware = DatabaseMiddleware(session_factory=async_db_factory)
+
+        async def handler(event, data):
+            user_repo = AsyncUserRepository(data['db'])
+            await user_repo.get_or_create_user(11111, "user1", "User1")
+            await user_repo.get_or_create_user(22222, "user2", "User2")
+            return "ok"
+
+        async def scenario():
+            result = await middleware(handler, object(), {})
+            async with async_db_factory() as db:
+                return result, await AsyncUserRepository(db).get_total_users_count()
+
+        result, users_count = asyncio.run(scenario())
+
+        assert result == "ok"
+        assert users_count == 2
+        assert len(commits) == 1
+
+    def test_rollback_on_error(self, async_db_factory):
+        """Тест что при ошибке в хендлере изменения откатываются"""
+        commits = self.count_commits(async_db_factory)
+        middleware = DatabaseMiddleware(session_factory=async_db_factory)
+
+        async def handler(event, data):
+            await AsyncUserRepository(data['db']).get_or_create_user(11111, "user1", "User1")
+            raise RuntimeError("Ошибка в хендлере")
+
+        async def scenario():
+            with pytest.raises(RuntimeError):
+                await middleware(handler, object(), {})
+            async with async_db_factory() as db:
+                return await AsyncUserRepository(db).get_total_users_count()
+
+        assert asyncio.run(scenario()) == 0
+        assert len(commits) == 0
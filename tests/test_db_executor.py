@@ -0,0 +1,105 @@
+import asyncio
+import threading
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database.engine import Base
+from database.executor import DBExecutor
+from repositories.aio import AsyncUserRepository
+
+
+def create_executor(max_workers: int) -> DBExecutor:
+    """Создает пул потоков поверх тестовой БД в памяти"""
+    engine = create_engine(
+        'sqlite:///:memory:',
+        poolclass=StaticPool,
+        connect_args={'check_same_thread': False}
+    )
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    return DBExecutor(session_factory, max_workers=max_workers)
+
+
+class TestDBExecutor:
+    """Тесты для пула потоков БД"""
+
+    def test_repository_runs_in_worker_thread(self):
+        """Тест что запросы выполняются в потоке воркера, а не в event loop"""
+        executor = create_executor(max_workers=2)
+
+        async def scenario():
+            async with executor.session() as db:
+                user = await AsyncUserRepository(db).get_or_create_user(12345, "test_user", "Test")
+                thread_name = await db.run_sync(lambda sync_db: threading.current_thread().name)
+                return user, thread_name
+
+        try:
+            user, thread_name = asyncio.run(scenario())
+        finally:
+            executor.shutdown()
+
+        assert user.telegram_id == 12345
+        assert thread_name.startswith("db-worker-")
+        assert executor.stats()['busy_workers'] == 0
+
+    def test_worker_is_released_between_reads(self):
+        """Тест что между запросами без записи сессия не держит воркера"""
+        executor = create_executor(max_workers=1)
+
+        async def slow_handler():
+            async with executor.session() as db:
+                await AsyncUserRepository(db).get_user_by_telegram_id(1)
+                # Хендлер ждет ответа Telegram - воркер в это время свободен
+                await asyncio.sleep(0.05)
+                await AsyncUserRepository(db).get_user_by_telegram_id(1)
+
+        async def fast_handler():
+            await asyncio.sleep(0.01)
+            async with executor.session() as db:
+                await AsyncUserRepository(db).get_user_by_telegram_id(2)
+
+        async def scenario():
+            await asyncio.gather(slow_handler(), fast_handler())
+
+        try:
+            asyncio.run(scenario())
+        finally:
+            executor.shutdown()
+
+        stats = executor.stats()
+        assert stats['max_wait_ms'] < 40
+        assert stats['busy_workers'] == 0
+
+    def test_open_write_keeps_worker(self):
+        """Тест что сессия с открытой записью держит воркера до commit, а остальные ждут"""
+        executor = create_executor(max_workers=1)
+        thread_names = []
+
+        async def writer():
+            async with executor.session() as db:
+                await AsyncUserRepository(db).get_or_create_user(12345, "test_user", "Test")
+                thread_names.append(await db.run_sync(lambda sync_db: threading.current_thread().name))
+                await asyncio.sleep(0.05)
+                thread_names.append(await db.run_sync(lambda sync_db: threading.current_thread().name))
+                await db.commit()
+
+        async def reader():
+            await asyncio.sleep(0.01)
+            async with executor.session() as db:
+                return await AsyncUserRepository(db).get_user_by_telegram_id(12345)
+
+        async def scenario():
+            return (await asyncio.gather(writer(), reader()))[1]
+
+        try:
+            user = asyncio.run(scenario())
+        finally:
+            executor.shutdown()
+
+        stats = executor.stats()
+        assert user is not None
+        assert thread_names[0] == thread_names[1]
+        assert stats['queue_depth'] == 0
+        assert stats['busy_workers'] == 0
+        assert stats['max_wait_ms'] >= 30
@@ -0,0 +1,97 @@
+from datetime import datetime
+from sqlalchemy import select, event
+from database.models import Game, Rating
+from repositories import UserRepository, GameSessionRepository
+
+
+class TestGameSessionRepository:
+    """Тесты для GameSessionRepository"""
+
+    def create_user_and_game(self, test_db):
+        """Создает пользователя и игру для сессий"""
+        user = UserRepository(test_db).get_or_create_user(12345, "test_user", "Test")
+        game = Game(name="Test Game", code="test")
+        test_db.add(game)
+        test_db.flush()
+        return user, game
+
+    def test_complete_session_upserts_rating(self, test_db):
+        """Тест что повторные игры накапливаются в одной строке рейтинга"""
+        user, game = self.create_user_and_game(test_db)
+        session_repo = GameSessionRepository(test_db)
+
+        for score in (30, 50, 10, 0):
+            session = session_repo.create_session(user.id, game.id)
+            session_repo.complete_session(session.id, score, 1)
+
+        ratings = test_db.execute(select(Rating)).scalars().all()
+
+        assert len(ratings) == 1
+        assert ratings[0].total_score == 90
+        assert ratings[0].games_played == 4
+        assert ratings[0].best_score == 50
+        assert ratings[0].average_score == 22.5
+
+    def test_complete_session_twice_counts_once(self, test_db):
+        """Тест что уже завершенная сессия не засчитывается повторно"""
+        user, game = self.create_user_and_game(test_db)
+        session_repo = GameSessionRepository(test_db)
+        session = session_repo.create_session(user.id, game.id)
+
+        first = session_repo.complete_session(session.id, 40, 2)
+        second = session_repo.complete_session(session.id, 40, 2)
+
+        assert first is not None and first.completed is True
+        assert second is None
+        assert session_repo.get_user_best_score(user.id, game.id) == 40
+
+    def test_complete_session_without_select(self, test_db):
+        """Тест что завершение - это UPDATE и upsert гистограммы, рейтинга, итогов, счетчиков игрока и очков за периоды, без чтения строк"""
+        user, game = self.create_user_and_game(test_db)
+        session_repo = GameSessionRepository(test_db)
+        session = session_repo.create_session(user.id, game.id)
+
+        statements = []
+        event.listen(test_db.get_bind(), 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement.strip()))
+        session_repo.complete_session(session.id, 10, 1)
+
+        assert len(statements) == 7
+        assert statements[0].startswith('UPDATE game_sessions')
+        assert statements[1].startswith('INSERT INTO score_histograms')
+        assert statements[2].startswith('INSERT INTO ratings')
+        assert statements[3].startswith('INSERT INTO user_totals')
+        assert statements[4].startswith('INSERT INTO user_activity')
+        assert statements[5].startswith('INSERT INTO user_game_activity')
+        assert statements[6].startswith('INSERT INTO period_scores')
+        assert 'ON CONFLICT' in statements[2]
+
+    def test_activity_counters(self, test_db):
+        """Тест что счетчики игрока совпадают с его сессиями, включая незавершенные и ленивый режим"""
+        user, game = self.create_user_and_game(test_db)
+        session_repo = GameSessionRepository(test_db)
+
+        for score, attempts in ((30, 3), (50, 5)):
+            session = session_repo.create_session(user.id, game.id)
+            session_repo.complete_session(session.id, score, attempts)
+        session_repo.create_session(user.id, game.id)  # Брошенная игра
+        session_repo.record_completed_session(user.id, game.id, datetime.utcnow(), 10, 4)
+
+        activity = session_repo.get_user_activity(user.id)
+        assert (activity.sessions, activity.completed, activity.score_sum, activity.best_score, activity.attempts_sum) == (4, 3, 90, 50, 12)
+
+        [(counters, counters_game)] = session_repo.get_user_game_activity(user.id)
+        assert counters_game.id == game.id
+        assert (counters.sessions, counters.completed, counters.score_sum, counters.best_score, counters.attempts_sum) == (4, 3, 90, 50, 12)
+
+    def test_most_active_users(self, test_db):
+        """Тест что самые активные пользователи берутся из счетчиков сессий"""
+        user, game = self.create_user_and_game(test_db)
+        other = UserRepository(test_db).get_or_create_user(54321, "other", "Other")
+        session_repo = GameSessionRepository(test_db)
+        for _ in range(3):
+            session_repo.create_session(other.id, game.id)
+        session_repo.create_session(user.id, game.id)
+
+        assert [(top_user.id, game_count) for top_user, game_count in session_repo.get_most_active_users()] == [(other.id, 3), (user.id, 1)]
+        assert session_repo.get_user_activity(12345678) is None
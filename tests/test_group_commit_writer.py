@@ -0,0 +1,118 @@
+import asyncio
+from sqlalchemy import create_engine, select, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database.engine import Base
+from database.models import Game, GameSession, User
+from database.writer import GroupCommitWriter
+from repositories import GameSessionRepository
+
+
+def create_writer(max_batch: int = 64) -> tuple[GroupCommitWriter, sessionmaker]:
+    """Создает group commit поверх тестовой БД в памяти с пользователем и игрой"""
+    engine = create_engine(
+        'sqlite:///:memory:',
+        poolclass=StaticPool,
+        connect_args={'check_same_thread': False}
+    )
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    with session_factory() as db:
+        db.add_all([User(telegram_id=1, first_name="Test"), Game(name="Test Game", code="test")])
+        db.commit()
+
+    return GroupCommitWriter(session_factory, max_batch=max_batch, max_delay=0.01), session_factory
+
+
+class TestGroupCommitWriter:
+    """Тесты для group commit записей"""
+
+    def test_concurrent_writes_share_commits(self):
+        """Тест что параллельные записи фиксируются пачками"""
+        writer, session_factory = create_writer(max_batch=16)
+
+        async def scenario():
+            await writer.start()
+            sessions = await asyncio.gather(*[
+                writer.submit(GameSessionRepository, 'create_session', 1, 1)
+                for _ in range(40)
+            ])
+            await writer.stop()
+            return sessions
+
+        sessions = asyncio.run(scenario())
+
+        assert len({session.id for session in sessions}) == 40
+        assert writer.items == 40
+        assert writer.batches < 40
+        assert writer.max_batch_size <= 16
+        with session_factory() as db:
+            assert db.execute(select(func.count(GameSession.id))).scalar() == 40
+
+    def test_failed_write_does_not_break_batch(self):
+        """Тест что ошибка одной записи достается только ее вызывающему"""
+        writer, session_factory = create_writer()
+
+        async def scenario():
+            await writer.start()
+            results = await asyncio.gather(
+                writer.submit(GameSessionRepository, 'create_session', 1, 1),
+                writer.submit(GameSessionRepository, 'no_such_method'),
+                writer.submit(GameSessionRepository, 'create_session', 1, 1),
+                return_exceptions=True
+            )
+            await writer.stop()
+            return results
+
+        first, failed, last = asyncio.run(scenario())
+
+        assert isinstance(failed, AttributeError)
+        assert first.id is not None and last.id is not None
+        assert writer.failed_batches == 1
+        with session_factory() as db:
+            assert db.execute(select(func.count(GameSession.id))).scalar() == 2
+
+    def test_session_errors_reach_callers(self):
+        """Тест что ошибка открытия сессии или commit достается вызывающим, а запись продолжает работать"""
+        writer, session_factory = create_writer()
+        failures = {'factory': 1, 'commit': 1}
+
+        def flaky_factory():
+            if failures['factory']:
+                failures['factory'] -= 1
+                raise OSError("disk I/O error")
+            db = session_factory()
+            if failures['commit']:
+                failures['commit'] -= 1
+
+                def broken(*args, **kwargs):
+                    raise OSError("disk I/O error")
+                db.commit = broken
+                db.rollback = broken  # rollback тоже падает - пачка не разбирается по записям
+            return db
+
+        writer.session_factory = flaky_factory
+
+        async def scenario():
+            await writer.start()
+            factory_error = await asyncio.gather(
+                writer.submit(GameSessionRepository, 'create_session', 1, 1), return_exceptions=True
+            )
+            commit_errors = await asyncio.gather(
+                writer.submit(GameSessionRepository, 'create_session', 1, 1),
+                writer.submit(GameSessionRepository, 'create_session', 1, 1),
+                return_exceptions=True
+            )
+            session = await writer.submit(GameSessionRepository, 'create_session', 1, 1)
+            await writer.stop()
+            return factory_error + commit_errors, session
+
+        # Без обработки ошибки задача записи падает и вызывающие ждут вечно - ограничиваем время
+        errors, session = asyncio.run(asyncio.wait_for(scenario(), 10))
+
+        assert all(isinstance(error, OSError) for error in errors)
+        assert session.id is not None
+        with session_factory() as db:
+            assert db.execute(select(func.count(GameSession.id))).scalar() == 1
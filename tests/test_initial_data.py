@@ -68,53 +68,49 @@ class TestInitialData:
         
         assert initial_count == final_count
     
-    def test_cities_creation_with_mock_data(self, test_db):
-        """Тест создания городов с мок-данными"""
+    def test_cities_creation_with_mock_data(self, test_db, tmp_path):
+        """Тест создания городов с мок-данными (во временном CSV, data/cities.csv не трогается)"""
         test_cities_data = [
-            {"Тип региона": "обл", "Регион": "", "Тип города": "г", "Город": "Москва"},
-            {"Тип региона": "г", "Регион": "Санкт-Петербург", "Тип города": "", "Город": ""},
-            {"Тип региона": "обл", "Регион": "Ленинградская", "Тип города": "г", "Город": "Выборг"},
+            {"Тип региона": "обл", "Регион": "", "Тип города": "г", "Город": "Москва", "Население": "12330126"},
+            {"Тип региона": "г", "Регион": "Санкт-Петербург", "Тип города": "", "Город": "", "Население": "96[3]"},
+            {"Тип региона": "обл", "Регион": "Ленинградская", "Тип города": "г", "Город": "Выборг", "Население": ""},
         ]
         
         import csv
-        import tempfile
-        import os
         
-        with tempfile.NamedTemporaryFile(mode='w', encoding='utf-8', suffix='.csv', delete=False) as f:
-            writer = csv.DictWriter(f, fieldnames=["Тип региона", "Регион", "Тип города", "Город"])
+        csv_path = tmp_path / "cities.csv"
+        with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=["Тип региона", "Регион", "Тип города", "Город", "Население"])
             writer.writeheader()
             writer.writerows(test_cities_data)
-            temp_file = f.name
-        
-        try:
-            original_path = './data/cities.csv'
-            if not os.path.exists('./data'):
-                os.makedirs('./data')
-            
-            import shutil
-            shutil.copy(temp_file, original_path)
-            
-            create_initial_cities(test_db)
-            
-            cities = test_db.query(City).all()
-            assert len(cities) == 3
-            
-            city_names = [city.name for city in cities]
-            assert "Москва" in city_names
-            assert "Санкт-Петербург" in city_names
-            assert "Выборг" in city_names
-            
-            moscow = test_db.query(City).filter(City.name == "Москва").first()
-            assert moscow.region == ""
-            
-            spb = test_db.query(City).filter(City.name == "Санкт-Петербург").first()
-            assert spb.region == ""
-            
-        finally:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
-            if os.path.exists(original_path):
-                os.unlink(original_path)
+        
+        create_initial_cities(test_db, str(csv_path))
+        
+        cities = test_db.query(City).all()
+        assert len(cities) == 3
+        
+        city_names = [city.name for city in cities]
+        assert "Москва" in city_names
+        assert "Санкт-Петербург" in city_names
+        assert "Выборг" in city_names
+        
+        moscow = test_db.query(City).filter(City.name == "Москва").first()
+        assert moscow.region == ""
+        
+        spb = test_db.query(City).filter(City.name == "Санкт-Петербург").first()
+        assert spb.region == ""
+        
+        # Население: число до сноски, пустая ячейка - None
+        assert moscow.population == 12330126
+        assert spb.population == 96
+        assert test_db.query(City).filter(City.name == "Выборг").first().population is None
+        
+        # Города, загруженные до появления колонки, получают население при повторной загрузке
+        moscow.population = None
+        test_db.commit()
+        create_initial_cities(test_db, str(csv_path))
+        assert test_db.query(City).count() == 3
+        assert test_db.query(City).filter(City.name == "Москва").first().population == 12330126
     
     def test_games_have_descriptions(self, test_db):
         """Тест что все игры имеют описания"""
@@ -0,0 +1,77 @@
+import asyncio
+from sqlalchemy import select, func
+from app.config import config
+from database.counters import game_start_counter
+from database.models import Game, GameSession, Rating
+from repositories.aio import AsyncUserRepository, AsyncGameRepository, AsyncGameSessionRepository
+
+
+class TestLazySessions:
+    """Тесты для ленивого создания игровых сессий и счетчика запусков"""
+
+    def test_abandoned_game_does_not_write(self, async_db_factory, monkeypatch):
+        """Тест что в режиме lazy строка сессии пишется только при завершении"""
+        monkeypatch.setattr(config, 'GAME_SESSION_MODE', 'lazy')
+        game_start_counter.take()
+
+        async def count(db, model):
+            return (await db.execute(select(func.count()).select_from(model))).scalar()
+
+        async def scenario():
+            async with async_db_factory() as db:
+                user = await AsyncUserRepository(db).get_or_create_user(12345, "test_user", "Test")
+                game = await AsyncGameRepository(db).save(Game(name="Test Game", code="test"))
+                await db.commit()
+
+                session_repo = AsyncGameSessionRepository(db)
+                abandoned = await session_repo.start_session(user.id, game.id)
+                finished = await session_repo.start_session(user.id, game.id)
+                sessions_after_start = await count(db, GameSession)
+
+                await session_repo.finish_session(finished, 40, 3)
+                return abandoned, sessions_after_start, await count(db, GameSession), await count(db, Rating)
+
+        abandoned, sessions_after_start, sessions_after_finish, ratings = asyncio.run(scenario())
+
+        assert abandoned['session_id'] is None
+        assert sessions_after_start == 0
+        assert sessions_after_finish == 1
+        assert ratings == 1
+
+    def test_completion_rate_from_counter(self, async_db_factory, monkeypatch):
+        """Тест что всего игр считается по счетчику запусков до и после сброса в БД"""
+        monkeypatch.setattr(config, 'GAME_SESSION_MODE', 'lazy')
+        game_start_counter.take()
+
+        async def stats(db):
+            session_repo = AsyncGameSessionRepository(db)
+            return (
+                await session_repo.get_total_sessions_count(),
+                await session_repo.get_completed_sessions_count(),
+                (await session_repo.get_game_stats(game_id))['total_sessions']
+            )
+
+        async def scenario():
+            nonlocal game_id
+            async with async_db_factory() as db:
+                user = await AsyncUserRepository(db).get_or_create_user(12345, "test_user", "Test")
+                game = await AsyncGameRepository(db).save(Game(name="Test Game", code="test"))
+                game_id = game.id
+
+                session_repo = AsyncGameSessionRepository(db)
+                for _ in range(3):
+                    game_session = await session_repo.start_session(user.id, game.id)
+                await session_repo.finish_session(game_session, 10, 1)
+                await db.commit()
+
+                before_flush = await stats(db)
+                await game_start_counter.flush(async_db_factory)
+                after_flush = await stats(db)
+                return before_flush, after_flush
+
+        game_id = None
+        before_flush, after_flush = asyncio.run(scenario())
+
+        assert before_flush == (3, 1, 3)
+        assert after_flush == (3, 1, 3)
+        assert game_start_counter.pending_count() == 0
@@ -0,0 +1,99 @@
+import asyncio
+import time
+from database.leaderboard_cache import LeaderboardCache, leaderboard_cache
+from database.models import Game
+from repositories import UserRepository
+from repositories.aio import AsyncRatingRepository
+
+
+class FakeRating:
+    """Строка рейтинга для топа по игре"""
+
+    def __init__(self, user_id: int, total_score: int):
+        self.user_id = user_id
+        self.total_score = total_score
+
+
+class TestLeaderboardCache:
+    """Тесты для кэша топов игроков"""
+
+    def put_game_top(self, cache: LeaderboardCache, game_id: int, scores: dict, limit: int):
+        rows = [(FakeRating(user_id, score), None, None) for user_id, score in scores.items()]
+        cache.put(game_id, limit, rows, cache.version(game_id))
+
+    def test_invalidated_only_when_top_can_change(self):
+        """Тест что топ сбрасывается, только если новая сумма может в него попасть"""
+        cache = LeaderboardCache(ttl=60)
+        self.put_game_top(cache, 1, {10: 500, 11: 400}, limit=2)
+        self.put_game_top(cache, 2, {10: 300}, limit=2)
+
+        # Ниже последнего места топа игры 1; топ игры 2 неполный - сбрасывается
+        cache.rating_changed(user_id=12, game_id=1, game_total=100, global_total=100)
+        cache.rating_changed(user_id=12, game_id=2, game_total=100, global_total=200)
+        assert cache.get(1, 2) is not None
+        assert cache.get(2, 2) is None
+
+        # Обгоняет последнее место
+        cache.rating_changed(user_id=12, game_id=1, game_total=450, global_total=550)
+        assert cache.get(1, 2) is None
+
+        # Игрок из топа набрал очки, даже оставаясь на месте
+        self.put_game_top(cache, 1, {10: 500, 12: 450}, limit=2)
+        cache.rating_changed(user_id=12, game_id=1, game_total=460, global_total=560)
+        assert cache.get(1, 2) is None
+
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['invalidations'] == 3
+
+    def test_stale_result_not_cached(self):
+        """Тест что результат, прочитанный до изменения рейтинга, не попадает в кэш"""
+        cache = LeaderboardCache(ttl=60)
+        version = cache.version(1)
+        cache.rating_changed(user_id=1, game_id=1, game_total=10, global_total=10)
+        cache.put(1, 10, [(FakeRating(1, 0), None, None)], version)
+        assert cache.get(1, 10) is None
+
+    def test_stale_text_not_cached(self):
+        """Тест что текст, построенный до изменения рейтинга, не попадает в новую запись"""
+        cache = LeaderboardCache(ttl=60)
+        version = cache.version(1)
+        # Пока текст строился, топ изменился и в кэш легли новые строки
+        cache.rating_changed(user_id=10, game_id=1, game_total=600, global_total=600)
+        self.put_game_top(cache, 1, {10: 600}, limit=10)
+        cache.put_text(1, 10, "старый топ", version)
+        assert cache.get_text(1, 10) is None
+
+    def test_ttl_and_text(self):
+        """Тест что текст хранится вместе с топом и истекает по TTL"""
+        cache = LeaderboardCache(ttl=0.05)
+        self.put_game_top(cache, 1, {10: 500}, limit=10)
+        assert cache.get_text(1, 10) is None
+        cache.put_text(1, 10, "топ", cache.version(1))
+        assert cache.get_text(1, 10) == "топ"
+
+        time.sleep(0.06)
+        assert cache.get_text(1, 10) is None
+        assert cache.get(1, 10) is None
+        assert cache.stats()['text_misses'] == 2
+
+    def test_commit_invalidates_global_top(self, async_db_factory):
+        """Тест что завершение игры сбрасывает общий топ после commit"""
+        async def scenario():
+            async with async_db_factory() as db:
+                user = await db.run_sync(lambda sync_db: UserRepository(sync_db).get_or_create_user(1, "first", "First"))
+                game = Game(name="Test Game", code="test")
+                db.add(game)
+                await db.commit()
+
+                rating_repo = AsyncRatingRepository(db)
+                empty = await rating_repo.get_leaderboard()
+                await rating_repo.update_rating(user.id, game.id, 10)
+                cached_before_commit = await rating_repo.get_leaderboard()
+                await db.commit()
+                return empty, cached_before_commit, await rating_repo.get_leaderboard()
+
+        empty, cached_before_commit, after_commit = asyncio.run(scenario())
+
+        assert empty == [] and cached_before_commit == []
+        assert [total_score for _, total_score, *_ in after_commit] == [10]
+        assert leaderboard_cache.stats()['invalidations'] == 1
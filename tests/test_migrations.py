@@ -0,0 +1,40 @@
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+
+from database.engine import Base, get_alembic_config, run_migrations
+
+
+class TestMigrations:
+    """Тесты для миграций схемы БД"""
+
+    def test_migrations_match_models(self, tmp_path):
+        """Тест что миграции создают ту же схему, что описана в моделях"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'bot.db'}")
+        run_migrations(engine)
+
+        with engine.connect() as connection:
+            context = MigrationContext.configure(connection)
+            diff = compare_metadata(context, Base.metadata)
+
+        assert diff == []
+        engine.dispose()
+
+    def test_existing_database_is_stamped(self, tmp_path):
+        """Тест что БД, созданная через create_all до миграций, докатывается до последней схемы"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'bot.db'}")
+        # Схема до появления миграций = базовая ревизия без таблицы alembic_version
+        run_migrations(engine, '0001')
+        with engine.begin() as connection:
+            connection.execute(text("DROP TABLE alembic_version"))
+
+        run_migrations(engine)
+
+        indexes = {index['name'] for index in inspect(engine).get_indexes('ratings')}
+        assert 'ix_ratings_game_total_score' in indexes
+        assert 'game_start_stats' in inspect(engine).get_table_names()
+        with engine.connect() as connection:
+            version = connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+        assert version == ScriptDirectory.from_config(get_alembic_config()).get_current_head()
+        engine.dispose()
@@ -0,0 +1,59 @@
+import asyncio
+from database.profiler import StatementProfiler, current_handler
+from repositories.aio import AsyncUserRepository
+
+
+def run_tagged(async_db_factory, handler: str):
+    """Выполняет запросы репозитория от имени хендлера"""
+    async def scenario():
+        current_handler.set(handler)
+        async with async_db_factory() as db:
+            user_repo = AsyncUserRepository(db)
+            await user_repo.get_or_create_user(12345, "test_user", "Test")
+            await user_repo.get_user_by_telegram_id(12345)
+            await db.commit()
+
+    asyncio.run(scenario())
+
+
+class TestStatementProfiler:
+    """Тесты для профилировщика SQL"""
+
+    def test_statements_tagged_with_repository_and_handler(self, async_db_factory):
+        """Тест что запросы учитываются с методом репозитория и хендлером"""
+        profiler = StatementProfiler(slow_query_ms=10_000)
+        profiler.attach(async_db_factory.kw['bind'].sync_engine)
+
+        run_tagged(async_db_factory, "start.cmd_start")
+
+        top = profiler.top()
+        tags = {(stats.repository_method, stats.handler) for stats in top}
+        assert ("UserRepository.get_or_create_user", "start.cmd_start") in tags
+        assert ("UserRepository.get_user_by_telegram_id", "start.cmd_start") in tags
+        assert all(stats.count >= 1 and stats.total_time > 0 for stats in top)
+        # Отсортировано по суммарному времени
+        assert [stats.total_time for stats in top] == sorted((stats.total_time for stats in top), reverse=True)
+        # INSERT пользователя затронул одну строку
+        insert = next(stats for stats in top if stats.statement.startswith("INSERT INTO users"))
+        assert insert.rows == 1
+        # SELECT пользователя прочитал одну строку, хотя rowcount у SQLite для него -1
+        lookup = next(
+            stats for stats in top
+            if stats.repository_method == "UserRepository.get_user_by_telegram_id" and stats.statement.startswith("SELECT")
+        )
+        assert lookup.rows == 1
+        assert not profiler.slow_queries
+
+    def test_slow_query_log_has_query_plan(self, async_db_factory):
+        """Тест что медленный запрос попадает в лог с EXPLAIN QUERY PLAN"""
+        profiler = StatementProfiler(slow_query_ms=0)
+        profiler.attach(async_db_factory.kw['bind'].sync_engine)
+
+        run_tagged(async_db_factory, "profile.cmd_profile")
+
+        lookup = next(
+            entry for entry in profiler.slow_queries
+            if entry['repository_method'] == "UserRepository.get_user_by_telegram_id"
+        )
+        assert lookup['handler'] == "profile.cmd_profile"
+        assert any("ix_users_telegram_id" in line for line in lookup['plan'])
@@ -0,0 +1,95 @@
+import random
+import pytest
+from app.config import config
+from tests.conftest import PLAYER_TELEGRAM_ID, ADMIN_TELEGRAM_ID
+
+# Бюджет SQL запросов и commit на один update: (telegram_id, текст, запросов, commit).
+# Значения - текущие числа; рост означает новый N+1 или лишнюю транзакцию
+MESSAGE_BUDGETS = [
+    (PLAYER_TELEGRAM_ID, "/start", 1, 1),
+    (PLAYER_TELEGRAM_ID, "/help", 0, 0),
+    (PLAYER_TELEGRAM_ID, "/games", 1, 1),
+    (PLAYER_TELEGRAM_ID, "/profile", 3, 1),
+    (PLAYER_TELEGRAM_ID, "/rating", 2, 1),
+    (PLAYER_TELEGRAM_ID, "/leaderboard", 1, 1),
+    (PLAYER_TELEGRAM_ID, "/leaderboard quiz", 2, 1),
+    (PLAYER_TELEGRAM_ID, "/leaderboard week", 1, 1),
+    (PLAYER_TELEGRAM_ID, "/leaderboard me", 5, 1),  # Без индекса в памяти место - COUNT в БД
+    (PLAYER_TELEGRAM_ID, "/leaderboard me quiz", 6, 1),
+    (ADMIN_TELEGRAM_ID, "/admin", 2, 1),
+    (ADMIN_TELEGRAM_ID, "/admin_stats", 7, 1),
+    (ADMIN_TELEGRAM_ID, "/stats_users", 7, 1),
+    (ADMIN_TELEGRAM_ID, "/stats_games", 12, 1),  # N+1: 3 запроса на каждую игру
+    (ADMIN_TELEGRAM_ID, "/stats_daily", 7, 1),
+    (ADMIN_TELEGRAM_ID, "/user_info 1", 3, 1),
+    (ADMIN_TELEGRAM_ID, "/user_stats 1", 3, 1),
+    (ADMIN_TELEGRAM_ID, "/games_list", 3, 1),
+    (ADMIN_TELEGRAM_ID, "/admins_list", 5, 1),  # N+1: запрос на каждого супер-админа
+]
+
+
+@pytest.fixture
+def super_admins(handler_harness, monkeypatch):
+    """Супер-админы из config (кроме админа из БД) - чтобы были видны запросы по каждому"""
+    monkeypatch.setattr(config, 'ADMIN_IDS', [1, 2])
+
+
+class TestQueryBudgets:
+    """Тесты бюджета SQL запросов для хендлеров"""
+
+    @pytest.mark.parametrize("telegram_id, text, max_statements, max_commits", MESSAGE_BUDGETS)
+    def test_command_budget(self, handler_harness, super_admins, telegram_id, text, max_statements, max_commits):
+        """Тест что команда укладывается в бюджет запросов"""
+        handler_harness.send_message(telegram_id, text).assert_within(max_statements, max_commits)
+
+    def test_leaderboard_cache_budget(self, handler_harness):
+        """Тест что повторный /leaderboard отвечает из кэша без запросов к БД"""
+        handler_harness.send_message(PLAYER_TELEGRAM_ID, "/leaderboard").assert_within(1)
+        handler_harness.send_message(1002, "/leaderboard").assert_within(0, 0)
+
+    def test_leaderboard_page_budget(self, handler_harness):
+        """Тест бюджета листания топа игры: игра и страница по ключу"""
+        handler_harness.send_callback(PLAYER_TELEGRAM_ID, "lb:1:n:1000:0:1").assert_within(2)
+        handler_harness.send_callback(PLAYER_TELEGRAM_ID, "lb:1:p:0:1000000:1").assert_within(2)
+
+    def test_admin_actions_budget(self, handler_harness, super_admins):
+        """Тест бюджета админских действий (с возвратом данных в исходное состояние)"""
+        harness = handler_harness
+        harness.send_message(ADMIN_TELEGRAM_ID, "/user_ban 3 спам").assert_within(6)
+        harness.send_message(ADMIN_TELEGRAM_ID, "/user_unban 3").assert_within(6)
+        harness.send_message(ADMIN_TELEGRAM_ID, "/game_toggle cities").assert_within(6)
+        harness.send_message(ADMIN_TELEGRAM_ID, "/game_toggle cities").assert_within(6)
+        harness.send_message(ADMIN_TELEGRAM_ID, "/admin_add 3").assert_within(9)
+        harness.send_message(ADMIN_TELEGRAM_ID, "/admin_remove 3").assert_within(6)
+
+    def test_guess_number_budget(self, handler_harness):
+        """Тест бюджета игры 'Угадай число': старт и ходы"""
+        harness = handler_harness
+        # Старт: строка сессии и счетчики игрока (общий и по игре)
+        harness.send_message(PLAYER_TELEGRAM_ID, "/guess_number").assert_within(5)
+        # 10 попыток: игра завершается победой или проигрышем ровно один раз,
+        # остальные ходы не трогают БД. Завершение - сессия, гистограмма очков, рейтинг, итоги игрока,
+        # очки за периоды и два счетчика игрока
+        counts = [harness.send_message(PLAYER_TELEGRAM_ID, str(guess)) for guess in range(1, 11)]
+        for count in counts:
+            count.assert_within(7)
+        assert sum(count.commits for count in counts) == 1
+
+    def test_cities_budget(self, handler_harness, monkeypatch):
+        """Тест бюджета игры 'Города': старт, ход и остановка"""
+        harness = handler_harness
+        # Игра начинается с первого города (Москва), чтобы ход был предсказуемым:
+        # таблица стартовых городов при random() == 0 выбирает первую ячейку
+        monkeypatch.setattr(random, 'random', lambda: 0.0)
+        monkeypatch.setattr(random, 'choice', lambda cities: cities[0])
+        # Старт: индекс городов строится один раз на процесс (1 запрос), сессия и счетчики игрока
+        harness.send_message(1002, "/cities").assert_within(6)
+        # Ход проверяется по индексу городов в памяти, бот отвечает Калугой - без запросов к БД
+        harness.send_message(1002, "Архангельск").assert_within(0, 0)
+        assert "Калуга" in harness.bot.session.requests[-1].text
+        # Во время игры /stop сначала попадает в обработчик хода: только завершение (7 запросов)
+        harness.send_message(1002, "/stop").assert_within(7)
+
+    def test_quiz_start_budget(self, handler_harness):
+        """Тест бюджета старта викторины (ответы без завершения БД не трогают)"""
+        handler_harness.send_message(1003, "/quiz").assert_within(8)
@@ -0,0 +1,126 @@
+import random
+import pytest
+from database.models import Game
+from database.rank_index import ScoreRankIndex, game_rank_indexes, rank_index
+from repositories import UserRepository, RatingRepository
+
+
+@pytest.fixture
+def loaded_rank_index(test_db):
+    """Общий индекс рейтинга, загруженный из тестовой БД"""
+    rank_index.load(test_db)
+    yield rank_index
+    rank_index.clear()
+
+
+class TestScoreRankIndex:
+    """Тесты для индекса рейтинга в памяти"""
+
+    def test_matches_sorted_order(self):
+        """Тест что ранги и места совпадают с сортировкой по очкам и user_id"""
+        random_generator = random.Random(7)
+        index = ScoreRankIndex()
+        scores = {}
+        for _ in range(3000):
+            user_id = random_generator.randint(1, 500)
+            # Небольшой разброс дает много одинаковых сумм, большие - несколько сумм в одной корзине
+            scores[user_id] = random_generator.choice([random_generator.randint(0, 50), random_generator.randint(0, 5000)])
+            index.apply({user_id: scores[user_id]})
+
+        ordered = sorted(scores, key=lambda user_id: (-scores[user_id], user_id))
+        assert [index.user_at_rank(place) for place in range(1, len(ordered) + 1)] == ordered
+        for user_id, score in scores.items():
+            assert index.rank(user_id) == 1 + sum(1 for other in scores.values() if other > score)
+        assert index.user_at_rank(0) is None
+        assert index.user_at_rank(len(ordered) + 1) is None
+
+    def test_updates_applied_after_commit(self, test_db, loaded_rank_index):
+        """Тест что суммы очков попадают в индекс после commit и не попадают после rollback"""
+        user_repo = UserRepository(test_db)
+        first = user_repo.get_or_create_user(1, "first", "First")
+        second = user_repo.get_or_create_user(2, "second", "Second")
+        game = Game(name="Test Game", code="test")
+        test_db.add(game)
+        test_db.commit()
+        rating_repo = RatingRepository(test_db)
+
+        rating_repo.update_rating(first.id, game.id, 30)
+        rating_repo.update_rating(second.id, game.id, 50)
+        assert len(loaded_rank_index) == 0  # До commit индекс не меняется
+        test_db.commit()
+
+        assert loaded_rank_index.rank(second.id) == 1
+        assert loaded_rank_index.rank(first.id) == 2
+
+        rating_repo.update_rating(first.id, game.id, 100)
+        test_db.rollback()
+        assert loaded_rank_index.rank(first.id) == 2
+
+        rating_repo.update_rating(first.id, game.id, 100)
+        test_db.commit()
+        assert loaded_rank_index.user_at_rank(1) == first.id
+        assert loaded_rank_index.rank(first.id) == rating_repo.get_user_global_rank(first.id) == 1
+        assert rating_repo.get_user_id_at_rank(2) == second.id
+
+    def test_large_scores_share_fixed_tree(self):
+        """Тест что огромные суммы не увеличивают дерево, а порядок остается точным"""
+        random_generator = random.Random(11)
+        index = ScoreRankIndex()
+        index.load_scores({user_id: random_generator.randint(0, 10_000_000) for user_id in range(1, 301)})
+        tree_size = len(index._tree)
+        scores = dict(index._scores)
+        for user_id in range(250, 401):
+            scores[user_id] = random_generator.choice([10_000_000 + user_id % 3, 2 ** 70 + user_id % 5, 7])
+            index.apply({user_id: scores[user_id]})
+
+        assert len(index._tree) == tree_size
+        ordered = sorted(scores, key=lambda user_id: (-scores[user_id], user_id))
+        assert [index.user_at_rank(place) for place in range(1, len(ordered) + 1)] == ordered
+        assert [index.position(user_id) for user_id in ordered] == list(range(1, len(ordered) + 1))
+        for user_id, score in scores.items():
+            assert index.rank(user_id) == 1 + sum(1 for other in scores.values() if other > score)
+
+    def test_position_breaks_ties_by_user_id(self):
+        """Тест что место учитывает порядок по user_id при равных очках, как user_at_rank"""
+        index = ScoreRankIndex()
+        index.load_scores({1: 50, 2: 70, 3: 50, 4: 10, 5: 50})
+
+        assert [index.position(user_id) for user_id in (2, 1, 3, 5, 4)] == [1, 2, 3, 4, 5]
+        assert all(index.user_at_rank(index.position(user_id)) == user_id for user_id in range(1, 6))
+        assert index.rank(5) == 2
+        assert index.position(100) is None
+
+
+class TestGameRankIndexes:
+    """Тесты для индексов рейтинга игр в памяти"""
+
+    def test_load_and_apply_after_commit(self, test_db):
+        """Тест что индексы игр загружаются из ratings и получают суммы после commit"""
+        user_repo = UserRepository(test_db)
+        first = user_repo.get_or_create_user(1, "first", "First")
+        second = user_repo.get_or_create_user(2, "second", "Second")
+        game_a, game_b = Game(name="Game A", code="a"), Game(name="Game B", code="b")
+        test_db.add_all([game_a, game_b])
+        test_db.commit()
+        rating_repo = RatingRepository(test_db)
+        rating_repo.update_rating(first.id, game_a.id, 30)
+        rating_repo.update_rating(second.id, game_a.id, 50)
+        test_db.commit()
+
+        game_rank_indexes.load(test_db)
+        try:
+            assert game_rank_indexes.get(game_b.id) is None
+            assert game_rank_indexes.get(game_a.id).position(first.id) == 2
+
+            rating_repo.update_rating(first.id, game_a.id, 100)
+            rating_repo.update_rating(first.id, game_b.id, 5)
+            test_db.rollback()
+            assert game_rank_indexes.get(game_a.id).position(first.id) == 2
+
+            rating_repo.update_rating(first.id, game_a.id, 100)
+            rating_repo.update_rating(second.id, game_b.id, 5)
+            test_db.commit()
+            assert game_rank_indexes.get(game_a.id).position(first.id) == 1
+            assert game_rank_indexes.get(game_b.id).position(second.id) == 1
+        finally:
+            game_rank_indexes.clear()
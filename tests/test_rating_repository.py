@@ -0,0 +1,246 @@
+from datetime import date
+from sqlalchemy import select, update, event
+from database.models import Game, UserTotal, PeriodScore, ScoreHistogram
+from repositories import UserRepository, RatingRepository, GameSessionRepository
+
+
+class TestRatingRepository:
+    """Тесты для RatingRepository"""
+
+    def create_players(self, test_db):
+        """Создает двух игроков и две игры"""
+        user_repo = UserRepository(test_db)
+        users = [user_repo.get_or_create_user(telegram_id, f"user{telegram_id}", "Test") for telegram_id in (1, 2)]
+        games = [Game(name="Game A", code="a"), Game(name="Game B", code="b")]
+        test_db.add_all(games)
+        test_db.flush()
+        return users, games
+
+    def test_update_rating_maintains_user_totals(self, test_db):
+        """Тест что итоги по всем играм обновляются вместе с рейтингом"""
+        (first, second), (game_a, game_b) = self.create_players(test_db)
+        rating_repo = RatingRepository(test_db)
+
+        rating_repo.update_rating(first.id, game_a.id, 30)
+        rating_repo.update_rating(first.id, game_b.id, 50)
+        rating_repo.update_rating(second.id, game_a.id, 100)
+
+        totals = test_db.get(UserTotal, first.id)
+        assert (totals.total_score, totals.total_games, totals.best_score) == (80, 2, 50)
+
+        leaderboard = rating_repo.get_leaderboard(limit=10)
+        assert [(user.id, total_score, total_games) for user, total_score, total_games, _ in leaderboard] == [
+            (second.id, 100, 1), (first.id, 80, 2)
+        ]
+        assert rating_repo.get_user_global_rank(first.id) == 2
+        assert rating_repo.check_user_totals() == []
+
+    def test_check_and_rebuild_user_totals(self, test_db):
+        """Тест что сверка находит расхождения, а пересборка их устраняет"""
+        (first, second), (game_a, _) = self.create_players(test_db)
+        rating_repo = RatingRepository(test_db)
+        rating_repo.update_rating(first.id, game_a.id, 30)
+        rating_repo.update_rating(second.id, game_a.id, 40)
+
+        # Итоги разошлись с рейтингами: одна строка испорчена, другая потеряна
+        test_db.execute(update(UserTotal).where(UserTotal.user_id == first.id).values(total_score=999))
+        test_db.delete(test_db.get(UserTotal, second.id))
+        test_db.flush()
+
+        mismatches = rating_repo.check_user_totals()
+        assert mismatches == [
+            {'user_id': first.id, 'expected': (30, 1, 30), 'actual': (999, 1, 30)},
+            {'user_id': second.id, 'expected': (40, 1, 40), 'actual': None}
+        ]
+
+        assert rating_repo.rebuild_user_totals() == 2
+        assert rating_repo.check_user_totals() == []
+        assert test_db.scalars(select(UserTotal.total_score).order_by(UserTotal.user_id)).all() == [30, 40]
+
+    def test_leaderboard_pages(self, test_db):
+        """Тест что страницы по ключу проходят топ игры вперед и назад без пропусков и повторов"""
+        (first, _), (game, _) = self.create_players(test_db)
+        user_repo = UserRepository(test_db)
+        rating_repo = RatingRepository(test_db)
+        users = [first] + [user_repo.get_or_create_user(100 + i, f"user{100 + i}", "Test") for i in range(24)]
+        for i, user in enumerate(users):
+            rating_repo.update_rating(user.id, game.id, (i % 7) * 10)  # Много одинаковых сумм
+        scores = {user.id: (i % 7) * 10 for i, user in enumerate(users)}
+        expected = sorted(scores, key=lambda user_id: (-scores[user_id], user_id))
+
+        pages, after, has_next = [], None, True
+        while has_next:
+            rows, has_next = rating_repo.get_leaderboard_page(game.id, limit=10, after=after)
+            pages.append([rating.user_id for rating, _ in rows])
+            after = (rows[-1][0].total_score, rows[-1][0].user_id)
+        assert [len(page) for page in pages] == [10, 10, 5]
+        assert sum(pages, []) == expected
+
+        # Назад от первой строки последней страницы
+        rows, has_prev = rating_repo.get_leaderboard_page(
+            game.id, limit=10, before=(rows[0][0].total_score, rows[0][0].user_id)
+        )
+        assert [rating.user_id for rating, _ in rows] == pages[1]
+        assert has_prev is True
+
+    def test_period_leaderboard(self, test_db):
+        """Тест что завершения попадают в топы за день, неделю и месяц"""
+        (first, second), (game, _) = self.create_players(test_db)
+        session_repo = GameSessionRepository(test_db)
+        for user, score in ((first, 30), (second, 50), (first, 40)):
+            session = session_repo.create_session(user.id, game.id)
+            session_repo.complete_session(session.id, score, 1)
+
+        rating_repo = RatingRepository(test_db)
+        for period in PeriodScore.PERIODS:
+            top = rating_repo.get_period_leaderboard(period)
+            assert [(user.id, total_score, total_games) for user, total_score, total_games, _ in top] == [
+                (first.id, 70, 2), (second.id, 50, 1)
+            ]
+
+    def test_prune_period_scores(self, test_db):
+        """Тест что остаются очки только за текущий и предыдущий период"""
+        (first, _), _ = self.create_players(test_db)
+        rating_repo = RatingRepository(test_db)
+
+        # Среда 2026-10-14: неделя с понедельника 12-го, месяц с 1-го
+        day = date(2026, 10, 14)
+        assert PeriodScore.start_of('week', day) == date(2026, 10, 12)
+        assert PeriodScore.start_of('month', day) == date(2026, 10, 1)
+
+        test_db.add_all([
+            PeriodScore(period='day', period_start=date(2026, 10, 13), user_id=first.id, total_score=1, games_played=1, best_score=1),
+            PeriodScore(period='day', period_start=date(2026, 10, 12), user_id=first.id, total_score=1, games_played=1, best_score=1),
+            PeriodScore(period='week', period_start=date(2026, 10, 5), user_id=first.id, total_score=1, games_played=1, best_score=1),
+            PeriodScore(period='week', period_start=date(2026, 9, 28), user_id=first.id, total_score=1, games_played=1, best_score=1),
+            PeriodScore(period='month', period_start=date(2026, 9, 1), user_id=first.id, total_score=1, games_played=1, best_score=1),
+            PeriodScore(period='month', period_start=date(2026, 8, 1), user_id=first.id, total_score=1, games_played=1, best_score=1),
+        ])
+        test_db.flush()
+
+        assert rating_repo.prune_period_scores(day) == 3
+        kept = test_db.execute(select(PeriodScore.period, PeriodScore.period_start)).all()
+        assert set(kept) == {('day', date(2026, 10, 13)), ('week', date(2026, 10, 5)), ('month', date(2026, 9, 1))}
+
+    def test_rebuild_ratings_from_sessions(self, test_db):
+        """Тест что рейтинги пересчитываются по завершенным сессиям, исправляя расхождения"""
+        (first, second), (game_a, game_b) = self.create_players(test_db)
+        session_repo = GameSessionRepository(test_db)
+        for user, game, score in ((first, game_a, 30), (first, game_a, 50), (first, game_b, 10),
+                                  (second, game_a, 20), (second, game_a, 0), (second, game_a, 40)):
+            session = session_repo.create_session(user.id, game.id)
+            session_repo.complete_session(session.id, score, 1)
+        session_repo.create_session(second.id, game_b.id)  # Брошенная игра не считается
+
+        # Рейтинг разошелся с сессиями (двойной учет)
+        rating_repo = RatingRepository(test_db)
+        rating_repo.update_rating(first.id, game_a.id, 50)
+
+        # Пачки меньше групп - группы пересекают границы пачек
+        result = rating_repo.rebuild_ratings_from_sessions(chunk_size=2)
+
+        assert result == {'sessions': 6, 'ratings': 3}
+        ratings = {
+            (rating.user_id, rating.game_id): (rating.total_score, rating.games_played, rating.best_score, rating.average_score)
+            for rating, _ in rating_repo.get_user_ratings(first.id) + rating_repo.get_user_ratings(second.id)
+        }
+        assert ratings == {
+            (first.id, game_a.id): (80, 2, 50, 40.0),
+            (first.id, game_b.id): (10, 1, 10, 10.0),
+            (second.id, game_a.id): (60, 3, 40, 20.0)
+        }
+        assert rating_repo.check_user_totals() == []
+
+    def test_user_dashboard(self, test_db):
+        """Тест что сводка пользователя собирается одним запросом и совпадает с отдельными методами"""
+        (first, second), (game_a, game_b) = self.create_players(test_db)
+        session_repo = GameSessionRepository(test_db)
+        for user, game, score in ((first, game_a, 10), (first, game_b, 30), (first, game_a, 5), (second, game_a, 100)):
+            session = session_repo.create_session(user.id, game.id)
+            session_repo.complete_session(session.id, score, 2)
+        session_repo.create_session(first.id, game_b.id)  # Брошенная игра
+        rating_repo = RatingRepository(test_db)
+
+        statements = []
+        event.listen(test_db.get_bind(), 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        dashboard = rating_repo.get_user_dashboard(telegram_id=1)
+        assert len(statements) == 1
+
+        assert (dashboard.user_id, dashboard.first_name, dashboard.rank) == (first.id, "Test", rating_repo.get_user_global_rank(first.id))
+        assert (dashboard.total_score, dashboard.total_games, dashboard.best_score) == (45, 3, 30)
+        assert (dashboard.sessions, dashboard.completed) == (4, 3)
+        assert dashboard.completion_rate == 75
+        assert [(rating.game_name, rating.total_score, rating.games_played, rating.average_score) for rating in dashboard.ratings] == [
+            ("Game B", 30, 1, 30.0), ("Game A", 15, 2, 7.5)
+        ]
+
+        assert rating_repo.get_user_dashboard(user_id=second.id, with_rank=False).rank is None
+        assert rating_repo.get_user_dashboard(user_id=second.id).rank == 1
+        assert rating_repo.get_user_dashboard(user_id=100500) is None
+
+    def test_user_dashboard_without_games(self, test_db):
+        """Тест сводки пользователя без игр: одна строка без рейтингов"""
+        (first, _), _ = self.create_players(test_db)
+
+        dashboard = RatingRepository(test_db).get_user_dashboard(user_id=first.id)
+
+        assert dashboard.ratings == ()
+        assert (dashboard.total_score, dashboard.sessions, dashboard.completion_rate, dashboard.rank) == (0, 0, 0, 1)
+
+    def test_leaderboard_around(self, test_db):
+        """Тест что окно вокруг игрока совпадает с куском полного топа"""
+        user_repo = UserRepository(test_db)
+        game = Game(name="Game A", code="a")
+        test_db.add(game)
+        test_db.flush()
+        rating_repo = RatingRepository(test_db)
+        # Одинаковые очки у соседей - порядок внутри них по user_id
+        users = [user_repo.get_or_create_user(telegram_id, f"user{telegram_id}", "Test") for telegram_id in range(1, 16)]
+        for number, user in enumerate(users):
+            rating_repo.update_rating(user.id, game.id, (number % 5) * 10)
+
+        for game_id in (None, game.id):
+            full, _ = rating_repo.get_leaderboard_page(game.id, limit=100)
+            ordered = [user.id for _, user in full]
+            for place, user_id in enumerate(ordered, start=1):
+                first_place, rows = rating_repo.get_leaderboard_around(user_id, game_id, radius=3)
+                start = max(place - 1 - 3, 0)
+                assert first_place == start + 1
+                assert [user.id for user, _, _ in rows] == ordered[start:place + 3]
+
+        assert rating_repo.get_leaderboard_around(users[0].id, game.id + 1) == (None, [])
+        assert rating_repo.get_leaderboard_around(users[0].id, with_place=False)[0] is None
+
+    def test_score_histograms_follow_ratings(self, test_db):
+        """Тест что гистограммы очков, обновляемые в update_rating, совпадают с пересобранными по ratings"""
+        (first, second), (game_a, game_b) = self.create_players(test_db)
+        rating_repo = RatingRepository(test_db)
+        for user, game, score in ((first, game_a, 3), (first, game_a, 1), (second, game_a, 100), (first, game_b, 0),
+                                  (second, game_a, 0), (first, game_a, 60), (second, game_b, 7)):
+            rating_repo.update_rating(user.id, game.id, score)
+
+        histograms = {metric: rating_repo.get_score_histograms([game_a.id, game_b.id], metric) for metric in ScoreHistogram.METRICS}
+        nonzero = {
+            metric: {game_id: {bucket: players for bucket, players in buckets.items() if players} for game_id, buckets in by_game.items()}
+            for metric, by_game in histograms.items()
+        }
+        # first в игре A: 64 очка (корзина 7), лучший 60 (корзина 6); second: 100 (корзина 7), лучший 100
+        assert nonzero['total'] == {game_a.id: {7: 2}, game_b.id: {0: 1, 3: 1}}
+        assert nonzero['best'] == {game_a.id: {6: 1, 7: 1}, game_b.id: {0: 1, 3: 1}}
+
+        rating_repo.rebuild_score_histograms()
+        for metric in ScoreHistogram.METRICS:
+            assert rating_repo.get_score_histograms([game_a.id, game_b.id], metric) == nonzero[metric]
+
+    def test_percentile(self):
+        """Тест процента игроков ниже по гистограмме"""
+        histogram = {ScoreHistogram.bucket_of(score): 0 for score in (0, 10, 40)}
+        for score in (0, 0, 10, 12, 40):
+            histogram[ScoreHistogram.bucket_of(score)] += 1
+
+        assert [ScoreHistogram.bucket_of(score) for score in (-5, 0, 1, 2, 3, 4, 2 ** 40)] == [0, 0, 1, 2, 2, 3, 31]
+        assert ScoreHistogram.percentile(histogram, 0) == 0
+        assert ScoreHistogram.percentile(histogram, 40) == 100 * (4 + 0 * 0.25) / 4
+        assert 50 <= ScoreHistogram.percentile(histogram, 12) <= 75
+        assert ScoreHistogram.percentile({5: 1}, 20) is None